@@ -1,981 +1,73 @@
 import streamlit as st
-from ortools.sat.python import cp_model
 import pandas as pd
 import calendar
-import os # อย่าลืม import os
-
-# --- Thai Public Holidays 2025-2026 ---
-THAI_HOLIDAYS = {
-    2025: {
-        1: [1],           # วันขึ้นปีใหม่
-        2: [12],          # วันมาฆบูชา
-        4: [6, 7, 13, 14, 15, 16],  # วันจักรี + สงกรานต์
-        5: [1, 4, 5, 12], # วันแรงงาน + ฉัตรมงคล + วิสาขบูชา
-        6: [2, 3],        # วันเฉลิมฯ พระราชินี
-        7: [10, 11, 28],  # วันอาสาฬหบูชา + เข้าพรรษา + เฉลิมฯ ร.10
-        8: [11, 12],      # วันแม่แห่งชาติ
-        10: [13, 23],     # วันสวรรคต ร.9 + ปิยมหาราช
-        12: [5, 10, 31],  # วันพ่อ + รัฐธรรมนูญ + สิ้นปี
-    },
-    2026: {
-        1: [1, 2],        # วันขึ้นปีใหม่
-        3: [3],           # วันมาฆบูชา
-        4: [6, 13, 14, 15],  # วันจักรี + สงกรานต์
-        5: [1, 4],        # วันแรงงาน + ฉัตรมงคล
-        6: [1, 3],        # วันวิสาขบูชา (ชดเชย) + เฉลิมฯ พระราชินี
-        7: [28, 29, 30],  # เฉลิมฯ ร.10 + อาสาฬหบูชา + เข้าพรรษา
-        8: [12],          # วันแม่แห่งชาติ
-        10: [13, 23],     # วันสวรรคต ร.9 + ปิยมหาราช
-        12: [5, 7, 10, 31],  # วันพ่อ + ชดเชย + รัฐธรรมนูญ + สิ้นปี
-    }
-}
-
-def is_holiday(year, month, day):
-    """ตรวจสอบว่าเป็นวันหยุดนักขัตฤกษ์หรือไม่"""
-    if year in THAI_HOLIDAYS and month in THAI_HOLIDAYS[year]:
-        return day in THAI_HOLIDAYS[year][month]
-    return False
-
-def get_holiday_name(year, month, day):
-    """รับชื่อวันหยุด (สำหรับ tooltip)"""
-    holiday_names = {
-        (2025, 1, 1): "วันขึ้นปีใหม่", (2025, 2, 12): "วันมาฆบูชา",
-        (2025, 4, 6): "วันจักรี", (2025, 4, 13): "วันสงกรานต์",
-        (2025, 5, 1): "วันแรงงาน", (2025, 5, 12): "วันวิสาขบูชา",
-        (2025, 6, 3): "วันเฉลิมฯ พระราชินี", (2025, 7, 28): "วันเฉลิมฯ ร.10",
-        (2025, 8, 12): "วันแม่แห่งชาติ", (2025, 10, 13): "วันสวรรคต ร.9",
-        (2025, 10, 23): "วันปิยมหาราช", (2025, 12, 5): "วันพ่อแห่งชาติ",
-        (2025, 12, 10): "วันรัฐธรรมนูญ", (2025, 12, 31): "วันสิ้นปี",
-        (2026, 1, 1): "วันขึ้นปีใหม่", (2026, 3, 3): "วันมาฆบูชา",
-        # ... สามารถเพิ่มชื่อวันหยุดได้
-    }
-    return holiday_names.get((year, month, day), "วันหยุดราชการ")
-
-# --- Nurse Names Mapping (Anonymized for Public Sharing) ---
-NURSE_NAMES = {
-    'ER1': 'Nurse 1',
-    'ER2': 'Nurse 2',
-    'ER3': 'Nurse 3',
-    'ER4': 'Nurse 4',
-    'ER5': 'Nurse 5',
-    'ER6': 'Nurse 6',
-    'ER7': 'Nurse 7',
-    'ER8': 'Nurse 8',
-    'ER9': 'Nurse 9',
-    'ER10': 'Nurse 10',
-}
-
-CSV_FILE = "leave_requests.csv"
-FIX_REQUESTS_FILE = "fix_requests.csv"
-STAFFING_OVERRIDES_FILE = "staffing_overrides.csv"
-
-def load_requests_from_csv():
-    if os.path.exists(CSV_FILE):
-        try:
-            # Try cleaning up previous mess
-            df = None
-            for encoding in ['utf-8', 'cp874', 'utf-16', 'tis-620']:
-                try:
-                    df = pd.read_csv(CSV_FILE, encoding=encoding)
-                    break
-                except:
-                    continue
-            
-            if df is not None:
-                # Remove Unnamed columns
-                df = df.loc[:, ~df.columns.str.contains('^Unnamed')]
-                # Keep only valid columns (including new 'priority' column)
-                valid_cols = ['nurse', 'date', 'month', 'year', 'type', 'reason', 'priority']
-                df = df[[c for c in df.columns if c in valid_cols]]
-                
-                # Convert numeric columns to int (handle potential floats)
-                for col in ['date', 'month', 'year', 'priority']:
-                    if col in df.columns:
-                        df[col] = df[col].fillna(0).astype(int)
-                
-                # Ensure priority column exists with default value
-                if 'priority' not in df.columns:
-                    df['priority'] = 1
-                        
-                return df.to_dict('records')
-        except Exception as e:
-            print(f"Error loading {CSV_FILE}: {e}")
-            return []
-    return []
-
-def save_requests_to_csv():
-    if st.session_state.requests:
-        df = pd.DataFrame(st.session_state.requests)
-        # Remove Unnamed columns before saving
-        df = df.loc[:, ~df.columns.str.contains('^Unnamed')]
-        df.to_csv(CSV_FILE, index=False, encoding='utf-8')
-    else:
-        if os.path.exists(CSV_FILE):
-            os.remove(CSV_FILE)
-
-def load_fix_requests_from_csv():
-    if os.path.exists(FIX_REQUESTS_FILE):
-        try:
-            df = pd.read_csv(FIX_REQUESTS_FILE)
-            # Check for encoding issues (if columns look weird or missing)
-            if 'dates' not in df.columns:
-                try:
-                    df = pd.read_csv(FIX_REQUESTS_FILE, encoding='utf-16')
-                except:
-                    pass
-            
-            if 'dates' in df.columns:
-                # Convert dates string back to list
-                df['dates'] = df['dates'].apply(lambda x: [int(d) for d in str(x).split(',')] if pd.notna(x) and str(x).strip() != '' else [])
-                return df.to_dict('records')
-        except Exception as e:
-            print(f"Error loading {FIX_REQUESTS_FILE}: {e}")
-            return []
-    return []
-
-def save_fix_requests_to_csv():
-    if st.session_state.fix_requests:
-        df = pd.DataFrame(st.session_state.fix_requests)
-        # Convert dates list to comma-separated string for CSV
-        df['dates'] = df['dates'].apply(lambda x: ','.join(map(str, x)) if x else '')
-        df.to_csv(FIX_REQUESTS_FILE, index=False)
-    else:
-        if os.path.exists(FIX_REQUESTS_FILE):
-            os.remove(FIX_REQUESTS_FILE)
-
-def load_staffing_overrides_from_csv():
-    if os.path.exists(STAFFING_OVERRIDES_FILE):
-        df = pd.read_csv(STAFFING_OVERRIDES_FILE)
-        return df.to_dict('records')
-    return []
-
-def save_staffing_overrides_to_csv():
-    if st.session_state.staffing_overrides:
-        df = pd.DataFrame(st.session_state.staffing_overrides)
-        df.to_csv(STAFFING_OVERRIDES_FILE, index=False)
-    else:
-        if os.path.exists(STAFFING_OVERRIDES_FILE):
-            os.remove(STAFFING_OVERRIDES_FILE)
-
-# --- Helper Function ---
-def get_week_occurrence(day):
-    return (day - 1) // 7 + 1
-
-def diagnose_scheduling_issues(year, month, days_in_month, nurses, requests, staffing_overrides, enable_oc):
-    """วิเคราะห์ปัญหาที่อาจทำให้จัดตารางไม่ได้"""
-    issues = []
-    
-    # นับจำนวนคนที่ลาแต่ละวัน
-    off_per_day = {d: [] for d in range(1, days_in_month + 1)}
-    leave_per_day = {d: [] for d in range(1, days_in_month + 1)}
-    
-    for req in requests:
-        if req.get('month') == month and req.get('year') == year:
-            if req.get('nurse') in nurses:
-                d = req.get('date')
-                if 1 <= d <= days_in_month:
-                    if req.get('type') == 'Off':
-                        off_per_day[d].append(req['nurse'])
-                    elif req.get('type') == 'Leave_Train':
-                        leave_per_day[d].append(req['nurse'])
-    
-    # ตรวจสอบแต่ละวัน
-    for d in range(1, days_in_month + 1):
-        weekday = calendar.weekday(year, month, d)
-        is_special_day = weekday >= 5 or is_holiday(year, month, d)
-        
-        # จำนวนคนที่ว่าง (ไม่ได้ลา Off หรือ L_T)
-        unavailable = set(off_per_day[d]) | set(leave_per_day[d])
-        available = [n for n in nurses if n not in unavailable]
-        available_count = len(available)
-        
-        # ความต้องการขั้นต่ำ
-        req_m = 4 if is_special_day else 3  # เวรเช้า
-        req_s = 2  # เวรบ่าย  
-        req_n = 1  # เวรดึก
-        
-        # ตรวจสอบ Override
-        for override in staffing_overrides:
-            if override.get('month') == month and override.get('year') == year:
-                if override.get('start', 1) <= d <= override.get('end', days_in_month):
-                    if override.get('shift') == 'N':
-                        req_n = override.get('count', 1)
-                    elif override.get('shift') == 'S':
-                        req_s = override.get('count', 2)
-        
-        # OC ต้องการอีก 1 คน (ถ้าเปิดใช้งาน และเป็นวันที่ 1-10)
-        req_oc = 1 if enable_oc and d <= 10 else 0
-        
-        # ต้องการอย่างน้อย M + S + N + OC (แม้จะซ้อนได้บางส่วน แต่ใช้ประมาณการ)
-        min_needed = req_m + req_s + req_n + req_oc
-        
-        # ER1 Fix: ศุกร์ M, อื่นๆ Off
-        er1_available_for_m = 1 if 'ER1' in available and weekday == 4 else 0
-        
-        # คนที่ลา/ประชุม นับเป็น M ได้
-        leave_count = len(leave_per_day[d])
-        
-        # จำนวนคนที่ต้องการทำเวรจริง (หลังหักคนลา)
-        need_for_m = max(0, req_m - leave_count - er1_available_for_m)
-        need_for_sn = req_s + req_n
-        
-        # คนที่ว่างหลังหัก ER1 (ER1 ทำได้แค่ M ศุกร์)
-        workers = [n for n in available if n != 'ER1']
-        
-        if len(off_per_day[d]) > 0 and available_count < need_for_m + need_for_sn:
-            day_type = "ส-อา/นักขัตฤกษ์" if is_special_day else "วันธรรมดา"
-            issues.append({
-                'day': d,
-                'weekday': ['จ','อ','พ','พฤ','ศ','ส','อา'][weekday],
-                'type': day_type,
-                'off_nurses': off_per_day[d],
-                'leave_nurses': leave_per_day[d],
-                'available': available_count,
-                'needed_m': req_m,
-                'needed_s': req_s,
-                'needed_n': req_n,
-                'needed_oc': req_oc,
-                'er1_status': 'หยุดเสาร์-อาทิตย์/นักขัตฤกษ์' if 'ER1' in available and is_special_day and weekday != 4 else 'พร้อม'
-            })
-    
-    return issues
-
-def generate_diagnosis_md(issues, total_nurses=10):
-    """สร้างรายงานปัญหาแบบละเอียด"""
-    md = []
-    
-    # Group issues by exact same problem type for summary? No, user wants case by case.
-    
-    md.append("### ⚠️ พบปัญหาในการจัดเวร")
-    md.append("ระบบไม่สามารถจัดตารางได้เนื่องจาก **คนไม่พอ** ในบางวันครับ")
-    md.append("")
-    
-    for issue in issues:
-        d = issue['day']
-        wd = issue['weekday']
-        
-        # Calculate totals
-        total_off = len(issue['off_nurses']) + len(issue['leave_nurses'])
-        
-        # Special check for ER1 implicit off
-        er1_note = ""
-        er1_off = 0
-        if issue['er1_status'].startswith('หยุด'):
-             er1_note = f"\n*   **ER1:** {issue['er1_status']} (ตามเงื่อนไข Fix) -> รวมเป็นคนหยุด {total_off + 1} คน"
-             er1_off = 1
-        
-        needed_total = issue['needed_m'] + issue['needed_s'] + issue['needed_n'] + issue['needed_oc']
-        available_real = issue['available'] - er1_off
-        missing = needed_total - available_real
-        
-        # Format the block
-        md.append(f"#### 📅 วันที่ {d} ({wd})")
-        
-        # List who is off/leave
-        who_off = []
-        if issue['off_nurses']:
-            who_off.append(f"ขอหยุด: {', '.join(issue['off_nurses'])}")
-        if issue['leave_nurses']:
-            who_off.append(f"ลา/ประชุม: {', '.join(issue['leave_nurses'])}")
-            
-        md.append(f"*   **คนขอหยุด/ลา:** {total_off} คน ({'; '.join(who_off)}){er1_note}")
-        md.append(f"*   **เหลือคนทำงาน:** {total_nurses} - {total_off + er1_off} = **{available_real} คน**")
-        md.append(f"*   **ความต้องการขั้นต่ำ:** เช้า({issue['needed_m']}) + บ่าย({issue['needed_s']}) + ดึก({issue['needed_n']}) = **{needed_total} คน**")
-        md.append(f"*   **ผลลัพธ์:** คนขาด {missing} คน (มี {available_real} แต่ต้องการ {needed_total}) ทำให้จัดไม่ได้ครับ")
-        md.append("")
-    
-    md.append("### 💡 วิธีแก้ไข")
-    md.append("*   **ลดคนลา:** ในวันที่มีปัญหา ต้องมีคนขอหยุด/ลาให้น้อยลง เพื่อให้เหลือคนพอ")
-    md.append("*   **ลดเวร:** ใช้เมนู **'👥 กำลังคนพิเศษ'** เพื่อลดจำนวนเวรเช้า (M) ในวันนั้นๆ ลง (เช่น จาก 4 เหลือ 3)")
-    md.append("")
-    
-    return "\n".join(md)
-
-def parse_previous_month_schedule(uploaded_file, nurses):
-    """อ่านไฟล์ตารางเดือนก่อนและดึงข้อมูล 7 วันสุดท้าย"""
-    if uploaded_file is None:
-        return None
-    
+import os
+
+from scheduler import (
+    ARCHIVE_DIR,
+    DEFAULT_OT_RATE,
+    DEFAULT_RATE_SN,
+    DEFAULT_SEQUENCE_ENCODING,
+    DEFAULT_SOLVER_PARAMS,
+    DEFAULT_WARD_CONFIG,
+    REQUESTS_DB,
+    TELEMETRY_DB,
+    THAI_HOLIDAYS,
+    CsvReport,
+    Schedule,
+    SolveCache,
+    SolveJob,
+    add_stored_requests,
+    aggregate_fairness,
+    cache_entry,
+    cached_schedule,
+    capacity_errors,
+    carry_over_from_archive,
+    check_capacity,
+    clear_stored_month,
+    compute_fairness,
+    compute_payroll,
+    delete_stored_ids,
+    diagnose_scheduling_issues,
+    explain_infeasibility,
+    fairness_from_archive,
+    fairness_summary,
+    generate_diagnosis_md,
+    list_wards,
+    load_stored_requests,
+    load_ward_config,
+    migrate_csv_requests,
+    parse_previous_month_schedule,
+    payroll_from_archive,
+    profile_model_build,
+    record_solve,
+    reroster_schedule,
+    save_archived_schedule,
+    save_edited_requests,
+    schedule_changes,
+    solve_cache_key,
+    solve_outcome,
+    standard_work_days,
+    year_to_date,
+)
+
+SOLVE_CACHE_DIR = ".solve_cache"
+
+
+def record_solve_history(stats, solve_month, nurses, fingerprint, outcome):
+    """บันทึกประวัติการ solve (ดูได้ที่หน้า "ประวัติการ Solve") ถ้าบันทึกไม่ได้ก็ไม่ขัดการใช้งาน"""
     try:
-        # ลองอ่านไฟล์ด้วย encoding ต่างๆ
-        df = None
-        for encoding in ['utf-8', 'cp874', 'utf-16', 'tis-620']:
-            try:
-                df = pd.read_csv(uploaded_file, encoding=encoding)
-                break
-            except UnicodeDecodeError:
-                continue
-            except Exception as e:
-                # ถ้าเป็น error อื่นๆ (เช่น separators) อาจจะข้ามไป
-                continue
-        
-        if df is None:
-            return None
-
-        
-        # หา column ที่เป็นตัวเลข (วันที่)
-        date_cols = [col for col in df.columns if col.isdigit() or any(c.isdigit() for c in str(col))]
-        
-        if not date_cols:
-            return None
-        
-        # เรียงลำดับและเอา 7 วันสุดท้าย
-        # ลบ emoji ออกก่อนเรียง
-        def extract_day(col):
-            return int(''.join(filter(str.isdigit, str(col))))
-        
-        date_cols_sorted = sorted(date_cols, key=extract_day)
-        last_7_days = date_cols_sorted[-7:] if len(date_cols_sorted) >= 7 else date_cols_sorted
-        
-        # สร้าง dict: nurse -> list of shifts (7 วันสุดท้าย)
-        prev_data = {}
-        for _, row in df.iterrows():
-            nurse_col = str(row.iloc[0])  # Column แรกคือชื่อพยาบาล
-            
-            # Extract nurse ID - รองรับหลายรูปแบบ
-            nurse_id = None
-            
-            # รูปแบบ 1: "ER1", "ER2", ... "ER10"
-            # เรียงลำดับ nurse ตามความยาวจากมากไปน้อย เพื่อป้องกัน ER1 ไป match กับ ER10
-            sorted_nurses = sorted(nurses, key=len, reverse=True)
-            for n in sorted_nurses:
-                if n in nurse_col:
-                    nurse_id = n
-                    break
-            
-            # รูปแบบ 2: "Nurse 1", "Nurse 2", ... "Nurse 10"
-            if nurse_id is None:
-                import re
-                match = re.search(r'Nurse\s*(\d+)', nurse_col)
-                if match:
-                    num = int(match.group(1))
-                    nurse_id = f'ER{num}'
-            
-            if nurse_id and nurse_id in nurses:
-                shifts = []
-                for col in last_7_days:
-                    shift = str(row[col]) if col in row.index else ''
-                    # แปลงกลับเป็น code (รองรับทั้งภาษาอังกฤษและภาษาไทย)
-                    shift = shift.strip()
-                    
-                    # Thai abbreviations mapping
-                    if shift == 'บ':  # บ่าย
-                        shift = 'S'
-                    elif shift == 'ช':  # เช้า
-                        shift = 'M'
-                    elif shift == 'ค':  # ดึก
-                        shift = 'N'
-                    elif shift == 'ดบ':  # ดึก+บ่าย (NS)
-                        shift = 'NS'
-                    elif shift in ['o', 'O', '']:  # Off
-                        shift = 'O'
-                    elif shift in ['VA', 'ประชุม']:  # ลา/ประชุม
-                        shift = 'L_T'
-                    elif shift in ['ncd', 'NCD']:
-                        shift = 'O'
-                    elif 'ลา' in shift or 'อบรม' in shift or 'ประชุม' in shift:
-                        shift = 'L_T'
-                    elif 'OC' in shift or '📞' in shift:
-                        shift = 'OC'
-                    elif shift in ['M', 'S', 'N', 'NS']:
-                        pass  # ใช้ค่าเดิม
-                    else:
-                        shift = 'O'  # default
-                    
-                    prev_data[nurse_id] = prev_data.get(nurse_id, []) + [shift]
-        
-        return prev_data
+        record_solve(stats, *solve_month, nurses, fingerprint=fingerprint, outcome=outcome, source='ui',
+                     path=TELEMETRY_DB)
     except Exception as e:
-        return None
-
-# --- 1. ฟังก์ชันจัดตาราง (Scheduler Engine) ---
-def solve_schedule(year, month, days_in_month, nurses, requests, fix_requests=None, staffing_overrides=None, enable_oc=True, prev_month_data=None):
-    if fix_requests is None:
-        fix_requests = []
-    if staffing_overrides is None:
-        staffing_overrides = []
-    
-    model = cp_model.CpModel()
-    
-    # เพิ่ม NS (บ่าย+ดึก 16 ชม.) เป็น OT shift, OC = On-Call Standby
-    shifts = ['S', 'M', 'N', 'O', 'L_T', 'NS', 'OC'] 
-    work_shifts = ['S', 'M', 'N', 'L_T', 'NS']  # NS นับเป็นวันทำงาน (OC ไม่นับ)
-    
-    # กลุ่มพยาบาลสำหรับเวร OC (On-Call วันที่ 1-10)
-    oc_hard_ban = ['ER1', 'ER7']      # Hard: ห้ามเด็ดขาด
-    oc_soft_avoid = ['ER4', 'ER8']    # Soft: ขอเลี่ยง (จัดให้คนอื่นก่อน)
-    oc_normal_pool = [n for n in nurses if n not in oc_hard_ban + oc_soft_avoid]
-
-    shifts_var = {}
-    for n in nurses:
-        for d in range(1, days_in_month + 1):
-            for s in shifts:
-                shifts_var[(n, d, s)] = model.NewBoolVar(f'shift_{n}_{d}_{s}')
-
-    # ==========================================
-    # 0. Cross-Month Constraints (ข้อมูลจากเดือนก่อน)
-    # ==========================================
-    if prev_month_data:
-        for n in nurses:
-            if n in prev_month_data and len(prev_month_data[n]) >= 1:
-                last_shift = prev_month_data[n][-1]  # เวรวันสุดท้ายของเดือนก่อน
-                
-                # ห้าม N/NS → M ข้ามเดือน (ทำดึกเดือนก่อน → ห้ามเช้าวันที่ 1)
-                if last_shift in ['N', 'NS']:
-                    model.Add(shifts_var[(n, 1, 'M')] == 0)
-                
-                # ห้าม S → N/NS ข้ามเดือน (ทำบ่ายเดือนก่อน → ห้ามดึกวันที่ 1)
-                if last_shift == 'S':
-                    model.Add(shifts_var[(n, 1, 'N')] == 0)
-                    model.Add(shifts_var[(n, 1, 'NS')] == 0)
-                
-                # ห้าม Off → N/NS ข้ามเดือน
-                if last_shift == 'O':
-                    model.Add(shifts_var[(n, 1, 'N')] == 0)
-                    model.Add(shifts_var[(n, 1, 'NS')] == 0)
-                    model.Add(shifts_var[(n, 1, 'OC')] == 0)
-            
-            # นับวันทำงานต่อเนื่องข้ามเดือน (กฎ 7 วันใน 8 วัน)
-            if n in prev_month_data and len(prev_month_data[n]) >= 7:
-                # นับจำนวนวันทำงานติดกันจากท้ายเดือนก่อน
-                consecutive_work = 0
-                for s in reversed(prev_month_data[n]):
-                    if s in ['S', 'M', 'N', 'L_T', 'NS']:
-                        consecutive_work += 1
-                    else:
-                        break  # หยุดนับเมื่อเจอวันหยุด
-                
-                # ถ้าทำงานติดกัน X วันท้ายเดือนก่อน → วันแรกๆ ของเดือนใหม่ต้องหยุด
-                if consecutive_work >= 7:
-                    # ทำงาน 7 วันติด → วันที่ 1 ต้องหยุด (Hard)
-                    for work_s in ['S', 'M', 'N', 'NS']:
-                        model.Add(shifts_var[(n, 1, work_s)] == 0)
-                elif consecutive_work >= 6:
-                    # ทำงาน 6 วันติด → วันที่ 1-2 ต้องมีหยุดอย่างน้อย 1 วัน
-                    model.Add(
-                        shifts_var[(n, 1, 'O')] + shifts_var[(n, 2, 'O')] >= 1
-                    )
-                elif consecutive_work >= 5:
-                    # ทำงาน 5 วันติด → วันที่ 1-3 ต้องมีหยุดอย่างน้อย 1 วัน  
-                    model.Add(
-                        shifts_var[(n, 1, 'O')] + shifts_var[(n, 2, 'O')] + shifts_var[(n, 3, 'O')] >= 1
-                    )
-
-    # ==========================================
-    # 1. กฎพื้นฐานและกำลังคน (Hard Constraints)
-    # ==========================================
-    for d in range(1, days_in_month + 1):
-        weekday = calendar.weekday(year, month, d)
-        is_weekend = weekday >= 5 
-
-        # สถานะเดียวต่อวัน
-        for n in nurses:
-            model.Add(sum(shifts_var[(n, d, s)] for s in shifts) == 1)
-
-        # กำลังคน (NS นับเป็นทั้ง S และ N)
-        # วันหยุดนักขัตฤกษ์ ต้องการคนเท่าวันเสาร์-อาทิตย์ (M=4)
-        is_special_day = is_weekend or is_holiday(year, month, d)
-        
-        # ค่า Default: N+NS >= 1, S+NS >= 2
-        n_req = 1
-        s_req = 2
-        
-        # ตรวจสอบ Override จาก staffing_overrides
-        for override in staffing_overrides:
-            if override.get('month') == month and override.get('year') == year:
-                if override.get('start', 1) <= d <= override.get('end', days_in_month):
-                    if override.get('shift') == 'N':
-                        n_req = override.get('count', 1)
-                    elif override.get('shift') == 'S':
-                        s_req = override.get('count', 2)
-        
-        # N + NS >= n_req (RELAXED - อย่างน้อย n_req คน)
-        model.Add(sum(shifts_var[(n, d, 'N')] + shifts_var[(n, d, 'NS')] for n in nurses) >= n_req)
-        # S + NS >= s_req (RELAXED - อย่างน้อย s_req คน)
-        model.Add(sum(shifts_var[(n, d, 'S')] + shifts_var[(n, d, 'NS')] for n in nurses) >= s_req)
-        req_m = 4 if is_special_day else 3  # เสาร์-อาทิตย์ หรือ วันหยุดนักขัตฤกษ์ = 4 คน
-        model.Add(sum(shifts_var[(n, d, 'M')] for n in nurses) >= req_m)  # RELAXED
-
-    # กฎการสลับเวร - SOFT (ควรหลีกเลี่ยง แต่ยอมได้ถ้าจำเป็น)
-    s_n_penalty = []
-    for n in nurses:
-        for d in range(1, days_in_month):
-            # S -> N (บ่ายตามด้วยดึก) - SOFT
-            pen_sn = model.NewBoolVar(f'sn_pen_{n}_{d}')
-            model.Add(shifts_var[(n, d, 'S')] + shifts_var[(n, d + 1, 'N')] <= 1 + pen_sn)
-            s_n_penalty.append(pen_sn)
-            
-            pen_sns = model.NewBoolVar(f'sns_pen_{n}_{d}')
-            model.Add(shifts_var[(n, d, 'S')] + shifts_var[(n, d + 1, 'NS')] <= 1 + pen_sns)
-            s_n_penalty.append(pen_sns)
-            
-            # N -> S (ดึกตามด้วยบ่าย) - SOFT
-            pen_ns = model.NewBoolVar(f'ns_pen_{n}_{d}')
-            model.Add(shifts_var[(n, d, 'N')] + shifts_var[(n, d + 1, 'S')] <= 1 + pen_ns)
-            s_n_penalty.append(pen_ns)
-            
-            pen_nss = model.NewBoolVar(f'nss_pen_{n}_{d}')
-            model.Add(shifts_var[(n, d, 'NS')] + shifts_var[(n, d + 1, 'S')] <= 1 + pen_nss)
-            s_n_penalty.append(pen_nss)
-    
-    # ห้าม S -> M -> N (บ่าย -> เช้า -> ดึก ใน 3 วันติด)
-    # เหตุผล: พัก 8hr-8hr เหนื่อยมาก
-    # แต่ช่วง OC อนุโลม เพราะ OC แค่ standby ไม่ได้ทำงานจริง (S→M→OC→N ได้)
-    s_m_n_penalty = []
-    for n in nurses:
-        for d in range(1, days_in_month - 1):
-            is_oc_period = enable_oc and d <= 10
-            
-            if is_oc_period:
-                # SOFT during OC period - allow but penalize
-                pen1 = model.NewBoolVar(f'smn_pen_{n}_{d}')
-                model.Add(shifts_var[(n, d, 'S')] + shifts_var[(n, d + 1, 'M')] + shifts_var[(n, d + 2, 'N')] <= 2 + pen1)
-                s_m_n_penalty.append(pen1)
-                
-                pen2 = model.NewBoolVar(f'smns_pen_{n}_{d}')
-                model.Add(shifts_var[(n, d, 'S')] + shifts_var[(n, d + 1, 'M')] + shifts_var[(n, d + 2, 'NS')] <= 2 + pen2)
-                s_m_n_penalty.append(pen2)
-            else:
-                # HARD for non-OC period
-                model.Add(shifts_var[(n, d, 'S')] + shifts_var[(n, d + 1, 'M')] + shifts_var[(n, d + 2, 'N')] <= 2)
-                model.Add(shifts_var[(n, d, 'S')] + shifts_var[(n, d + 1, 'M')] + shifts_var[(n, d + 2, 'NS')] <= 2)
-
-    # ==========================================
-    # กฎเวรดึก (N) เดี่ยว - ต้องทำงานก่อนดึก และหยุดหลังดึก
-    # ==========================================
-    o_before_n_penalty = []  # Soft: O → N ควรหลีกเลี่ยง
-    n_skip_day_penalty = []  # Soft: N-O-N ควรหลีกเลี่ยง
-    
-    n_consecutive_penalty = []  # Soft: N→N ในช่วง OC
-    
-    for n in nurses:
-        # 1. ห้าม N-N, NS-NS, N-NS, NS-N (ดึกติดกัน)
-        # - ช่วง OC (วันที่ 1-10): SOFT (ยอมได้ถ้าจำเป็น แต่หักคะแนน)
-        # - ช่วงอื่น (วันที่ 11+): HARD (ห้ามเด็ดขาด)
-        for d in range(1, days_in_month):
-            is_oc_period = enable_oc and d <= 10
-            
-            if is_oc_period:
-                # SOFT constraint during OC period - allow but penalize
-                pen_nn = model.NewBoolVar(f'nn_pen_{n}_{d}')
-                model.Add(shifts_var[(n, d, 'N')] + shifts_var[(n, d + 1, 'N')] <= 1 + pen_nn)
-                n_consecutive_penalty.append(pen_nn)
-                
-                pen_nsns = model.NewBoolVar(f'nsns_pen_{n}_{d}')
-                model.Add(shifts_var[(n, d, 'NS')] + shifts_var[(n, d + 1, 'NS')] <= 1 + pen_nsns)
-                n_consecutive_penalty.append(pen_nsns)
-                
-                pen_nns = model.NewBoolVar(f'nns_pen_{n}_{d}')
-                model.Add(shifts_var[(n, d, 'N')] + shifts_var[(n, d + 1, 'NS')] <= 1 + pen_nns)
-                n_consecutive_penalty.append(pen_nns)
-                
-                pen_nsn = model.NewBoolVar(f'nsn_pen_{n}_{d}')
-                model.Add(shifts_var[(n, d, 'NS')] + shifts_var[(n, d + 1, 'N')] <= 1 + pen_nsn)
-                n_consecutive_penalty.append(pen_nsn)
-            else:
-                # HARD constraint for non-OC period
-                model.Add(shifts_var[(n, d, 'N')] + shifts_var[(n, d + 1, 'N')] <= 1)
-                model.Add(shifts_var[(n, d, 'NS')] + shifts_var[(n, d + 1, 'NS')] <= 1)
-                model.Add(shifts_var[(n, d, 'N')] + shifts_var[(n, d + 1, 'NS')] <= 1)
-                model.Add(shifts_var[(n, d, 'NS')] + shifts_var[(n, d + 1, 'N')] <= 1)
-        
-        # 2. O-N, O-NS (ควรทำงานก่อนดึก) - SOFT (ลดจุด แต่ยอมได้ถ้าจำเป็น)
-        for d in range(1, days_in_month):
-            # สร้างตัวแปร penalty แทน hard constraint
-            penalty_on = model.NewBoolVar(f'o_n_penalty_{n}_{d}')
-            model.Add(shifts_var[(n, d, 'O')] + shifts_var[(n, d + 1, 'N')] <= 1 + penalty_on)
-            o_before_n_penalty.append(penalty_on)
-            
-            penalty_ons = model.NewBoolVar(f'o_ns_penalty_{n}_{d}')
-            model.Add(shifts_var[(n, d, 'O')] + shifts_var[(n, d + 1, 'NS')] <= 1 + penalty_ons)
-            o_before_n_penalty.append(penalty_ons)
-        
-        # 3. N-O-N, NS-O-NS (ควรหลีกเลี่ยงดึกสลับวัน) - SOFT
-        for d in range(1, days_in_month - 1):
-            pen1 = model.NewBoolVar(f'non_pen_{n}_{d}')
-            model.Add(shifts_var[(n, d, 'N')] + shifts_var[(n, d + 2, 'N')] <= 1 + pen1)
-            n_skip_day_penalty.append(pen1)
-            
-            pen2 = model.NewBoolVar(f'nson_pen_{n}_{d}')
-            model.Add(shifts_var[(n, d, 'NS')] + shifts_var[(n, d + 2, 'NS')] <= 1 + pen2)
-            n_skip_day_penalty.append(pen2)
-            
-            pen3 = model.NewBoolVar(f'n_ns_pen_{n}_{d}')
-            model.Add(shifts_var[(n, d, 'N')] + shifts_var[(n, d + 2, 'NS')] <= 1 + pen3)
-            n_skip_day_penalty.append(pen3)
-            
-            pen4 = model.NewBoolVar(f'ns_n_pen_{n}_{d}')
-            model.Add(shifts_var[(n, d, 'NS')] + shifts_var[(n, d + 2, 'N')] <= 1 + pen4)
-            n_skip_day_penalty.append(pen4)
-        
-        # 4. S-O-N, NS-O-N (ห้ามเย็น-Off-ดึก และ ดึกพิเศษ-Off-ดึก) - HARD
-        # เหตุผล: พักไม่พอ ทำเย็นแล้วหยุด 1 วัน แล้วมาดึก = เหนื่อยมาก
-        for d in range(1, days_in_month - 1):
-            # S-O-N: ห้ามทำ S วันที่ d แล้ว Off d+1 แล้ว N วันที่ d+2
-            model.Add(shifts_var[(n, d, 'S')] + shifts_var[(n, d + 1, 'O')] + shifts_var[(n, d + 2, 'N')] <= 2)
-            # S-O-NS: ห้ามทำ S วันที่ d แล้ว Off d+1 แล้ว NS วันที่ d+2
-            model.Add(shifts_var[(n, d, 'S')] + shifts_var[(n, d + 1, 'O')] + shifts_var[(n, d + 2, 'NS')] <= 2)
-            # NS-O-N: ห้ามทำ NS วันที่ d แล้ว Off d+1 แล้ว N วันที่ d+2
-            model.Add(shifts_var[(n, d, 'NS')] + shifts_var[(n, d + 1, 'O')] + shifts_var[(n, d + 2, 'N')] <= 2)
-            # NS-O-NS: ห้ามทำ NS วันที่ d แล้ว Off d+1 แล้ว NS วันที่ d+2
-            model.Add(shifts_var[(n, d, 'NS')] + shifts_var[(n, d + 1, 'O')] + shifts_var[(n, d + 2, 'NS')] <= 2)
-        
-        # 5. S-S-N, S-S-NS (ห้ามเย็น-เย็น-ดึก) - HARD
-        # เหตุผล: ทำบ่าย 2 วันติด แล้วมาดึก = ไม่เหมาะสม
-        for d in range(1, days_in_month - 1):
-            # S-S-N: ห้ามทำ S วันที่ d แล้ว S วันที่ d+1 แล้ว N วันที่ d+2
-            model.Add(shifts_var[(n, d, 'S')] + shifts_var[(n, d + 1, 'S')] + shifts_var[(n, d + 2, 'N')] <= 2)
-            # S-S-NS: ห้ามทำ S วันที่ d แล้ว S วันที่ d+1 แล้ว NS วันที่ d+2
-            model.Add(shifts_var[(n, d, 'S')] + shifts_var[(n, d + 1, 'S')] + shifts_var[(n, d + 2, 'NS')] <= 2)
-
-    # ==========================================
-    # กฎเวร NS (บ่าย+ดึก 16 ชม.) - OT Shift (ลดความซับซ้อน)
-    # ==========================================
-    nurses_for_ns = [n for n in nurses if n not in ['ER1', 'ER7']]  # ยกเว้น ER1, ER7
-    
-    for n in nurses_for_ns:
-        # NS ต้องห่างกันอย่างน้อย 4 วัน (ง่ายขึ้น)
-        for d in range(1, days_in_month - 3):
-            model.Add(shifts_var[(n, d, 'NS')] + shifts_var[(n, d + 1, 'NS')] + 
-                     shifts_var[(n, d + 2, 'NS')] + shifts_var[(n, d + 3, 'NS')] + 
-                     shifts_var[(n, d + 4, 'NS')] <= 1)
-        
-        # หลัง NS ควร Off วันถัดไป (1 วัน) - SOFT (ควรหลีกเลี่ยง แต่ยอมได้)
-        for d in range(1, days_in_month):
-            # NS วันที่ d → วันที่ d+1 ควรหยุด (SOFT)
-            for work_s in ['S', 'M', 'N', 'NS']:
-                pen_ns_work = model.NewBoolVar(f'ns_work_pen_{n}_{d}_{work_s}')
-                model.Add(shifts_var[(n, d, 'NS')] + shifts_var[(n, d + 1, work_s)] <= 1 + pen_ns_work)
-                o_before_n_penalty.append(pen_ns_work)  # reuse penalty list
-    
-    # ER1 และ ER7 ห้ามทำ NS
-    for d in range(1, days_in_month + 1):
-        model.Add(shifts_var[('ER1', d, 'NS')] == 0)
-        model.Add(shifts_var[('ER7', d, 'NS')] == 0)
-
-    # ทำงานต่อเนื่องสูงสุด 7 วัน ใน 8 วัน (รวม NS + ข้ามเดือน)
-    for n in nurses:
-        # กรณีปกติ: ใช้เฉพาะข้อมูลเดือนนี้
-        for d in range(1, days_in_month - 6):
-            model.Add(sum(sum(shifts_var[(n, d + k, s)] for s in work_shifts) for k in range(8)) <= 7)
-        
-        # กรณีข้ามเดือน: วันที่ 1-7 ต้องรวมข้อมูลจากเดือนก่อน
-        if prev_month_data and n in prev_month_data:
-            prev_shifts = prev_month_data[n]  # 7 วันสุดท้ายของเดือนก่อน
-            
-            for d in range(1, min(8, days_in_month + 1)):
-                days_from_prev = max(0, 8 - d)  # จำนวนวันที่ต้องดูจากเดือนก่อน
-                
-                if days_from_prev > 0 and days_from_prev <= len(prev_shifts):
-                    # นับวันทำงานจากเดือนก่อน
-                    prev_work_count = sum(
-                        1 for s in prev_shifts[-days_from_prev:] 
-                        if s in ['S', 'M', 'N', 'L_T', 'NS']
-                    )
-                    
-                    # จำกัดวันทำงานเดือนนี้ให้ไม่เกิน 7 - prev_work_count
-                    max_curr_work = max(0, 7 - prev_work_count)
-                    model.Add(
-                        sum(sum(shifts_var[(n, k, s)] for s in work_shifts) 
-                            for k in range(1, d + 1)) <= max_curr_work
-                    )
-    
-    # ป้องกัน NS หลังทำงานติด 6 วัน (เพราะ NS = 2 เวร จะทำให้เกิน 7 เวร)
-    for n in nurses_for_ns:
-        for d in range(7, days_in_month + 1):
-            # ถ้า 6 วันก่อนหน้าทำงานทั้งหมด แล้ววันนี้เป็น NS = 8 เวร (เกิน!)
-            # ดังนั้น ถ้าจะทำ NS ต้องมี Off อย่างน้อย 1 วันใน 6 วันก่อนหน้า
-            prev_work = sum(sum(shifts_var[(n, d - k, s)] for s in ['S', 'M', 'N', 'NS']) for k in range(1, 7))
-            # ถ้าทำงาน 6 วันก่อนหน้า (prev_work=6) แล้ว NS ห้าม
-            model.Add(prev_work + shifts_var[(n, d, 'NS')] <= 6)
-
-    # ==========================================
-    # กฎเวร OC (On-Call Standby) - เฉพาะวันที่ 1-10
-    # ==========================================
-    oc_avoid_penalty = []  # สำหรับ Soft Constraint ER4, ER8
-    
-    if enable_oc:
-        # วันที่ 1-10 ต้องมี OC อย่างน้อย 1 คน
-        for d in range(1, min(11, days_in_month + 1)):
-            model.Add(sum(shifts_var[(n, d, 'OC')] for n in nurses) >= 1)
-        
-        # วันที่ 11+ ห้ามมี OC
-        for d in range(11, days_in_month + 1):
-            for n in nurses:
-                model.Add(shifts_var[(n, d, 'OC')] == 0)
-        
-        # ER1, ER7 ห้ามทำ OC เด็ดขาด (Hard Constraint)
-        for d in range(1, days_in_month + 1):
-            for n in oc_hard_ban:
-                model.Add(shifts_var[(n, d, 'OC')] == 0)
-        
-        # กฎ OC - OC ต้องห่างกันอย่างน้อย 3 วัน
-        for n in nurses: # RE-ENABLED Partial
-            for d in range(1, min(10, days_in_month)):
-            #     # ห้าม OC ติดกัน (OC-OC)
-                model.Add(shifts_var[(n, d, 'OC')] + shifts_var[(n, d + 1, 'OC')] <= 1)
-                # ห้าม OC แล้วเช้า (OC-M)
-                model.Add(shifts_var[(n, d, 'OC')] + shifts_var[(n, d + 1, 'M')] <= 1)
-                # ห้าม Off แล้ว OC (O-OC) -- RELAXED
-                # model.Add(shifts_var[(n, d, 'O')] + shifts_var[(n, d + 1, 'OC')] <= 1)
-            
-            # OC ต้องห่างกันอย่างน้อย 3 วัน (ในช่วง 1-10)
-            # แก้ไข: Loop ถึงแค่วันที่ d+3 ยังอยู่ในเดือน
-            for d in range(1, min(8, days_in_month - 3 + 1)):
-                model.Add(shifts_var[(n, d, 'OC')] + shifts_var[(n, d + 1, 'OC')] + 
-                         shifts_var[(n, d + 2, 'OC')] + shifts_var[(n, d + 3, 'OC')] <= 1)
-        
-        # ER4, ER8 ขอเลี่ยง (Soft Constraint - ลด penalty ใน objective)
-        for d in range(1, min(11, days_in_month + 1)):
-            for n in oc_soft_avoid:
-                oc_avoid_penalty.append(shifts_var[(n, d, 'OC')])
-    else:
-        # ถ้าปิด OC → ห้ามทุกคนทำ OC
-        for d in range(1, days_in_month + 1):
-            for n in nurses:
-                model.Add(shifts_var[(n, d, 'OC')] == 0)
-
-    # ==========================================
-    # 2. เงื่อนไขรายบุคคล (Preferences & Fix)
-    # ==========================================
-    preferred_constraints = [] 
-    er7_m_shifts = []
-    er7_sn_shifts = []
-
-    for d in range(1, days_in_month + 1):
-        wd = calendar.weekday(year, month, d)
-        week_occurrence = get_week_occurrence(d)
-
-        # ER1 (Hard Fix): จ-พฤ NCD, ศุกร์ M, ส-อา หยุด, วันหยุดนักขัตฤกษ์ หยุด
-        is_hol = is_holiday(year, month, d)
-        if is_hol or wd in [5, 6]:  # วันหยุดนักขัตฤกษ์ หรือ ส-อา = หยุด
-            model.Add(shifts_var[('ER1', d, 'O')] == 1)
-        elif wd in [0, 1, 2, 3]:  # จ-พฤ = NCD (แสดงเป็น O ในตาราง)
-            model.Add(shifts_var[('ER1', d, 'O')] == 1)
-        elif wd == 4:  # ศุกร์ = M
-            model.Add(shifts_var[('ER1', d, 'M')] == 1)
+        print(f"Error recording solve history: {e}")
 
-        # ER3 (Soft Fix): วันพุธ พฤหัส ทุกสัปดาห์ (เท่าที่ได้ ไม่เบียดเบียนผู้อื่น)
-        if wd in [2, 3]:  # วันพุธ = 2, วันพฤหัส = 3
-            preferred_constraints.append(shifts_var[('ER3', d, 'M')])
 
-        # [REMOVED] ER5 & ER10 pattern - User จะใช้ฟังก์ชัน Fix เวรแทน
+@st.cache_resource
+def get_solve_cache():
+    """cache ผลการจัดตาราง ใช้ร่วมกันทุก session และอยู่รอดหลัง restart (เก็บใน SOLVE_CACHE_DIR)"""
+    return SolveCache(max_entries=32, cache_dir=SOLVE_CACHE_DIR)
 
-        # [REMOVED] ER9 Hardcode - ใช้ fix_requests จาก UI แทน
-        # ตอนนี้ ER9 (และคนอื่น) สามารถขอเวร Fix ผ่าน UI ได้
-
-        er7_m_shifts.append(shifts_var[('ER7', d, 'M')])
-        er7_sn_shifts.append(shifts_var[('ER7', d, 'S')])
-        er7_sn_shifts.append(shifts_var[('ER7', d, 'N')])
-
-    # ER7 (Relaxed): เช้า+ลา ไม่เกิน 10 (รวมวันลา/ประชุมด้วย), บ่าย+ดึก ไม่เกิน 10
-    er7_lt_shifts = [shifts_var[('ER7', d, 'L_T')] for d in range(1, days_in_month + 1)]
-    model.Add(sum(er7_m_shifts) + sum(er7_lt_shifts) <= 10)  # M + ลา/ประชุม <= 10 (RELAXED)
-    model.Add(sum(er7_sn_shifts) <= 10)  # S+N ไม่เกิน 10
-    
-    # ER7 ดึก (N) สูงสุด 4 เวร/เดือน
-    er7_n_shifts = [shifts_var[('ER7', d, 'N')] for d in range(1, days_in_month + 1)]
-    model.Add(sum(er7_n_shifts) <= 4)  # N ไม่เกิน 4
-
-    # ==========================================
-    # 2.1 ขอเวร Fix จาก UI (Dynamic Shift Fix Requests)
-    # ==========================================
-    for req in fix_requests:
-        if req.get('month') == month and req.get('year') == year:
-            nurse = req.get('nurse')
-            shift = req.get('shift')
-            dates = req.get('dates', [])
-            if nurse in nurses and shift in ['M', 'S', 'N']:
-                for d in dates:
-                    if 1 <= d <= days_in_month:
-                        preferred_constraints.append(shifts_var[(nurse, d, shift)])
-
-    # สร้าง set ของ (nurse, date) ที่อนุญาตให้มี L_T
-    allowed_lt = set()
-    
-    # จัดการคำขอ (Requests)
-    for req in requests:
-        # FIX: ตรวจสอบว่าเป็นของเดือน/ปี ปัจจุบันหรือไม่?
-        # (ต้องใช้ .get() เผื่อข้อมูลเก่าไม่มี key month/year)
-        req_month = req.get('month', month) 
-        req_year = req.get('year', year)
-        
-        if req_month == month and req_year == year: # ต้องตรงกันเป๊ะๆ ถึงจะเอามาคิด
-           if req['nurse'] in nurses:
-                if req['type'] == 'Off':
-                    # SOFT: พยายามให้หยุดตามขอ แต่ถ้าคนไม่พอ อาจจัดเวรให้แทน
-                    # น้ำหนักตามลำดับ: priority 1 = 10 repeats, priority 2 = 9, ... priority 10 = 1
-                    priority = req.get('priority', 1)
-                    weight = max(1, 11 - priority)  # priority 1 → weight 10, priority 10 → weight 1
-                    for _ in range(weight):
-                        preferred_constraints.append(shifts_var[(req['nurse'], req['date'], 'O')])
-                elif req['type'] == 'Leave_Train':
-                    model.Add(shifts_var[(req['nurse'], req['date'], 'L_T')] == 1)
-                    allowed_lt.add((req['nurse'], req['date']))
-    
-    # FIX: ห้าม L_T ถ้าไม่มีคำขอลา - ป้องกัน solver จัดเวร "ลา/อบรม" เองโดยไม่มีคำขอ
-    for n in nurses:
-        for d in range(1, days_in_month + 1):
-            if (n, d) not in allowed_lt:
-                model.Add(shifts_var[(n, d, 'L_T')] == 0)
-
-    # ==========================================
-    # 3. ระบบเกลี่ยเวร (Fairness Logic)
-    # ==========================================
-    
-    # กลุ่มที่ต้องเกลี่ยเวรรวม (ตัด ER1 และ ER7 ออกจากเวรรวม เพราะมี M fix)
-    rotating_nurses = [n for n in nurses if n not in ['ER1', 'ER7']]
-    # กลุ่มที่ต้องเกลี่ยเวร S/N (รวม ER7 เพื่อให้ S และ N เท่ากัน)
-    nurses_for_sn_fairness = [n for n in nurses if n not in ['ER1']]
-    
-    total_work_per_nurse = {}
-    
-    for n in rotating_nurses:
-        # นับรวม M, S, N, L_T
-        total_work_per_nurse[n] = sum(sum(shifts_var[(n, d, s)] for s in work_shifts) for d in range(1, days_in_month + 1))
-
-    # กฎบังคับ: เวรรวมห้ามต่างกันเกิน 1 (เพื่อความแฟร์สูงสุด)
-    for n1 in rotating_nurses:
-        for n2 in rotating_nurses:
-            if n1 == n2: continue
-            model.Add(total_work_per_nurse[n1] - total_work_per_nurse[n2] <= 1)
-    
-    # ==========================================
-    # 3.1 วันหยุดของแต่ละคน = วันหยุดของเดือน (เสาร์-อาทิตย์ + นักขัตฤกษ์)
-    # ==========================================
-    # คำนวณจำนวนวันหยุดในเดือน
-    weekend_count = sum(1 for d in range(1, days_in_month + 1) if calendar.weekday(year, month, d) >= 5)
-    holiday_count = len([d for d in THAI_HOLIDAYS.get(year, {}).get(month, []) 
-                        if calendar.weekday(year, month, d) < 5])  # นับเฉพาะวันหยุดที่ไม่ตรงกับ ส-อา
-    target_off_days = weekend_count + holiday_count
-    
-    # กำหนดให้ทุกคน (ยกเว้น ER1) มีวันหยุดใกล้เคียงกับ target (±1)
-    for n in rotating_nurses:
-        off_days = sum(shifts_var[(n, d, 'O')] for d in range(1, days_in_month + 1))
-        # RELAXED: Off อนุญาตให้ต่างจาก target ได้ ±1 วัน
-        model.Add(off_days >= target_off_days - 1)
-        model.Add(off_days <= target_off_days + 1)
-    
-    # ==========================================
-    # 3.2 เกลี่ยวันหยุดพิเศษ (ส-อา + นักขัตฤกษ์) ให้ทุกคนได้หมุนเวียนเท่ากัน
-    # ==========================================
-    # สร้าง list วันพิเศษ (ส-อา + นักขัตฤกษ์)
-    special_days = [d for d in range(1, days_in_month + 1) 
-                    if calendar.weekday(year, month, d) >= 5 or is_holiday(year, month, d)]
-    
-    # นับ special day offs ของแต่ละคน (เฉพาะ 'O' เท่านั้น ไม่นับ L_T)
-    special_offs_per_nurse = {}
-    for n in rotating_nurses:
-        special_offs_per_nurse[n] = sum(shifts_var[(n, d, 'O')] for d in special_days)
-    
-    # RELAXED: เกลี่ยให้ต่างกันไม่เกิน 1 (ยืดหยุ่นขึ้น)
-    for n1 in rotating_nurses:
-        for n2 in rotating_nurses:
-            if n1 != n2:
-                model.Add(special_offs_per_nurse[n1] - special_offs_per_nurse[n2] <= 1)
-    
-    # ==========================================
-    # 4. เกลี่ยเวรบ่าย (S) และดึก (N) แยกกัน ต่างกันไม่เกิน 1
-    # ==========================================
-    s_shifts_per_nurse = {}
-    n_shifts_per_nurse = {}
-    
-    for n in nurses_for_sn_fairness:
-        # NS นับเป็นทั้ง S และ N
-        s_shifts_per_nurse[n] = sum(shifts_var[(n, d, 'S')] + shifts_var[(n, d, 'NS')] for d in range(1, days_in_month + 1))
-        n_shifts_per_nurse[n] = sum(shifts_var[(n, d, 'N')] + shifts_var[(n, d, 'NS')] for d in range(1, days_in_month + 1))
-    
-    # เวรบ่าย (S) ต่างกันไม่เกิน 1
-    for n1 in nurses_for_sn_fairness:
-        for n2 in nurses_for_sn_fairness:
-            if n1 == n2: continue
-            model.Add(s_shifts_per_nurse[n1] - s_shifts_per_nurse[n2] <= 1)
-    
-    # เวรดึก (N) ต่างกันไม่เกิน 1
-    for n1 in nurses_for_sn_fairness:
-        for n2 in nurses_for_sn_fairness:
-            if n1 == n2: continue
-            model.Add(n_shifts_per_nurse[n1] - n_shifts_per_nurse[n2] <= 1)
-
-    # ==========================================
-    # 5. Soft Constraint: หลัง N ควร Off 2 วัน (ยกเว้น ER3)
-    # ==========================================
-    off_after_night_constraints = []
-    nurses_for_off_rule = [n for n in nurses if n not in ['ER1', 'ER3']]  # ยกเว้น ER1 (สัญญาพิเศษ) และ ER3
-    
-    for n in nurses_for_off_rule:
-        for d in range(1, days_in_month - 1):  # ต้องเหลือ 2 วันหลัง N
-            # ถ้าทำ N วันที่ d แล้ว Off d+1 และ Off d+2 = ดี (ให้คะแนน)
-            off_after_night_constraints.append(shifts_var[(n, d + 1, 'O')])
-    
-    # ==========================================
-    # 6. Soft Constraint: พยายามให้หยุด 2 วันติดกัน (O-O)
-    # ==========================================
-    consecutive_off_constraints = []
-    for n in rotating_nurses:
-        for d in range(1, days_in_month):
-            # ให้คะแนนเมื่อมี O-O ติดกัน
-            consecutive_off_constraints.append(shifts_var[(n, d, 'O')] + shifts_var[(n, d + 1, 'O')])
-    
-    # ==========================================
-    # 7. Soft Constraint: Separation - หลีกเลี่ยงคู่พยาบาลขึ้นเวรเดียวกัน
-    # ==========================================
-    separation_pairs = [('ER2', 'ER7')]  # คู่ที่ต้องการแยก
-    separation_penalty = []
-    
-    for (n1, n2) in separation_pairs:
-        if n1 in nurses and n2 in nurses:
-            for d in range(1, days_in_month + 1):
-                for shift in ['S', 'M', 'N']:  # เวรบ่าย, เช้า, ดึก
-                    # สร้างตัวแปรสำหรับเช็คว่าซ้อนกันหรือไม่
-                    same_shift = model.NewBoolVar(f'same_{n1}_{n2}_{d}_{shift}')
-                    # ถ้าทั้งคู่ทำเวรเดียวกัน same_shift = 1
-                    model.Add(shifts_var[(n1, d, shift)] + shifts_var[(n2, d, shift)] <= 1 + same_shift)
-                    model.Add(shifts_var[(n1, d, shift)] + shifts_var[(n2, d, shift)] >= 2 * same_shift)
-                    separation_penalty.append(same_shift)
-    
-    # รวม soft constraints ทั้งหมดเข้าด้วยกัน
-    # น้ำหนัก: preferred_constraints (M fix) > separation > N→N (OC) > O→N penalty > S→M→N (OC) > N-O-N penalty > consecutive_off > off_after_night > oc_avoid
-    model.Maximize(
-        sum(preferred_constraints) * 100 + 
-        sum(consecutive_off_constraints) * 5 +
-        sum(off_after_night_constraints) -
-        sum(separation_penalty) * 30 -  # ลบคะแนนเมื่อ ER2-ER7 ซ้อนเวรกัน
-        sum(n_consecutive_penalty) * 25 -  # ลบคะแนนเมื่อ N→N ในช่วง OC (ควรหลีกเลี่ยง)
-        sum(oc_avoid_penalty) * 20 -  # ลบคะแนนเมื่อ ER4, ER8 ทำ OC
-        sum(s_n_penalty) * 18 -  # ลบคะแนนเมื่อ S→N หรือ N→S (ควรหลีกเลี่ยง)
-        sum(o_before_n_penalty) * 15 -  # ลบคะแนนเมื่อ O→N (ควรหลีกเลี่ยง)
-        sum(s_m_n_penalty) * 12 -  # ลบคะแนนเมื่อ S→M→N ในช่วง OC
-        sum(n_skip_day_penalty) * 10  # ลบคะแนนเมื่อ N-O-N (ดึกสลับวัน)
-    )
-
-    # Solve
-    solver = cp_model.CpSolver()
-    solver.parameters.max_time_in_seconds = 20.0
-    status = solver.Solve(model)
-
-    if status in [cp_model.OPTIMAL, cp_model.FEASIBLE]:
-        schedule_data = []
-        for n in nurses:
-            # แสดง ID + ชื่อจริง
-            display_name = f"{n} ({NURSE_NAMES.get(n, '')})"
-            row = {'Nurse': display_name}
-            for d in range(1, days_in_month + 1):
-                for s in shifts:
-                    if solver.Value(shifts_var[(n, d, s)]):
-                        display = s if s not in ['O'] else ""
-                        if s == 'L_T': display = "ลา/อบรม"
-                        if s == 'NS': display = "NS"  # แสดง NS (บ่าย+ดึก)
-                        if s == 'OC': display = "📞OC"  # แสดง On-Call
-                        if n == 'ER1' and s == 'O': 
-                            wd = calendar.weekday(year, month, d)
-                            if wd in [0, 1, 2, 3]: display = "NCD"
-                        row[str(d)] = display
-                        break
-            schedule_data.append(row)
-        return pd.DataFrame(schedule_data)
-    else:
-        return None
 
 # --- UI Setup ---
 st.set_page_config(page_title="ระบบจัดตารางเวร ER_KPH v2.6", layout="wide")
@@ -1009,14 +101,204 @@ if not check_password():
 st.title("🏥 ระบบจัดตารางเวรพยาบาล (ER_KPH)")
 st.caption("**v2.4** | 🆕 ผ่อนคลาย Constraints | Debug ตารางคำขอ | ขอเวร Fix ผ่าน UI | 🔐 Protected")
 
+@st.fragment(run_every=1.0)
+def solve_progress_panel():
+    """แสดงความคืบหน้าของงาน solve ที่รันอยู่ (อัปเดตทุก 1 วินาที เฉพาะส่วนนี้)"""
+    info = st.session_state.solve_job
+    job = info['job']
+    if job.poll():
+        st.session_state.solve_job = None
+        record_solve_history(job.stats, info['month'], info['nurses'], info['cache_key'],
+                             solve_outcome(job.stats, cancelled=job.cancelled, error=job.error))
+        result_df = job.result
+        if result_df is not None:
+            st.session_state.schedule_df = result_df
+            st.session_state.schedule_month = info['month']
+            if job.cancelled:
+                st.session_state.solve_message = f"หยุดแล้ว ใช้ตารางที่ดีที่สุดที่หาได้ใน {job.elapsed:.0f} วินาที"
+            else:
+                get_solve_cache().put(info['cache_key'], cache_entry(result_df, job.stats))
+                st.session_state.solve_message = f"จัดตารางสำเร็จ! ({job.elapsed:.0f} วินาที)"
+        else:
+            if job.error:
+                print(f"Solve job failed: {job.error}")
+            st.session_state.solve_failed_month = info['month']
+        st.rerun()
+
+    progress = job.progress
+    st.info(f"⏳ กำลังคำนวณและเกลี่ยเวร... {job.elapsed:.0f} วินาที")
+    col1, col2 = st.columns(2)
+    with col1:
+        st.metric("คะแนนดีที่สุด", "-" if progress['objective'] is None else f"{progress['objective']:,.0f}")
+    with col2:
+        st.metric("ขอบเขตบน (Bound)", "-" if progress['best_bound'] is None else f"{progress['best_bound']:,.0f}")
+    st.caption(f"พบคำตอบแล้ว {progress['solutions']} ครั้ง")
+    if st.button("⏹️ หยุดและใช้คำตอบที่ดีที่สุดตอนนี้", disabled=job.cancelled):
+        job.cancel()
+    if job.best_schedule is not None:
+        # ตารางดีที่สุดตอนนี้ (ยังปรับปรุงต่อ) ให้ดูก่อนได้เลย
+        with st.expander("👀 ตารางล่าสุด (กำลังปรับปรุง)", expanded=True):
+            st.dataframe(job.best_schedule, hide_index=True)
+
+
+def render_solve_failure():
+    """แสดงผลวิเคราะห์เมื่อจัดตารางไม่ได้ + ตารางสรุปคำขอ (Debug)"""
+    st.error("❌ ไม่สามารถจัดตารางได้! (เงื่อนไขขัดแย้งกัน)")
+
+    strict_requests = st.checkbox(
+        "ตรวจคำขอหยุด/Fix ด้วย (ถือว่าทุกคำขอต้องได้ตามขอ)", value=False, key="explain_strict",
+        help="ปกติคำขอหยุด/Fix เป็น Soft (ไม่ทำให้จัดไม่ได้) เปิดเพื่อดูว่าคำขอชุดไหนให้พร้อมกันทั้งหมดไม่ได้"
+    )
+    explain_args = (year, month, days_in_month, nurses_list, st.session_state.requests,
+                    st.session_state.fix_requests, st.session_state.staffing_overrides)
+    explain_key = (solve_cache_key(*explain_args, enable_oc=enable_oc, prev_month_data=prev_month_data,
+                                   ward_config=ward_config), strict_requests)
+    # หาสาเหตุจากโมเดลจริงครั้งเดียวต่อชุด input (rerun ไม่ต้อง solve ซ้ำ)
+    cached = st.session_state.get('solve_explanation')
+    if cached is None or cached[0] != explain_key:
+        with st.spinner("🔍 กำลังหาชุดกฎ/คำขอที่ขัดกัน..."):
+            explanation = explain_infeasibility(*explain_args, enable_oc=enable_oc,
+                                                prev_month_data=prev_month_data,
+                                                strict_requests=strict_requests, ward_config=ward_config)
+        st.session_state.solve_explanation = (explain_key, explanation)
+    explanation = st.session_state.solve_explanation[1]
+
+    if explanation['status'] == 'infeasible' and explanation['conflicts']:
+        st.error(f"⚠️ กฎ/คำขอต่อไปนี้ขัดกันเอง (ตัดข้อใดข้อหนึ่งออกก็จัดได้) "
+                 f"— ตรวจใน {explanation['wall_time']:.1f} วินาที")
+        st.markdown("\n".join(f"*   {c['label']}" for c in explanation['conflicts']))
+    elif explanation['status'] == 'feasible':
+        st.warning("💡 เงื่อนไข Hard ไม่ขัดกัน แต่หาคำตอบไม่ทันเวลา ลองเพิ่มเวลาคำนวณ หรือเปิด Warm start")
+    else:
+        st.warning("💡 หาสาเหตุไม่สำเร็จภายในเวลาที่กำหนด")
+
+    # วิเคราะห์แบบเดิม (นับจำนวนคนต่อวัน)
+    issues = diagnose_scheduling_issues(
+        year, month, days_in_month, nurses_list,
+        st.session_state.requests, st.session_state.staffing_overrides, enable_oc
+    )
+
+    if issues:
+        with st.expander("📊 วิเคราะห์จำนวนคนต่อวัน"):
+            # Generate and display detailed report
+            report_md = generate_diagnosis_md(issues)
+            st.markdown(report_md)
+
+            st.json(issues)
+
+    # ==========================================
+    # DEBUG: แสดงตารางสรุปคำขอทั้งหมด
+    # ==========================================
+    st.markdown("---")
+    st.subheader("📋 สรุปคำขอทั้งหมด (Debug)")
+
+    # สร้างตารางแสดงคำขอ
+    debug_data = []
+
+    # 1. วันลา/ประชุม (Leave_Train)
+    for req in st.session_state.requests:
+        if req.get('month') == month and req.get('year') == year:
+            if req.get('type') == 'Leave_Train':
+                debug_data.append({
+                    'พยาบาล': req.get('nurse'),
+                    'วันที่': req.get('date'),
+                    'ประเภท': '📝 ลา/ประชุม (L_T)',
+                    'หมายเหตุ': req.get('reason', '-')
+                })
+
+    # 2. ขอหยุด (Off)
+    for req in st.session_state.requests:
+        if req.get('month') == month and req.get('year') == year:
+            if req.get('type') == 'Off':
+                debug_data.append({
+                    'พยาบาล': req.get('nurse'),
+                    'วันที่': req.get('date'),
+                    'ประเภท': '🚫 ขอหยุด (Off)',
+                    'หมายเหตุ': req.get('reason', '-')
+                })
+
+    # 3. ขอเวร Fix
+    for req in st.session_state.fix_requests:
+        if req.get('month') == month and req.get('year') == year:
+            dates = req.get('dates', [])
+            for d in dates:
+                debug_data.append({
+                    'พยาบาล': req.get('nurse'),
+                    'วันที่': d,
+                    'ประเภท': f"📌 Fix เวร {req.get('shift')}",
+                    'หมายเหตุ': f"ขอเวร {req.get('shift')}"
+                })
+
+    if debug_data:
+        # เรียงตามวันที่
+        debug_df = pd.DataFrame(debug_data)
+        debug_df = debug_df.sort_values(by=['วันที่', 'พยาบาล'])
+        st.dataframe(debug_df, hide_index=True, use_container_width=True)
+
+        # สรุปรายวัน (หาวันที่มีหลายคนขอ)
+        st.markdown("### 🔍 วันที่มีคำขอหลายรายการ")
+        day_counts = debug_df.groupby('วันที่').size().reset_index(name='จำนวนคำขอ')
+        multi_request_days = day_counts[day_counts['จำนวนคำขอ'] > 1]
+        if not multi_request_days.empty:
+            for _, row in multi_request_days.iterrows():
+                d = row['วันที่']
+                count = row['จำนวนคำขอ']
+                day_detail = debug_df[debug_df['วันที่'] == d]
+                nurses_str = ", ".join(f"{r['พยาบาล']}({r['ประเภท'].split()[0]})" for _, r in day_detail.iterrows())
+                st.warning(f"📅 **วันที่ {d}**: {count} คำขอ → {nurses_str}")
+        else:
+            st.success("✅ ไม่มีวันที่มีคำขอซ้ำซ้อน")
+
+        # หาคนที่มีคำขอซ้อนกัน (ขอ Off แต่ก็ขอ Fix ด้วย)
+        st.markdown("### ⚠️ ตรวจสอบคำขอที่ขัดกัน")
+        conflicts = []
+        for nurse in nurses_list:
+            nurse_reqs = debug_df[debug_df['พยาบาล'] == nurse]
+            for d in nurse_reqs['วันที่'].unique():
+                day_reqs = nurse_reqs[nurse_reqs['วันที่'] == d]
+                if len(day_reqs) > 1:
+                    types = day_reqs['ประเภท'].tolist()
+                    conflicts.append({
+                        'พยาบาล': nurse,
+                        'วันที่': d,
+                        'คำขอ': " + ".join(types)
+                    })
+
+        if conflicts:
+            for c in conflicts:
+                st.error(f"❌ **{c['พยาบาล']}** วันที่ {c['วันที่']}: {c['คำขอ']}")
+        else:
+            st.success("✅ ไม่มีคำขอที่ขัดกัน (คนเดียวกันวันเดียวกัน)")
+    else:
+        st.info("ไม่มีคำขอใดๆ ในเดือนนี้")
+
+
 # Session State
 if 'schedule_df' not in st.session_state: st.session_state.schedule_df = None
-if 'requests' not in st.session_state: 
-    st.session_state.requests = load_requests_from_csv()
-if 'fix_requests' not in st.session_state:
-    st.session_state.fix_requests = load_fix_requests_from_csv()
-if 'staffing_overrides' not in st.session_state:
-    st.session_state.staffing_overrides = load_staffing_overrides_from_csv()
+if 'schedule_month' not in st.session_state: st.session_state.schedule_month = None  # (year, month) ของ schedule_df
+if 'solve_job' not in st.session_state: st.session_state.solve_job = None  # งาน solve ที่กำลังรัน (process แยก)
+if 'solve_message' not in st.session_state: st.session_state.solve_message = None
+if 'solve_failed_month' not in st.session_state: st.session_state.solve_failed_month = None
+if 'requests_month' not in st.session_state:
+    # คำขอเก็บใน SQLite (ครั้งแรกย้ายจาก CSV เดิมให้) โหลดเฉพาะเดือนที่กำลังจัดใน sidebar
+    migrate_csv_requests(REQUESTS_DB)
+    st.session_state.requests_month = None
+if 'requests_version' not in st.session_state: st.session_state.requests_version = 0
+
+
+def reload_requests(year, month):
+    """โหลดคำขอของเดือน year/month จากฐานข้อมูล (รวมที่คนอื่นเพิ่งเพิ่ม)
+
+    request_rows = แถวพร้อม id (ใช้แก้/ลบรายแถว), requests / fix_requests / staffing_overrides = ส่งให้ solver
+    """
+    st.session_state.request_rows = {
+        kind: load_stored_requests(kind, year, month, REQUESTS_DB, with_ids=True)
+        for kind in ['requests', 'fix_requests', 'staffing_overrides']
+    }
+    for kind, rows in st.session_state.request_rows.items():
+        st.session_state[kind] = [{k: v for k, v in r.items() if k != 'id'} for r in rows]
+    st.session_state.requests_month = (year, month)
+    st.session_state.requests_version += 1  # editor ตัวใหม่ (ไม่ใช้การแก้ไขค้างของข้อมูลชุดเก่า)
 
 # Sidebar
 with st.sidebar:
@@ -1024,25 +306,62 @@ with st.sidebar:
     year = st.number_input("ปี (ค.ศ.)", 2024, 2030, 2025)
     month = st.selectbox("เดือน", range(1, 13), 10)
     _, days_in_month = calendar.monthrange(year, month)
-    nurses_list = [f'ER{i}' for i in range(1, 11)]
+    # ค่ากฎของวอร์ด (scheduler/wards/<ward>.json): รายชื่อ, เวรประจำ, กำลังคน, น้ำหนัก ฯลฯ
+    wards = list_wards()
+    ward_name = st.selectbox("วอร์ด", wards,
+                             index=wards.index(DEFAULT_WARD_CONFIG) if DEFAULT_WARD_CONFIG in wards else 0)
+    ward_config = load_ward_config(ward_name)
+    nurses_list = ward_config.nurses
+    if st.session_state.requests_month != (year, month):
+        reload_requests(year, month)
     
     st.markdown("---")
     st.header("📞 เวร On-Call (OC)")
-    enable_oc = st.checkbox("เปิดใช้งานเวร On-Call (วันที่ 1-10)", value=False, 
-                            help="เวร OC = Standby ดึก 400 บาท/เวร | ER1,ER7 ห้ามทำ | ER4,ER8 ขอเลี่ยง")
+    enable_oc = st.checkbox(f"เปิดใช้งานเวร On-Call (วันที่ 1-{ward_config.oc_last_day})", value=False,
+                            help=f"เวร OC = Standby ดึก 400 บาท/เวร | {','.join(ward_config.oc_hard_ban) or '-'} ห้ามทำ"
+                                 f" | {','.join(ward_config.oc_soft_avoid) or '-'} ขอเลี่ยง")
+    
+    st.markdown("---")
+    with st.expander("🧠 ตั้งค่า Solver"):
+        cpu_count = os.cpu_count() or 1
+        solver_workers = st.number_input("จำนวน CPU core (worker)", min_value=1, max_value=cpu_count,
+                                         value=cpu_count, help="ยิ่งมาก ยิ่งค้นหาได้หลายแนวทางพร้อมกัน")
+        solver_time_limit = st.number_input("เวลาสูงสุด (วินาที)", min_value=1.0, max_value=300.0,
+                                            value=float(DEFAULT_SOLVER_PARAMS['time_limit']), step=5.0)
+        solver_deterministic = st.checkbox("โหมดผลลัพธ์คงที่ (Deterministic)", value=False,
+                                           help="input เดิม → ตารางเดิมทุกครั้ง (ใช้ seed คงที่) | นับเวลาแบบ deterministic จึงอาจใช้เวลาจริงนานกว่าที่ตั้ง")
+        solver_seed = st.number_input("Random seed", min_value=0, max_value=1_000_000, value=None, step=1,
+                                      placeholder="ไม่ระบุ",
+                                      help="ไม่ระบุ = ค่า default ของ CP-SAT (โหมดผลลัพธ์คงที่ใช้ 42) | "
+                                           "ใช้ได้ทั้งสองโหมด เปลี่ยน seed = ลองค้นหาแนวทางอื่น")
+        use_automaton = st.checkbox("กฎลำดับเวรแบบตาราง (Automaton)",
+                                    value=DEFAULT_SEQUENCE_ENCODING == 'automaton',
+                                    help="เขียนกฎ S→N, N→N, S-M-N, S-O-N ฯลฯ เป็นตารางการเปลี่ยนเวร โมเดลเล็กลง ~3 เท่า "
+                                         "มักได้คะแนนดีกว่าในเวลาเท่ากัน แต่วอร์ดใหญ่อาจเจอตารางแรกช้ากว่า")
+    sequence_encoding = 'automaton' if use_automaton else 'linear'
+    solver_params = {
+        'time_limit': solver_time_limit,
+        'num_workers': solver_workers,
+        'deterministic': solver_deterministic,
+        'random_seed': solver_seed,
+    }
     
     st.markdown("---")
     st.header("📂 ตารางเดือนก่อน")
-    st.caption("Upload ไฟล์ CSV ตารางเดือนก่อน เพื่อใช้กฎข้ามเดือน (N→M, S→N)")
+    st.caption("Upload ไฟล์ CSV ตารางเดือนก่อน เพื่อใช้กฎข้ามเดือน (N→M, S→N) "
+               "ถ้าไม่ระบุ จะใช้ตารางเดือนก่อนจากคลังให้อัตโนมัติ (ถ้ามี)")
     
-    tab_upload, tab_manual = st.tabs(["📂 Upload CSV", "✍️ Manual Entry"])
+    tab_upload, tab_manual, tab_archive = st.tabs(["📂 Upload CSV", "✍️ Manual Entry", "🗄️ จากคลัง"])
     prev_month_data = None
 
     with tab_upload:
         prev_month_file = st.file_uploader("เลือกไฟล์ CSV", type=['csv'], key="prev_month_upload")
         
         if prev_month_file is not None:
-            prev_month_data = parse_previous_month_schedule(prev_month_file, nurses_list)
+            prev_report = CsvReport(prev_month_file.name)
+            prev_month_data = parse_previous_month_schedule(prev_month_file, nurses_list, prev_report)
+            if prev_report.bad_rows:
+                st.warning(f"⚠️ {prev_report.summary()}")
             if prev_month_data:
                 st.success(f"✅ อ่านข้อมูล {len(prev_month_data)} พยาบาล")
                 # แสดงเวรวันสุดท้ายของแต่ละคน
@@ -1094,6 +413,20 @@ with st.sidebar:
                         shifts.append('O') # Default to Off if invalid
                 prev_month_data[nurse_id] = shifts
             st.info(f"ใช้ข้อมูล Manual Entry สำหรับ {len(prev_month_data)} พยาบาล")
+
+    with tab_archive:
+        # ต่อเวรท้ายเดือนก่อนจากคลังตาราง (ใช้เมื่อไม่ได้ Upload / Manual)
+        archived_prev = carry_over_from_archive(ARCHIVE_DIR, ward_config.ward, year, month)
+        if archived_prev is None:
+            st.caption("ยังไม่มีตารางเดือนก่อนในคลัง (เก็บได้ที่แท็บค่าตอบแทน)")
+        else:
+            st.dataframe(pd.DataFrame([{'พยาบาล': n, '7 วันสุดท้าย': ' '.join(shifts)}
+                                       for n, shifts in archived_prev.items()]), hide_index=True)
+            if prev_month_data is None:
+                prev_month_data = archived_prev
+                st.success("✅ ใช้ตารางเดือนก่อนจากคลัง")
+            else:
+                st.caption("ใช้ข้อมูลจาก Upload / Manual Entry แทน")
     
     st.markdown("---")
     st.header("📝 บันทึกวันลา")
@@ -1108,28 +441,30 @@ with st.sidebar:
         # แก้ไขส่วนบันทึกข้อมูล (เพิ่ม month และ year)
         if st.form_submit_button("เพิ่มรายการ") and r_dates:
             code = 'Off' if 'ขอหยุด' in r_type else 'Leave_Train'
-            for d in r_dates:
-                # FIX: บันทึกเดือนและปีไปด้วย + priority
-                st.session_state.requests.append({
-                    'nurse': r_nurse,
-                    'date': d,
-                    'month': month,
-                    'year': year,
-                    'type': code,
-                    'priority': r_priority
-                })
-            save_requests_to_csv() 
+            # FIX: บันทึกเดือนและปีไปด้วย + priority
+            new_requests = [{'nurse': r_nurse, 'date': d, 'month': month, 'year': year, 'type': code,
+                             'priority': r_priority} for d in r_dates]
+            add_stored_requests('requests', new_requests, REQUESTS_DB)
+            reload_requests(year, month)
             st.success(f"เพิ่มแล้ว! (ลำดับ {r_priority})")
 
     if st.session_state.requests:
-        req_df = pd.DataFrame(st.session_state.requests)
-        edited_df = st.data_editor(req_df, num_rows="dynamic", key="editor")
-        if edited_df is not None: st.session_state.requests = edited_df.to_dict('records')
+        req_df = pd.DataFrame(st.session_state.request_rows['requests'])
+        edited_df = st.data_editor(req_df, num_rows="dynamic", column_config={'id': None},
+                                   key=f"editor_{st.session_state.requests_version}")
+        if edited_df is not None:
+            # บันทึกเฉพาะแถวที่เพิ่ม/แก้/ลบ (อ้าง id) แถวที่คนอื่นเพิ่มระหว่างนี้ไม่หาย
+            # แถวใหม่ที่ไม่ได้กรอกเดือน/ปี = เดือนที่กำลังจัด, แถวที่กรอกไม่ครบยังไม่บันทึก
+            edited = [{'month': month, 'year': year, **{k: v for k, v in r.items() if not pd.isna(v)}}
+                      for r in edited_df.to_dict('records')]
+            if save_edited_requests('requests', st.session_state.request_rows['requests'], edited, REQUESTS_DB):
+                reload_requests(year, month)
+                st.rerun()
         
-        # ปุ่ม Reset ล้างรายการวันลาทั้งหมด
+        # ปุ่ม Reset ล้างรายการวันลาทั้งหมด (ของเดือนนี้)
         if st.button("🗑️ ล้างรายการวันลาทั้งหมด", type="secondary"):
-            st.session_state.requests = []
-            save_requests_to_csv()
+            clear_stored_month(year, month, ['requests'], REQUESTS_DB)
+            reload_requests(year, month)
             st.rerun()
     
     # ==========================================
@@ -1177,14 +512,15 @@ with st.sidebar:
         if st.form_submit_button("เพิ่มรายการ"):
             if selected_dates:
                 shift_code = {'เช้า (M)': 'M', 'บ่าย (S)': 'S', 'ดึก (N)': 'N'}[f_shift]
-                st.session_state.fix_requests.append({
+                new_fix = {
                     'nurse': f_nurse,
                     'shift': shift_code,
                     'dates': selected_dates,
                     'month': month,
                     'year': year
-                })
-                save_fix_requests_to_csv()
+                }
+                add_stored_requests('fix_requests', [new_fix], REQUESTS_DB)
+                reload_requests(year, month)
                 st.success(f"✅ เพิ่มคำขอ Fix เวร {f_shift} สำหรับ {f_nurse} วันที่ {', '.join(map(str, selected_dates))} แล้ว!")
             else:
                 st.warning("⚠️ กรุณาเลือกวันที่หรือวันก่อน")
@@ -1209,15 +545,14 @@ with st.sidebar:
         col_btn1, col_btn2 = st.columns(2)
         with col_btn1:
             if st.button("🗑️ ลบรายการที่เลือก", type="secondary", disabled=len(indices_to_delete) == 0):
-                # ลบจากท้ายไปหน้าเพื่อไม่ให้ index เลื่อน
-                for idx in sorted(indices_to_delete, reverse=True):
-                    st.session_state.fix_requests.pop(idx)
-                save_fix_requests_to_csv()
+                fix_rows = st.session_state.request_rows['fix_requests']
+                delete_stored_ids('fix_requests', [fix_rows[idx]['id'] for idx in indices_to_delete], REQUESTS_DB)
+                reload_requests(year, month)
                 st.rerun()
         with col_btn2:
             if st.button("🗑️ ล้างทั้งหมด", type="secondary"):
-                st.session_state.fix_requests = []
-                save_fix_requests_to_csv()
+                clear_stored_month(year, month, ['fix_requests'], REQUESTS_DB)
+                reload_requests(year, month)
                 st.rerun()
     
     # ==========================================
@@ -1239,15 +574,16 @@ with st.sidebar:
         
         if st.form_submit_button("เพิ่มรายการ"):
             shift_code = 'N' if 'ดึก' in s_shift else 'S'
-            st.session_state.staffing_overrides.append({
+            new_override = {
                 'start': int(s_start),
                 'end': int(s_end),
                 'shift': shift_code,
                 'count': int(s_count),
                 'month': month,
                 'year': year
-            })
-            save_staffing_overrides_to_csv()
+            }
+            add_stored_requests('staffing_overrides', [new_override], REQUESTS_DB)
+            reload_requests(year, month)
             st.success(f"เพิ่มกำลังคนพิเศษ: วันที่ {s_start}-{s_end} เวร {s_shift} = {s_count} คน")
     
     if st.session_state.staffing_overrides:
@@ -1264,8 +600,8 @@ with st.sidebar:
             st.dataframe(pd.DataFrame(staff_display), hide_index=True)
         
         if st.button("🗑️ ล้างกำลังคนพิเศษทั้งหมด", type="secondary"):
-            st.session_state.staffing_overrides = []
-            save_staffing_overrides_to_csv()
+            clear_stored_month(year, month, ['staffing_overrides'], REQUESTS_DB)
+            reload_requests(year, month)
             st.rerun()
     
     # ==========================================
@@ -1275,143 +611,114 @@ with st.sidebar:
     
     # ปุ่มรีเซ็ตทุกอย่าง (ล้างวันลา + ล้างตารางเวรเก่า)
     if st.button("🔄 รีเซ็ตทั้งหมด (ล้างวันลา+ตาราง+Fix+กำลังคน)", type="secondary"):
-        st.session_state.requests = []
-        st.session_state.fix_requests = []
-        st.session_state.staffing_overrides = []
+        clear_stored_month(year, month, path=REQUESTS_DB)
+        reload_requests(year, month)
         st.session_state.schedule_df = None
-        save_requests_to_csv()
-        save_fix_requests_to_csv()
-        save_staffing_overrides_to_csv()
+        st.session_state.schedule_month = None
         st.rerun()
 
     st.markdown("---")
-    if st.button("🚀 ประมวลผลจัดตาราง", type="primary"):
-        with st.spinner("กำลังคำนวณและเกลี่ยเวร..."):
-            df = solve_schedule(
-                year, month, days_in_month, nurses_list, 
-                st.session_state.requests,
+    # Warm start: ใช้ตารางล่าสุดของเดือนเดียวกันเป็นจุดเริ่มต้น (แก้คำขอนิดเดียว → ได้คำตอบเร็ว)
+    has_prior_schedule = (st.session_state.schedule_df is not None
+                          and st.session_state.schedule_month == (year, month))
+    use_warm_start = st.checkbox("⚡ เริ่มจากตารางล่าสุด (Warm start)", value=True,
+                                 disabled=not has_prior_schedule,
+                                 help="ใช้ตารางที่จัดไว้แล้วเป็นจุดเริ่มต้น เหมาะกับการแก้คำขอเพียงเล็กน้อย")
+    # ตรวจกำลังคนต่อวันทันทีทุกครั้งที่แก้คำขอ (ไม่ต้องรอ solve)
+    capacity_issues = check_capacity(
+        year, month, days_in_month, nurses_list, st.session_state.requests,
+        st.session_state.fix_requests, st.session_state.staffing_overrides, enable_oc=enable_oc,
+        ward_config=ward_config
+    )
+    blocking_issues = capacity_errors(capacity_issues)
+    for issue in blocking_issues:
+        st.error(f"⛔ วันที่ {issue['day']} ({issue['weekday']}): {issue['message']}")
+    capacity_warnings = [issue for issue in capacity_issues if issue['level'] == 'warning']
+    if capacity_warnings:
+        with st.expander(f"⚠️ คำขอที่อาจไม่ได้ตามขอ ({len(capacity_warnings)} วัน)"):
+            for issue in capacity_warnings:
+                st.markdown(f"*   วันที่ {issue['day']} ({issue['weekday']}): {issue['message']}")
+
+    with st.expander("🔬 ขนาดโมเดลแต่ละกลุ่มกฎ"):
+        st.caption("สร้างโมเดลจากคำขอปัจจุบัน (ไม่ solve) แล้วนับเวลา/ตัวแปร/constraint ที่กฎแต่ละกลุ่มเพิ่ม")
+        profile_key = (solve_cache_key(year, month, days_in_month, nurses_list, st.session_state.requests,
+                                       st.session_state.fix_requests, st.session_state.staffing_overrides,
+                                       enable_oc=enable_oc, prev_month_data=prev_month_data,
+                                       ward_config=ward_config), sequence_encoding)
+        if st.button("📏 วัดขนาดโมเดล"):
+            profile = profile_model_build(
+                year, month, days_in_month, nurses_list, st.session_state.requests,
                 st.session_state.fix_requests, st.session_state.staffing_overrides,
-                enable_oc=enable_oc, prev_month_data=prev_month_data
+                enable_oc=enable_oc, prev_month_data=prev_month_data, ward_config=ward_config,
+                sequence_encoding=sequence_encoding
             )
-            if df is not None:
-                st.session_state.schedule_df = df
-                st.success("จัดตารางสำเร็จ!")
-            else:
-                st.error("❌ ไม่สามารถจัดตารางได้! (เงื่อนไขขัดแย้งกัน)")
-                
-                # วิเคราะห์ปัญหา
-                issues = diagnose_scheduling_issues(
-                    year, month, days_in_month, nurses_list,
-                    st.session_state.requests, st.session_state.staffing_overrides, enable_oc
-                )
-                
-                if issues:
-                    st.error("⚠️ ไม่สามารถจัดตารางได้ เนื่องจากคนไม่พอในบางวัน")
-                    
-                    # Generate and display detailed report
-                    report_md = generate_diagnosis_md(issues)
-                    st.markdown(report_md)
-                    
-                    # Old expander usage (can remove or keep as raw data)
-                    with st.expander("ดูข้อมูลดิบ (JSON)"):
-                        st.json(issues)
-                else:
-                    st.error("💡 จัดตารางไม่สำเร็จ อาจเกิดจาก:")
-                    st.markdown("""
-                    *   กฎดึกติดกัน (N -> N)
-                    *   กฎบ่ายต่อดึก (S -> M)
-                    *   ข้อจำกัดพยาบาลเฉพาะ (ER7 M+ลา <= 10)
-                    *   กฎ 7 วันทำงานติดกัน
-                    """)
-                
-                # ==========================================
-                # DEBUG: แสดงตารางสรุปคำขอทั้งหมด
-                # ==========================================
-                st.markdown("---")
-                st.subheader("📋 สรุปคำขอทั้งหมด (Debug)")
-                
-                # สร้างตารางแสดงคำขอ
-                debug_data = []
-                
-                # 1. วันลา/ประชุม (Leave_Train)
-                for req in st.session_state.requests:
-                    if req.get('month') == month and req.get('year') == year:
-                        if req.get('type') == 'Leave_Train':
-                            debug_data.append({
-                                'พยาบาล': req.get('nurse'),
-                                'วันที่': req.get('date'),
-                                'ประเภท': '📝 ลา/ประชุม (L_T)',
-                                'หมายเหตุ': req.get('reason', '-')
-                            })
-                
-                # 2. ขอหยุด (Off)
-                for req in st.session_state.requests:
-                    if req.get('month') == month and req.get('year') == year:
-                        if req.get('type') == 'Off':
-                            debug_data.append({
-                                'พยาบาล': req.get('nurse'),
-                                'วันที่': req.get('date'),
-                                'ประเภท': '🚫 ขอหยุด (Off)',
-                                'หมายเหตุ': req.get('reason', '-')
-                            })
-                
-                # 3. ขอเวร Fix
-                for req in st.session_state.fix_requests:
-                    if req.get('month') == month and req.get('year') == year:
-                        dates = req.get('dates', [])
-                        for d in dates:
-                            debug_data.append({
-                                'พยาบาล': req.get('nurse'),
-                                'วันที่': d,
-                                'ประเภท': f"📌 Fix เวร {req.get('shift')}",
-                                'หมายเหตุ': f"ขอเวร {req.get('shift')}"
-                            })
-                
-                if debug_data:
-                    # เรียงตามวันที่
-                    debug_df = pd.DataFrame(debug_data)
-                    debug_df = debug_df.sort_values(by=['วันที่', 'พยาบาล'])
-                    st.dataframe(debug_df, hide_index=True, use_container_width=True)
-                    
-                    # สรุปรายวัน (หาวันที่มีหลายคนขอ)
-                    st.markdown("### 🔍 วันที่มีคำขอหลายรายการ")
-                    day_counts = debug_df.groupby('วันที่').size().reset_index(name='จำนวนคำขอ')
-                    multi_request_days = day_counts[day_counts['จำนวนคำขอ'] > 1]
-                    if not multi_request_days.empty:
-                        for _, row in multi_request_days.iterrows():
-                            d = row['วันที่']
-                            count = row['จำนวนคำขอ']
-                            day_detail = debug_df[debug_df['วันที่'] == d]
-                            nurses_str = ", ".join(f"{r['พยาบาล']}({r['ประเภท'].split()[0]})" for _, r in day_detail.iterrows())
-                            st.warning(f"📅 **วันที่ {d}**: {count} คำขอ → {nurses_str}")
-                    else:
-                        st.success("✅ ไม่มีวันที่มีคำขอซ้ำซ้อน")
-                    
-                    # หาคนที่มีคำขอซ้อนกัน (ขอ Off แต่ก็ขอ Fix ด้วย)
-                    st.markdown("### ⚠️ ตรวจสอบคำขอที่ขัดกัน")
-                    conflicts = []
-                    for nurse in nurses_list:
-                        nurse_reqs = debug_df[debug_df['พยาบาล'] == nurse]
-                        for d in nurse_reqs['วันที่'].unique():
-                            day_reqs = nurse_reqs[nurse_reqs['วันที่'] == d]
-                            if len(day_reqs) > 1:
-                                types = day_reqs['ประเภท'].tolist()
-                                conflicts.append({
-                                    'พยาบาล': nurse,
-                                    'วันที่': d,
-                                    'คำขอ': " + ".join(types)
-                                })
-                    
-                    if conflicts:
-                        for c in conflicts:
-                            st.error(f"❌ **{c['พยาบาล']}** วันที่ {c['วันที่']}: {c['คำขอ']}")
-                    else:
-                        st.success("✅ ไม่มีคำขอที่ขัดกัน (คนเดียวกันวันเดียวกัน)")
-                else:
-                    st.info("ไม่มีคำขอใดๆ ในเดือนนี้")
+            st.session_state.model_profile = (profile_key, profile.to_frame(), profile.totals())
+        model_profile = st.session_state.get('model_profile')
+        if model_profile is not None and model_profile[0] == profile_key:
+            _, profile_df, totals = model_profile
+            st.caption(f"กฎลำดับเวรแบบ {sequence_encoding}: รวม {totals['bool_vars']:,} BoolVar / "
+                       f"{totals['constraints']:,} constraint ({totals['wall_ms']:.0f} ms)")
+            st.dataframe(
+                profile_df.drop(columns=['section']).rename(columns={
+                    'label': 'กลุ่มกฎ', 'wall_ms': 'เวลา (ms)', 'bool_vars': 'BoolVar',
+                    'int_vars': 'IntVar', 'constraints': 'Constraint',
+                }).round({'เวลา (ms)': 1}),
+                hide_index=True,
+            )
+        elif model_profile is not None:
+            st.caption("คำขอ/วิธีเขียนกฎลำดับเวรเปลี่ยนไปแล้ว กดวัดใหม่อีกครั้ง")
+
+    solve_running = st.session_state.solve_job is not None
+    refresh_cache = st.checkbox("🔁 ไม่ใช้ผลลัพธ์เดิมจาก cache (Solve ใหม่)", value=False,
+                                help="ตารางที่ยังไม่ใช่ OPTIMAL จะถูก solve ใหม่เองเมื่อให้เวลามากกว่าเดิม "
+                                     "ติ๊กช่องนี้เพื่อ solve ใหม่ทุกครั้ง")
+    if st.button("🚀 ประมวลผลจัดตาราง", type="primary", disabled=solve_running):
+        solve_args = (
+            year, month, days_in_month, nurses_list,
+            st.session_state.requests,
+            st.session_state.fix_requests, st.session_state.staffing_overrides,
+        )
+        cache_key = solve_cache_key(*solve_args, enable_oc=enable_oc, prev_month_data=prev_month_data,
+                                    ward_config=ward_config)
+        cached_df = None if refresh_cache else cached_schedule(get_solve_cache().get(cache_key),
+                                                               solver_params['time_limit'])
+        st.session_state.solve_failed_month = None
+        if blocking_issues:
+            # คนไม่พอแน่นอน → ไม่ต้องรัน solver
+            st.session_state.solve_failed_month = (year, month)
+            record_solve_history({'status': 'PRECHECK_FAILED', 'wall_time': 0.0,
+                                  'params': {**solver_params, 'sequence_encoding': sequence_encoding}},
+                                 (year, month), nurses_list, cache_key, 'precheck')
+        elif cached_df is not None:
+            st.session_state.schedule_df = cached_df.copy()
+            st.session_state.schedule_month = (year, month)
+            st.success("จัดตารางสำเร็จ! ⚡ (ใช้ผลลัพธ์เดิมจาก cache)")
+        else:
+            # solve ใน process แยก หน้าจอไม่ค้าง (ดูความคืบหน้า/กดหยุดได้)
+            job = SolveJob(
+                *solve_args,
+                enable_oc=enable_oc, prev_month_data=prev_month_data, ward_config=ward_config,
+                sequence_encoding=sequence_encoding, solver_params=solver_params,
+                hint_schedule=st.session_state.schedule_df if has_prior_schedule and use_warm_start else None
+            ).start()
+            st.session_state.solve_job = {'job': job, 'cache_key': cache_key, 'month': (year, month),
+                                          'nurses': nurses_list}
+            st.rerun()
+
+    if st.session_state.solve_job is not None:
+        solve_progress_panel()
+
+    if st.session_state.solve_message:
+        st.success(st.session_state.solve_message)
+        st.session_state.solve_message = None
+
+    if st.session_state.solve_failed_month == (year, month):
+        render_solve_failure()
 
 # --- Main Content ---
 if st.session_state.schedule_df is not None:
+    # อ่านตารางเป็น Schedule ครั้งเดียวต่อรอบ ใช้ร่วมกันทุกแท็บ
+    schedule = Schedule.from_display_df(st.session_state.schedule_df, year, month, ward_config)
     tab1, tab2, tab3, tab4 = st.tabs(["📅 ตารางเวร", "💰 ค่าตอบแทนและค่าเวร", "📅 ปฏิทินวันหยุด", "📊 คะแนน"])
     
     with tab1:
@@ -1425,25 +732,9 @@ if st.session_state.schedule_df is not None:
         st.caption("💡 **สามารถแก้ไขเวรได้โดยตรง** | 🟡 = วันหยุดนักขัตฤกษ์ | 🔵 = เสาร์-อาทิตย์")
         
         # สร้าง styled column names เพื่อแสดงวันหยุด
-        styled_df = st.session_state.schedule_df.copy()
-        
-        # เปลี่ยนชื่อ column เพื่อแสดงวันหยุด/weekend
         new_columns = {'Nurse': 'พยาบาล'}
-        for d in range(1, days_in_month + 1):
-            col_name = str(d)
-            if col_name in styled_df.columns:
-                wd = calendar.weekday(year, month, d)
-                is_weekend = wd >= 5
-                is_hol = is_holiday(year, month, d)
-                
-                if is_hol:
-                    new_columns[col_name] = f"🟡{d}"
-                elif is_weekend:
-                    new_columns[col_name] = f"🔵{d}"
-                else:
-                    new_columns[col_name] = col_name
-        
-        styled_df = styled_df.rename(columns=new_columns)
+        new_columns.update({str(d): label for d, label in enumerate(schedule.day_labels(), start=1)})
+        styled_df = schedule.to_display_df().rename(columns=new_columns)
         
         # ใช้ data_editor แทน dataframe เพื่อให้แก้ไขได้
         edited_schedule = st.data_editor(
@@ -1457,29 +748,58 @@ if st.session_state.schedule_df is not None:
         col_btn1, col_btn2 = st.columns(2)
         with col_btn1:
             if st.button("💾 บันทึกการแก้ไข", type="primary"):
-                # แปลง column กลับเป็นชื่อเดิมก่อนบันทึก
-                reverse_columns = {'พยาบาล': 'Nurse'}
-                for d in range(1, days_in_month + 1):
-                    for prefix in ['🟡', '🔵', '']:
-                        styled_name = f"{prefix}{d}"
-                        if styled_name in edited_schedule.columns:
-                            reverse_columns[styled_name] = str(d)
-                            break
-                save_df = edited_schedule.rename(columns=reverse_columns)
-                st.session_state.schedule_df = save_df
+                # อ่านตารางที่แก้ครั้งเดียว (ชื่อคอลัมน์ 🟡/🔵 และข้อความที่พิมพ์เองแปลงเป็นรหัสเวร)
+                edited = Schedule.from_display_df(edited_schedule, year, month, ward_config)
+                st.session_state.schedule_df = edited.to_display_df()
                 st.success("บันทึกการแก้ไขแล้ว! ค่าตอบแทนจะถูกคำนวณใหม่โดยอัตโนมัติ")
                 st.rerun()
         with col_btn2:
             if st.button("🔄 รีเซ็ตการแก้ไข (คืนค่าเดิม)"):
                 st.rerun()
 
+        # ==========================================
+        # 🩹 ปรับตารางกลางเดือน (มีคนป่วย/ลากะทันหัน)
+        # ==========================================
+        with st.expander("🩹 ปรับตารางกลางเดือน (ป่วย/ลากะทันหัน)"):
+            st.caption("ล็อกเวรก่อนวันที่เกิดเหตุ และแก้เฉพาะช่วงวันรอบๆ ให้เปลี่ยนเวรที่ประกาศแล้วน้อยที่สุด")
+            rr_col1, rr_col2 = st.columns(2)
+            with rr_col1:
+                rr_nurse = st.selectbox("พยาบาลที่ป่วย/ลา", nurses_list, key="rr_nurse")
+                rr_dates = st.multiselect("วันที่ลา", range(1, days_in_month + 1), key="rr_dates")
+            with rr_col2:
+                rr_window = st.number_input("จำนวนวันที่ยอมให้ปรับ (นับจากวันแรกที่ลา)", min_value=1,
+                                            max_value=days_in_month, value=3, key="rr_window")
+            if st.button("🩹 ปรับตาราง", disabled=not rr_dates):
+                sick_leave = [{'nurse': rr_nurse, 'date': d, 'month': month, 'year': year,
+                               'type': 'Leave_Train', 'priority': 1} for d in rr_dates]
+                add_stored_requests('requests', sick_leave, REQUESTS_DB)
+                reload_requests(year, month)
+                published = st.session_state.schedule_df
+                with st.spinner("กำลังปรับตาราง..."):
+                    new_df = reroster_schedule(
+                        year, month, days_in_month, nurses_list, st.session_state.requests,
+                        published, cutoff_day=min(rr_dates),
+                        fix_requests=st.session_state.fix_requests,
+                        staffing_overrides=st.session_state.staffing_overrides,
+                        enable_oc=enable_oc, prev_month_data=prev_month_data,
+                        window_days=int(rr_window), ward_config=ward_config,
+                        solver_params={k: v for k, v in solver_params.items() if k != 'time_limit'}
+                    )
+                if new_df is not None:
+                    changes = schedule_changes(published, new_df, nurses_list, days_in_month)
+                    st.session_state.schedule_df = new_df
+                    st.success(f"ปรับตารางแล้ว เปลี่ยน {len(changes)} ช่อง")
+                    st.dataframe(pd.DataFrame(changes, columns=['พยาบาล', 'วันที่', 'เวรเดิม', 'เวรใหม่']),
+                                 hide_index=True)
+                else:
+                    st.error("❌ ปรับตารางไม่ได้ (ลองจัดตารางใหม่ทั้งเดือน)")
+
     with tab2:
         st.subheader("สรุปรายได้และภาระงาน")
         
         # คำนวณวันหยุดอัตโนมัติ (เสาร์-อาทิตย์ + วันหยุดนักขัตฤกษ์)
-        weekend_count = sum(1 for d in range(1, days_in_month + 1) if calendar.weekday(year, month, d) >= 5)
-        holiday_count = len([d for d in THAI_HOLIDAYS.get(year, {}).get(month, []) 
-                            if calendar.weekday(year, month, d) < 5])  # นับเฉพาะวันหยุดที่ไม่ตรงกับ ส-อา
+        weekend_count = int((schedule.weekday >= 5).sum())
+        holiday_count = int((schedule.holiday & (schedule.weekday < 5)).sum())  # นับเฉพาะวันหยุดที่ไม่ตรงกับ ส-อา
         total_off_days = weekend_count + holiday_count
         
         col1, col2, col3 = st.columns(3)
@@ -1487,76 +807,43 @@ if st.session_state.schedule_df is not None:
             st.metric("📅 วันหยุด (ส-อา + นักขัตฤกษ์)", f"{total_off_days} วัน")
             st.caption(f"ส-อา: {weekend_count}, นักขัตฤกษ์: {holiday_count}")
         with col2:
-            rate_sn = st.number_input("ค่าเวร บ่าย/ดึก (บาท/เวร)", value=360)
+            rate_sn = st.number_input("ค่าเวร บ่าย/ดึก (บาท/เวร)", value=DEFAULT_RATE_SN)
         with col3:
-            ot_rate = st.number_input("ค่าตอบแทน OT (บาท/เวร)", value=800)
+            ot_rate = st.number_input("ค่าตอบแทน OT (บาท/เวร)", value=DEFAULT_OT_RATE)
             
-        std_work_days = days_in_month - total_off_days
+        std_work_days = standard_work_days(schedule)
         st.info(f"💡 เกณฑ์วันทำงานปกติ: **{std_work_days} วัน** = {days_in_month} - {total_off_days} (เกินจากนี้คิดเป็น OT)")
         
-        summary_data = []
-        for index, row in st.session_state.schedule_df.iterrows():
-            # หา column ที่ถูกต้อง (อาจเป็นเลขธรรมดาหรือมี emoji นำหน้า)
-            shifts = []
-            for d in range(1, days_in_month + 1):
-                col_name = str(d)
-                # ลองหา column ที่ตรงกัน
-                if col_name in row.index:
-                    shifts.append(row[col_name])
-                else:
-                    # ลองหา column ที่มี emoji นำหน้า
-                    found = False
-                    for prefix in ['🟡', '🔵', '']:
-                        styled_col = f"{prefix}{d}"
-                        if styled_col in row.index:
-                            shifts.append(row[styled_col])
-                            found = True
-                            break
-                    if not found:
-                        shifts.append('')  # ถ้าหาไม่เจอให้เป็นค่าว่าง
-            
-            c_m = shifts.count('M')
-            c_s = shifts.count('S')
-            c_n = shifts.count('N')
-            c_ns = shifts.count('NS')  # นับ NS แยก
-            c_oc = sum(1 for s in shifts if '📞OC' in str(s))  # นับ OC
-            c_lt = shifts.count('ลา/อบรม')
-            
-            # รวม ลา/ประชุม กับเวรเช้า
-            c_m_plus_lt = c_m + c_lt
-            
-            # NS นับเป็น 2 เวร (S+N) ในวันเดียว
-            total_work = c_m + c_s + c_n + c_ns + c_lt
-            
-            # คำนวณเงิน
-            # NS ได้ค่าเวร 2 เท่า (บ่าย+ดึก)
-            shift_allowance = (c_s + c_n + c_ns * 2) * rate_sn  # NS = 2 เวร
-            oc_allowance = c_oc * 400  # ค่าเวร OC = 400 บาท
-            ot_shifts = max(0, total_work - std_work_days) + c_ns  # NS นับเป็น OT ด้วย
-            ot_pay = ot_shifts * ot_rate  # เงิน OT
-            total_income = shift_allowance + oc_allowance + ot_pay  # รวมเงินทั้งหมด
-            
-            summary_data.append({
-                'ชื่อ': row['Nurse'],
-                'เวรเช้า+ลา (M)': c_m_plus_lt,
-                'เวรบ่าย (S)': c_s,
-                'เวรดึก (N)': c_n,
-                'NS (OT)': c_ns,  # แสดง NS แยก
-                'OC': c_oc,  # แสดง On-Call
-                'รวมวันทำงาน': total_work,
-                'ค่าเวร บ่าย/ดึก': f"{shift_allowance:,}",
-                'ค่า OC': f"{oc_allowance:,}",
-                'OT (เวร)': ot_shifts,
-                'เงิน OT': f"{ot_pay:,}",
-                'รวมรายได้สุทธิ': f"{total_income:,}"
-            })
-            
-        df_sum = pd.DataFrame(summary_data)
+        payroll = compute_payroll(schedule, rate_sn=rate_sn, ot_rate=ot_rate)
+        df_sum = pd.DataFrame({
+            'ชื่อ': [f"{n} ({ward_config.nurse_names.get(n, '')})" for n in payroll['nurse']],
+            'เวรเช้า+ลา (M)': payroll['m_plus_lt'],
+            'เวรบ่าย (S)': payroll['s'],
+            'เวรดึก (N)': payroll['n'],
+            'NS (OT)': payroll['ns'],
+            'OC': payroll['oc'],
+            'รวมวันทำงาน': payroll['total_work'],
+            'ค่าเวร บ่าย/ดึก': payroll['shift_allowance'].map('{:,}'.format),
+            'ค่า OC': payroll['oc_pay'].map('{:,}'.format),
+            'OT (เวร)': payroll['ot_shifts'],
+            'เงิน OT': payroll['ot_pay'].map('{:,}'.format),
+            'รวมรายได้สุทธิ': payroll['total_income'].map('{:,}'.format),
+        })
         st.dataframe(df_sum, width='stretch')
         
         # Download
         csv = df_sum.to_csv(index=False).encode('utf-8')
         st.download_button("📥 ดาวน์โหลดรายงานรายได้", csv, "salary_report.csv", "text/csv")
+
+        # เก็บตารางที่ประกาศแล้วเข้าคลัง → สรุปยอดสะสมทั้งปีได้ (python -m scheduler.payroll)
+        if st.button("🗄️ เก็บตารางเดือนนี้เข้าคลัง"):
+            path = save_archived_schedule(ARCHIVE_DIR, ward_config.ward, schedule)
+            st.success(f"บันทึกแล้ว: {path}")
+        ytd = payroll_from_archive(ARCHIVE_DIR, year=year, months=range(1, month + 1), wards=[ward_config.ward],
+                                   rate_sn=rate_sn, ot_rate=ot_rate)
+        if not ytd.empty:
+            with st.expander(f"📈 ยอดสะสมตั้งแต่ต้นปี {year} (จากคลัง {ytd['month'].nunique()} เดือน)"):
+                st.dataframe(year_to_date(ytd), hide_index=True, width='stretch')
     
     with tab3:
         st.subheader("📅 ปฏิทินวันหยุดราชการ")
@@ -1585,110 +872,49 @@ if st.session_state.schedule_df is not None:
     with tab4:
         st.subheader("📊 คะแนนความยุติธรรมและความสมดุล")
         
-        df = st.session_state.schedule_df
-        nurses_list = [f'ER{i}' for i in range(1, 11)]
-        
-        # คำนวณวัน ส-อา และวันหยุดนักขัตฤกษ์
-        weekend_days = [d for d in range(1, days_in_month + 1) if calendar.weekday(year, month, d) >= 5]
-        holiday_days = THAI_HOLIDAYS.get(year, {}).get(month, [])
-        special_days = list(set(weekend_days + holiday_days))
-        
-        # คำนวณคะแนนแต่ละคน
-        score_data = []
-        for _, row in df.iterrows():
-            nurse_name = str(row.iloc[0])
-            nurse_id = None
-            for nid in nurses_list:
-                if nid in nurse_name:
-                    nurse_id = nid
-                    break
-            if not nurse_id:
-                continue
-            
-            # 1. นับวันหยุดในวัน ส-อา/นักขัตฤกษ์
-            off_on_special = 0
-            for d in special_days:
-                col = str(d)
-                for c in df.columns:
-                    if str(d) in str(c):
-                        col = c
-                        break
-                if col in row.index:
-                    val = str(row[col])
-                    if val in ['O', ''] or 'NCD' in val:
-                        off_on_special += 1
-            
-            # 2. นับเวร S, N (ไม่รวม NS)
-            c_s = 0
-            c_n = 0
-            c_ns = 0
-            for col in df.columns[1:]:
-                val = str(row[col])
-                if val == 'S':
-                    c_s += 1
-                elif val == 'N':
-                    c_n += 1
-                elif val == 'NS' or 'NS' in val:
-                    c_ns += 1
-            
-            # 3. เช็ค Fix Request Compliance
-            fix_total = 0
-            fix_matched = 0
-            for fix in st.session_state.fix_requests:
-                if fix.get('nurse') == nurse_id and fix.get('month') == month and fix.get('year') == year:
-                    fix_total += 1
-                    d = fix.get('date')
-                    shift = fix.get('shift')
-                    col = str(d)
-                    for c in df.columns:
-                        if str(d) in str(c):
-                            col = c
-                            break
-                    if col in row.index:
-                        actual = str(row[col])
-                        if shift in actual:
-                            fix_matched += 1
-            
-            fix_rate = (fix_matched / fix_total * 100) if fix_total > 0 else None
-            
-            score_data.append({
-                'พยาบาล': nurse_name,
-                '🏖️ หยุด ส-อา/นักขัตฤกษ์': f"{off_on_special}/{len(special_days)}",
-                '🌅 เวร S': c_s,
-                '🌙 เวร N': c_n,
-                '🌙🌅 เวร NS': c_ns,
-                '⚖️ S+N (สมดุล)': c_s + c_n,
-                '✅ Fix Rate': f"{fix_rate:.0f}%" if fix_rate is not None else "ไม่มี"
-            })
-        
-        if score_data:
-            score_df = pd.DataFrame(score_data)
-            st.dataframe(score_df, hide_index=True, width='stretch')
-            
-            # สถิติ
-            st.markdown("---")
-            col1, col2, col3 = st.columns(3)
-            
-            # ความยุติธรรม ส-อา
-            off_counts = [int(s['🏖️ หยุด ส-อา/นักขัตฤกษ์'].split('/')[0]) for s in score_data if 'ER1' not in s['พยาบาล']]
-            if off_counts:
-                with col1:
-                    avg_off = sum(off_counts) / len(off_counts)
-                    st.metric("⌀ หยุด ส-อา (ไม่รวม ER1)", f"{avg_off:.1f} วัน")
-                    st.caption(f"ต่ำสุด: {min(off_counts)}, สูงสุด: {max(off_counts)}")
-            
-            # ความสมดุล S+N
-            sn_counts = [s['⚖️ S+N (สมดุล)'] for s in score_data if 'ER1' not in s['พยาบาล'] and 'ER7' not in s['พยาบาล']]
-            if sn_counts:
-                with col2:
-                    avg_sn = sum(sn_counts) / len(sn_counts)
-                    st.metric("⌀ เวร S+N (ไม่รวม ER1,7)", f"{avg_sn:.1f}")
-                    st.caption(f"ต่ำสุด: {min(sn_counts)}, สูงสุด: {max(sn_counts)}")
-            
-            # Fix Rate
-            fix_rates = [float(s['✅ Fix Rate'].replace('%', '')) for s in score_data if s['✅ Fix Rate'] != 'ไม่มี']
-            if fix_rates:
-                with col3:
-                    avg_fix = sum(fix_rates) / len(fix_rates)
-                    st.metric("⌀ Fix Request สำเร็จ", f"{avg_fix:.0f}%")
-                    st.caption(f"ต่ำสุด: {min(fix_rates):.0f}%, สูงสุด: {max(fix_rates):.0f}%")
\ No newline at end of file
+        scores = compute_fairness(schedule, st.session_state.fix_requests)
+        score_df = pd.DataFrame({
+            'พยาบาล': [f"{n} ({ward_config.nurse_names.get(n, '')})" for n in scores['nurse']],
+            '🏖️ หยุด ส-อา/นักขัตฤกษ์': [f"{off}/{total}" for off, total in zip(scores['special_off'], scores['special_days'])],
+            '🌅 เวร S': scores['s'],
+            '🌙 เวร N': scores['n'],
+            '🌙🌅 เวร NS': scores['ns'],
+            '⚖️ S+N (สมดุล)': scores['sn'],
+            '✅ Fix Rate': scores['fix_rate'].map(lambda r: "ไม่มี" if pd.isna(r) else f"{r:.0f}%"),
+        })
+        st.dataframe(score_df, hide_index=True, width='stretch')
+
+        # สถิติ
+        st.markdown("---")
+        summary = fairness_summary(scores, ward_config)
+        col1, col2, col3 = st.columns(3)
+
+        # ความยุติธรรม ส-อา
+        if summary['special_off']:
+            with col1:
+                st.metric(f"⌀ หยุด ส-อา (ไม่รวม {','.join(ward_config.report_off_excluded)})",
+                          f"{summary['special_off']['mean']:.1f} วัน")
+                st.caption(f"ต่ำสุด: {summary['special_off']['min']:.0f}, สูงสุด: {summary['special_off']['max']:.0f}")
+
+        # ความสมดุล S+N
+        if summary['sn']:
+            with col2:
+                st.metric(f"⌀ เวร S+N (ไม่รวม {','.join(ward_config.report_sn_excluded)})",
+                          f"{summary['sn']['mean']:.1f}")
+                st.caption(f"ต่ำสุด: {summary['sn']['min']:.0f}, สูงสุด: {summary['sn']['max']:.0f}")
+
+        # Fix Rate
+        if summary['fix_rate']:
+            with col3:
+                st.metric("⌀ Fix Request สำเร็จ", f"{summary['fix_rate']['mean']:.0f}%")
+                st.caption(f"ต่ำสุด: {summary['fix_rate']['min']:.0f}%, สูงสุด: {summary['fix_rate']['max']:.0f}%")
+
+        # สรุปทั้งปีจากคลังตาราง (ทบทวนรายไตรมาส)
+        yearly = fairness_from_archive(ARCHIVE_DIR, year=year, wards=[ward_config.ward],
+                                       fix_requests=load_stored_requests('fix_requests', year, path=REQUESTS_DB))
+        if not yearly.empty:
+            with st.expander(f"📅 สรุปความยุติธรรมทั้งปี {year} (จากคลัง {yearly['month'].nunique()} เดือน)"):
+                quarters = st.multiselect("ไตรมาส", [1, 2, 3, 4], default=[1, 2, 3, 4], key="fairness_quarters")
+                in_quarters = yearly['month'].map(lambda m: (m - 1) // 3 + 1).isin(quarters)
+                if in_quarters.any():
+                    st.dataframe(aggregate_fairness(yearly[in_quarters]), hide_index=True, width='stretch')
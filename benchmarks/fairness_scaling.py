@@ -0,0 +1,73 @@
+"""วัดว่าขนาดโมเดลและเวลาโตอย่างไรเมื่อจำนวนพยาบาลเพิ่มขึ้น (เช่น รวมวอร์ด 40-80 คน)
+
+รันจาก root ของ repo::
+
+    python -m benchmarks.fairness_scaling --sizes 10 20 40 80 --time-limit 30
+
+"constraints/คน" ควรคงที่ ถ้ามีกฎไหนโตแบบ O(n²) ตัวเลขนี้จะพุ่งขึ้นตามจำนวนคน
+"""
+
+import argparse
+import calendar
+import time
+
+from ortools.sat.python import cp_model
+
+from scheduler.solver import build_schedule_model, configure_solver
+
+
+class _FirstSolutionTimer(cp_model.CpSolverSolutionCallback):
+    """จับเวลาถึงคำตอบแรก"""
+
+    def __init__(self):
+        super().__init__()
+        self.start = time.time()
+        self.first_solution_time = None
+
+    def on_solution_callback(self):
+        if self.first_solution_time is None:
+            self.first_solution_time = time.time() - self.start
+
+
+def run(sizes, year, month, time_limit, num_workers, enable_oc):
+    _, days_in_month = calendar.monthrange(year, month)
+    rows = []
+    for size in sizes:
+        nurses = [f'ER{i}' for i in range(1, size + 1)]
+
+        start = time.time()
+        model, _, _ = build_schedule_model(year, month, days_in_month, nurses, [], enable_oc=enable_oc)
+        build_time = time.time() - start
+        num_constraints = len(model.Proto().constraints)
+
+        solver = cp_model.CpSolver()
+        configure_solver(solver, {'time_limit': time_limit, 'num_workers': num_workers})
+        timer = _FirstSolutionTimer()
+        status = solver.Solve(model, timer)
+
+        rows.append({
+            'nurses': size,
+            'build_s': round(build_time, 2),
+            'constraints': num_constraints,
+            'constraints_per_nurse': round(num_constraints / size, 1),
+            'first_feasible_s': None if timer.first_solution_time is None else round(timer.first_solution_time, 2),
+            'status': solver.StatusName(status),
+        })
+        print(rows[-1], flush=True)
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10, 20, 40, 80])
+    parser.add_argument('--year', type=int, default=2025)
+    parser.add_argument('--month', type=int, default=10)
+    parser.add_argument('--time-limit', type=float, default=30.0)
+    parser.add_argument('--workers', type=int, default=0, help='0 = ทุก core')
+    parser.add_argument('--oc', action='store_true', help='เปิดเวร On-Call')
+    args = parser.parse_args()
+    run(args.sizes, args.year, args.month, args.time_limit, args.workers, args.oc)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,129 @@
+"""สร้างโจทย์จัดเวรจำลอง (scenario) แบบกำหนดพารามิเตอร์ได้ สำหรับ benchmark
+
+สุ่มด้วย seed คงที่ → โจทย์เดิมทุกครั้ง เทียบเวลากับ baseline ได้
+คำขอลา/หยุด/Fix ที่ทำให้กำลังคนต่อวันไม่พอแน่ๆ (check_capacity) จะถูกตัดทิ้ง
+เพื่อให้ทุก scenario ยังจัดได้ (benchmark วัดความเร็ว ไม่ได้วัดการหาจุดขัดแย้ง)
+"""
+
+import calendar
+
+import numpy as np
+
+from scheduler.capacity import capacity_errors, check_capacity
+
+# ตารางท้ายเดือนก่อน (7 วัน) หมุนให้พยาบาลแต่ละคน → ครอบคลุมกฎข้ามเดือนทุกแบบ
+# (ดึก/บ่าย/หยุดวันสุดท้าย, ทำงานติดกัน 5-6 วัน)
+PREV_MONTH_PATTERNS = [
+    ['O', 'M', 'M', 'S', 'S', 'N', 'N'],
+    ['M', 'O', 'M', 'M', 'S', 'S', 'S'],
+    ['S', 'N', 'O', 'O', 'M', 'M', 'O'],
+    ['O', 'M', 'S', 'M', 'M', 'M', 'M'],
+    ['N', 'O', 'O', 'M', 'M', 'S', 'M'],
+]
+FIX_SHIFTS = ['M', 'S', 'N']
+
+
+def make_scenario(name, nurses=10, year=2025, month=10, leave_density=0.0, off_density=0.0, fix_density=0.0,
+                  staffing_overrides=False, enable_oc=True, carry_over=False, seed=0):
+    """โจทย์ 1 เดือน คืนค่า dict ที่ส่งต่อให้ build_schedule_model ได้ทันที (ยกเว้น 'name')
+
+    *_density = สัดส่วนช่อง พยาบาล × วัน ที่มีคำขอ (เช่น 0.03 ≈ คนละ 1 วัน/เดือน)
+    staffing_overrides: True = เพิ่มกำลังคนพิเศษ (S = 3 ช่วงสัปดาห์ที่ 2, N = 2 ช่วงปลายเดือน)
+    carry_over: True = มีตารางท้ายเดือนก่อน (prev_month_data)
+    """
+    rng = np.random.default_rng(seed)
+    _, days_in_month = calendar.monthrange(year, month)
+    nurse_ids = [f'ER{i}' for i in range(1, nurses + 1)]
+    # ER1 มีเวรประจำ → ไม่สุ่มคำขอให้ (ลาของ ER1 = จัดไม่ได้เสมอ)
+    candidates = nurse_ids[1:]
+
+    def sample_cells(density):
+        cells = int(round(density * len(candidates) * days_in_month))
+        picks = rng.choice(len(candidates) * days_in_month, size=cells, replace=False)
+        return [(candidates[p // days_in_month], int(p % days_in_month) + 1) for p in sorted(picks)]
+
+    taken = set()
+    requests = []
+    for req_type, density in [('Leave_Train', leave_density), ('Off', off_density)]:
+        for nurse, day in sample_cells(density):
+            if (nurse, day) not in taken:
+                taken.add((nurse, day))
+                requests.append({'nurse': nurse, 'date': day, 'month': month, 'year': year,
+                                 'type': req_type, 'reason': 'benchmark', 'priority': 1})
+
+    fix_dates = {}
+    for nurse, day in sample_cells(fix_density):
+        if (nurse, day) not in taken:
+            taken.add((nurse, day))
+            shift = FIX_SHIFTS[int(rng.integers(len(FIX_SHIFTS)))]
+            fix_dates.setdefault((nurse, shift), []).append(day)
+    fix_requests = [{'nurse': nurse, 'month': month, 'year': year, 'shift': shift, 'dates': dates}
+                    for (nurse, shift), dates in sorted(fix_dates.items())]
+
+    overrides = []
+    if staffing_overrides:
+        overrides = [
+            {'year': year, 'month': month, 'shift': 'S', 'count': 3, 'start': 8, 'end': 14},
+            {'year': year, 'month': month, 'shift': 'N', 'count': 2, 'start': days_in_month - 6,
+             'end': days_in_month},
+        ]
+
+    prev_month_data = None
+    if carry_over:
+        prev_month_data = {n: PREV_MONTH_PATTERNS[i % len(PREV_MONTH_PATTERNS)] for i, n in enumerate(nurse_ids)}
+
+    requests = _drop_infeasible_leave(year, month, days_in_month, nurse_ids, requests, overrides, enable_oc)
+    return {
+        'name': name,
+        'year': year,
+        'month': month,
+        'days_in_month': days_in_month,
+        'nurses': nurse_ids,
+        'requests': requests,
+        'fix_requests': fix_requests,
+        'staffing_overrides': overrides,
+        'enable_oc': enable_oc,
+        'prev_month_data': prev_month_data,
+    }
+
+
+def _drop_infeasible_leave(year, month, days_in_month, nurses, requests, overrides, enable_oc):
+    """ตัดคำขอลาของวันที่กำลังคนไม่พอแน่ๆ ทีละรายการจนผ่าน check_capacity"""
+    requests = list(requests)
+    while True:
+        errors = capacity_errors(check_capacity(year, month, days_in_month, nurses, requests,
+                                                staffing_overrides=overrides, enable_oc=enable_oc))
+        if not errors:
+            return requests
+        days = {issue['day'] for issue in errors}
+        drop = next((i for i in reversed(range(len(requests)))
+                     if requests[i]['date'] in days and requests[i]['type'] == 'Leave_Train'), None)
+        if drop is None:
+            # ขาดคนเพราะกำลังคนพิเศษเอง ไม่ใช่เพราะลา → ปล่อยไว้ (benchmark จะได้ status INFEASIBLE)
+            return requests
+        del requests[drop]
+
+
+def scenario_args(scenario):
+    """ตัด 'name' ออก เหลือ kwargs ของ build_schedule_model"""
+    return {k: v for k, v in scenario.items() if k != 'name'}
+
+
+# ชุดมาตรฐาน: เริ่มจากโจทย์ปกติของวอร์ด แล้วเปลี่ยนทีละมิติ
+DEFAULT_SCENARIOS = [
+    dict(name='base_10', nurses=10),
+    dict(name='no_oc_10', nurses=10, enable_oc=False),
+    dict(name='feb_10', nurses=10, month=2),
+    dict(name='requests_10', nurses=10, leave_density=0.03, off_density=0.05, fix_density=0.05, seed=1),
+    dict(name='overrides_12', nurses=12, staffing_overrides=True),
+    dict(name='carry_over_10', nurses=10, carry_over=True),
+    dict(name='busy_month_12', nurses=12, leave_density=0.04, off_density=0.08, fix_density=0.08,
+         staffing_overrides=True, carry_over=True, seed=2),
+    dict(name='large_20', nurses=20, off_density=0.05, fix_density=0.05, seed=3),
+]
+
+
+def default_scenarios(names=None):
+    """สร้าง DEFAULT_SCENARIOS (names = เฉพาะชื่อที่ระบุ)"""
+    specs = [s for s in DEFAULT_SCENARIOS if names is None or s['name'] in names]
+    return [make_scenario(**spec) for spec in specs]
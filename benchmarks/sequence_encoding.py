@@ -0,0 +1,50 @@
+"""เทียบวิธีเขียนกฎลำดับเวร: linear (constraint รายคู่/รายสามวัน) กับ automaton (ตารางการเปลี่ยนเวร)
+
+รันจาก root ของ repo::
+
+    python -m benchmarks.sequence_encoding --scenarios no_oc_10 large_20 --time-limit 30
+
+ทุก scenario สร้างโมเดลทั้งสองแบบแล้ว solve ด้วยค่าเดียวกัน (seed เดียวกัน)
+objective ของสองแบบเทียบกันได้ตรงๆ (ค่าปรับของตารางเดียวกันเท่ากันทุกกฎ)
+"""
+
+import argparse
+
+import pandas as pd
+
+from scheduler.sequence import SEQUENCE_ENCODINGS
+
+from .scenarios import DEFAULT_SCENARIOS, default_scenarios
+from .suite import DEFAULT_TIME_LIMIT, run_scenario
+
+_COLUMNS = ['scenario', 'encoding', 'variables', 'constraints', 'build_s', 'first_feasible_s', 'status',
+            'objective', 'bound']
+
+
+def compare_encodings(scenarios, time_limit=DEFAULT_TIME_LIMIT, num_workers=0, random_seed=0, log=print):
+    """DataFrame หนึ่งแถวต่อ scenario × วิธีเขียนกฎ"""
+    rows = []
+    for scenario in scenarios:
+        for encoding in SEQUENCE_ENCODINGS:
+            result = run_scenario(scenario, time_limit, num_workers, random_seed, sequence_encoding=encoding)
+            rows.append({'scenario': scenario['name'], 'encoding': encoding, **result})
+            if log:
+                log(f"{scenario['name']} [{encoding}]: {result}")
+    return pd.DataFrame(rows, columns=_COLUMNS)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--scenarios', nargs='+', choices=[s['name'] for s in DEFAULT_SCENARIOS],
+                        help='เฉพาะ scenario ที่ระบุ (ไม่ระบุ = ทั้งหมด)')
+    parser.add_argument('--time-limit', type=float, default=DEFAULT_TIME_LIMIT)
+    parser.add_argument('--workers', type=int, default=0, help='0 = ทุก core')
+    parser.add_argument('--seed', type=int, default=0, help='random_seed ของ CP-SAT')
+    args = parser.parse_args(argv)
+
+    table = compare_encodings(default_scenarios(args.scenarios), args.time_limit, args.workers, args.seed, log=None)
+    print(table.to_string(index=False))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,173 @@
+"""ชุด benchmark ของ solver: รันทุก scenario แล้วเทียบกับ baseline (JSON) เพื่อจับ regression
+
+รันจาก root ของ repo::
+
+    python -m benchmarks.suite --save benchmarks/baseline.json       # สร้าง/อัปเดต baseline
+    python -m benchmarks.suite --baseline benchmarks/baseline.json   # เทียบ (exit 1 ถ้ามี regression)
+
+baseline ขึ้นกับเครื่อง (จำนวน core/ความเร็ว) → สร้างใหม่บนเครื่องที่ใช้เทียบ และใช้ --workers เท่าเดิม
+เวลาในการเทียบใช้ threshold แบบสัดส่วน + ค่าเผื่อขั้นต่ำ (วินาที) กันความผันผวนของงานเล็กๆ
+"""
+
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+
+from ortools.sat.python import cp_model
+
+from scheduler.sequence import DEFAULT_SEQUENCE_ENCODING, SEQUENCE_ENCODINGS
+from scheduler.solver import build_schedule_model, configure_solver
+
+from .fairness_scaling import _FirstSolutionTimer
+from .scenarios import DEFAULT_SCENARIOS, default_scenarios, scenario_args
+
+DEFAULT_TIME_LIMIT = 20.0
+DEFAULT_TIME_RATIO = 1.5     # ช้ากว่า baseline เกิน 1.5 เท่า = regression
+DEFAULT_MIN_SLACK = 0.5      # ...และช้ากว่าเกิน 0.5 วินาที
+DEFAULT_OBJECTIVE_DROP = 0.05  # objective (Maximize) แย่ลงเกิน 5% ของ baseline = regression
+_SOLVED = ['OPTIMAL', 'FEASIBLE']
+
+
+def run_scenario(scenario, time_limit=DEFAULT_TIME_LIMIT, num_workers=0, random_seed=None, sequence_encoding=None):
+    """สร้างโมเดล + solve 1 scenario คืนค่า dict ของตัววัด"""
+    start = time.time()
+    model, _, _ = build_schedule_model(**scenario_args(scenario), sequence_encoding=sequence_encoding)
+    build_time = time.time() - start
+    proto = model.Proto()
+
+    solver = cp_model.CpSolver()
+    params = configure_solver(solver, {'time_limit': time_limit, 'num_workers': num_workers,
+                                       'random_seed': random_seed})
+    timer = _FirstSolutionTimer()
+    status = solver.Solve(model, timer)
+    solved = status in [cp_model.OPTIMAL, cp_model.FEASIBLE]
+
+    return {
+        'status': solver.StatusName(status),
+        'build_s': round(build_time, 3),
+        'first_feasible_s': None if timer.first_solution_time is None else round(timer.first_solution_time, 3),
+        'wall_s': round(solver.WallTime(), 3),
+        'objective': solver.ObjectiveValue() if solved else None,
+        'bound': solver.BestObjectiveBound() if solved else None,
+        'variables': len(proto.variables),
+        'constraints': len(proto.constraints),
+        'requests': len(scenario['requests']),
+        'fix_requests': len(scenario['fix_requests']),
+        'time_limit': time_limit,
+        'num_workers': params['num_workers'],
+    }
+
+
+def run_suite(scenarios, time_limit=DEFAULT_TIME_LIMIT, num_workers=0, random_seed=None, log=print,
+              sequence_encoding=None):
+    """รันทุก scenario คืนค่า dict {'meta': ..., 'scenarios': {name: ตัววัด}}"""
+    results = {}
+    for scenario in scenarios:
+        results[scenario['name']] = run_scenario(scenario, time_limit, num_workers, random_seed, sequence_encoding)
+        if log:
+            log(f"{scenario['name']}: {results[scenario['name']]}")
+    return {
+        'meta': {
+            'created': time.strftime('%Y-%m-%d %H:%M:%S'),
+            'python': platform.python_version(),
+            'ortools': _ortools_version(),
+            'cpu_count': os.cpu_count(),
+            'sequence_encoding': sequence_encoding or DEFAULT_SEQUENCE_ENCODING,
+        },
+        'scenarios': results,
+    }
+
+
+def _ortools_version():
+    try:
+        from ortools import __version__
+        return __version__
+    except ImportError:
+        return None
+
+
+def _slower(current, baseline, ratio, min_slack):
+    if current is None or baseline is None:
+        return False
+    return current > baseline * ratio and current - baseline > min_slack
+
+
+def compare(results, baseline, time_ratio=DEFAULT_TIME_RATIO, min_slack=DEFAULT_MIN_SLACK,
+            objective_drop=DEFAULT_OBJECTIVE_DROP):
+    """เทียบผลกับ baseline คืนค่า list ของ regression (ว่าง = ผ่าน)
+
+    แต่ละรายการเป็น dict: scenario, metric, baseline, current, message
+    scenario ที่ไม่มีใน baseline จะข้ามไป (ยังไม่มีค่าให้เทียบ)
+    """
+    regressions = []
+
+    def flag(name, metric, old, new, message):
+        regressions.append({'scenario': name, 'metric': metric, 'baseline': old, 'current': new,
+                            'message': message})
+
+    for name, current in results['scenarios'].items():
+        old = baseline.get('scenarios', {}).get(name)
+        if old is None:
+            continue
+        if old['status'] in _SOLVED and current['status'] not in _SOLVED:
+            flag(name, 'status', old['status'], current['status'], "เคยจัดได้ ตอนนี้จัดไม่ได้/หาคำตอบไม่ทัน")
+            continue
+        for metric in ['build_s', 'first_feasible_s']:
+            if _slower(current[metric], old[metric], time_ratio, min_slack):
+                flag(name, metric, old[metric], current[metric],
+                     f"ช้าลง {current[metric] / old[metric]:.1f} เท่า")
+        if old['objective'] is not None and current['objective'] is not None:
+            allowed = abs(old['objective']) * objective_drop
+            if current['objective'] < old['objective'] - allowed:
+                flag(name, 'objective', old['objective'], current['objective'],
+                     f"คะแนนลดลง {old['objective'] - current['objective']:.0f}")
+    return regressions
+
+
+def load_baseline(path):
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def save_baseline(results, path):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(results, f, ensure_ascii=False, indent=2)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--scenarios', nargs='+', choices=[s['name'] for s in DEFAULT_SCENARIOS],
+                        help='เฉพาะ scenario ที่ระบุ (ไม่ระบุ = ทั้งหมด)')
+    parser.add_argument('--time-limit', type=float, default=DEFAULT_TIME_LIMIT)
+    parser.add_argument('--workers', type=int, default=0, help='0 = ทุก core')
+    parser.add_argument('--seed', type=int, help='random_seed ของ CP-SAT (ลดความผันผวนระหว่างรอบ)')
+    parser.add_argument('--sequence-encoding', choices=SEQUENCE_ENCODINGS,
+                        help=f'วิธีเขียนกฎลำดับเวร (ไม่ระบุ = {DEFAULT_SEQUENCE_ENCODING})')
+    parser.add_argument('--baseline', help='ไฟล์ baseline (JSON) ที่จะเทียบ')
+    parser.add_argument('--save', help='บันทึกผลรอบนี้เป็น baseline (JSON)')
+    parser.add_argument('--time-ratio', type=float, default=DEFAULT_TIME_RATIO)
+    parser.add_argument('--min-slack', type=float, default=DEFAULT_MIN_SLACK)
+    parser.add_argument('--objective-drop', type=float, default=DEFAULT_OBJECTIVE_DROP)
+    args = parser.parse_args(argv)
+
+    results = run_suite(default_scenarios(args.scenarios), args.time_limit, args.workers, args.seed,
+                        sequence_encoding=args.sequence_encoding)
+    if args.save:
+        save_baseline(results, args.save)
+        print(f"บันทึก baseline → {args.save}")
+
+    if args.baseline:
+        regressions = compare(results, load_baseline(args.baseline), args.time_ratio, args.min_slack,
+                              args.objective_drop)
+        for r in regressions:
+            print(f"REGRESSION {r['scenario']} [{r['metric']}]: {r['baseline']} → {r['current']} ({r['message']})")
+        if regressions:
+            sys.exit(1)
+        print("ไม่พบ regression")
+
+
+if __name__ == '__main__':
+    main()
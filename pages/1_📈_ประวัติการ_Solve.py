@@ -0,0 +1,49 @@
+"""หน้าประวัติการ solve: แนวโน้มเวลา/conflicts ต่อเดือนของตาราง จาก TELEMETRY_DB"""
+
+import streamlit as st
+
+from scheduler import TELEMETRY_DB, load_solve_history, solve_trends
+
+st.set_page_config(page_title="ประวัติการ Solve", layout="wide")
+
+if not st.session_state.get('authenticated'):
+    st.warning("🔐 กรุณาเข้าสู่ระบบที่หน้าหลักก่อน")
+    st.stop()
+
+st.title("📈 ประวัติการ Solve")
+st.caption("ทุกครั้งที่กด \"ประมวลผลจัดตาราง\" จะถูกบันทึกไว้ ใช้ดูว่าเดือนไหน solve ช้า หรือช้าลงหลังแก้กฎ")
+
+history = load_solve_history(TELEMETRY_DB)
+if history.empty:
+    st.info("ยังไม่มีประวัติการ solve")
+    st.stop()
+
+col1, col2 = st.columns(2)
+with col1:
+    years = sorted(history['year'].unique())
+    selected_years = st.multiselect("ปีของตาราง", years, default=years)
+with col2:
+    outcomes = sorted(history['outcome'].dropna().unique())
+    selected_outcomes = st.multiselect("ผลลัพธ์", outcomes, default=outcomes)
+history = history[history['year'].isin(selected_years) & history['outcome'].isin(selected_outcomes)]
+
+trends = solve_trends(history)
+if not trends.empty:
+    trends.insert(0, 'เดือน', trends['year'].astype(str) + '-' + trends['month'].astype(str).str.zfill(2))
+    st.subheader("แนวโน้มต่อเดือนของตาราง")
+    st.bar_chart(trends.set_index('เดือน')[['median_wall_time', 'max_wall_time']])
+    st.dataframe(
+        trends.drop(columns=['year', 'month']).rename(columns={
+            'solves': 'จำนวนครั้ง', 'median_wall_time': 'เวลา median (วินาที)', 'max_wall_time': 'เวลาสูงสุด (วินาที)',
+            'median_conflicts': 'Conflicts (median)', 'solved_rate': 'ได้ตาราง (%)', 'median_gap': 'Gap median (%)',
+        }).round(1),
+        hide_index=True,
+    )
+
+st.subheader("การ solve ล่าสุด")
+st.line_chart(history.sort_values('recorded_at').set_index('recorded_at')[['wall_time']])
+st.dataframe(
+    history[['recorded_at', 'year', 'month', 'num_nurses', 'outcome', 'status', 'wall_time', 'conflicts',
+             'branches', 'objective', 'best_bound', 'fingerprint', 'params']].head(200),
+    hide_index=True,
+)
@@ -1,6 +1,6 @@
 
 import pandas as pd
-from app import solve_schedule
+from scheduler import solve_schedule
 import sys
 
 def verify_base_schedule():
@@ -15,7 +15,7 @@ def verify_base_schedule():
     print(f"Year: {year}, Month: {month}")
     
     try:
-        df = solve_schedule(year, month, days_in_month, nurses, requests, enable_oncall=False)
+        df = solve_schedule(year, month, days_in_month, nurses, requests, enable_oc=False)
         if df is not None:
             print("PASS: Base schedule is FEASIBLE.")
             # Basic validation
@@ -0,0 +1,285 @@
+"""Scheduler Engine สำหรับจัดตารางเวรพยาบาล (ไม่ขึ้นกับ Streamlit)
+
+ใช้จาก batch job / script ได้โดยตรง::
+
+    from scheduler import solve_schedule
+    df = solve_schedule(2025, 10, 31, nurses, requests)
+"""
+
+import importlib
+
+from .capacity import capacity_errors, check_capacity
+from .nurses import NURSE_NAMES
+from .schedule import Schedule, ShiftCode, parse_shift_cell
+from .sequence import DEFAULT_SEQUENCE_ENCODING, SEQUENCE_ENCODINGS, add_sequence_automaton, transition_cost
+from .solver import (
+    DEFAULT_SOLVER_PARAMS,
+    DEFAULT_WORKERS_PER_JOB,
+    MIN_WORKERS_PER_JOB,
+    SHIFT_CODES,
+    SHIFTS,
+    WORK_SHIFTS,
+    ShiftVars,
+    add_schedule_hint,
+    build_schedule_model,
+    configure_solver,
+    extract_codes,
+    iter_solutions,
+    render_schedule_df,
+    run_solver,
+    schedule_to_assignments,
+    shift_domains,
+    shift_var_index,
+    solve_schedule,
+    solve_schedule_codes,
+    solve_stats,
+)
+from .thai_calendar import THAI_HOLIDAYS, get_holiday_name, get_week_occurrence, is_holiday
+from .ward_config import (
+    CONFIG_VERSION,
+    DEFAULT_WARD_CONFIG,
+    WARD_CONFIG_DIR,
+    WardConfig,
+    default_ward_config,
+    list_wards,
+    load_ward_config,
+    resolve_ward_config,
+    ward_config_path,
+)
+
+# โมดูลเสริม (คลัง/ค่าตอบแทน, batch, HTTP service, SQLite, ...) โหลดเมื่อถูกเรียกใช้ครั้งแรก
+# import scheduler เพื่อ solve อย่างเดียวจึงไม่ต้องโหลด http.server / sqlite3 / multiprocessing
+_LAZY_EXPORTS = {
+    'ARCHIVE_DIR': 'archive',
+    'DEFAULT_WARD': 'archive',
+    'archive_path': 'archive',
+    'iter_archive': 'archive',
+    'load_archived_schedule': 'archive',
+    'save_archived_schedule': 'archive',
+    'BATCH_SUMMARY_FILE': 'batch',
+    'discover_units': 'batch',
+    'load_unit_inputs': 'batch',
+    'run_batch': 'batch',
+    'CACHE_VERSION': 'cache',
+    'SolveCache': 'cache',
+    'cache_entry': 'cache',
+    'cached_schedule': 'cache',
+    'cached_solve_schedule': 'cache',
+    'solve_cache_key': 'cache',
+    'CSV_CHUNK_ROWS': 'csv_io',
+    'CsvReport': 'csv_io',
+    'iter_csv': 'csv_io',
+    'read_csv': 'csv_io',
+    'sniff_encoding': 'csv_io',
+    'diagnose_scheduling_issues': 'diagnosis',
+    'generate_diagnosis_md': 'diagnosis',
+    'RuleGuards': 'explain',
+    'describe_guard': 'explain',
+    'explain_infeasibility': 'explain',
+    'OFF_FAIRNESS_EXCLUDED': 'fairness',
+    'SN_FAIRNESS_EXCLUDED': 'fairness',
+    'aggregate_fairness': 'fairness',
+    'compute_fairness': 'fairness',
+    'fairness_from_archive': 'fairness',
+    'fairness_summary': 'fairness',
+    'CARRY_OVER_DAYS': 'horizon',
+    'DEFAULT_BOUNDARY_TIME_LIMIT': 'horizon',
+    'carry_over': 'horizon',
+    'carry_over_from_archive': 'horizon',
+    'lead_in': 'horizon',
+    'solve_horizon': 'horizon',
+    'DEFAULT_OC_RATE': 'payroll',
+    'DEFAULT_OT_RATE': 'payroll',
+    'DEFAULT_RATE_SN': 'payroll',
+    'compute_payroll': 'payroll',
+    'payroll_from_archive': 'payroll',
+    'standard_work_days': 'payroll',
+    'year_to_date': 'payroll',
+    'parse_previous_month_schedule': 'prev_month',
+    'BuildProfile': 'profiling',
+    'SECTION_LABELS': 'profiling',
+    'profile_model_build': 'profiling',
+    'REQUESTS_DB': 'request_store',
+    'REQUEST_KINDS': 'request_store',
+    'add_stored_requests': 'request_store',
+    'clear_stored_month': 'request_store',
+    'delete_stored_ids': 'request_store',
+    'delete_stored_requests': 'request_store',
+    'load_stored_requests': 'request_store',
+    'migrate_csv_requests': 'request_store',
+    'normalize_request': 'request_store',
+    'normalize_requests': 'request_store',
+    'replace_stored_month': 'request_store',
+    'save_edited_requests': 'request_store',
+    'stored_request_changes': 'request_store',
+    'reroster_schedule': 'reroster',
+    'schedule_changes': 'reroster',
+    'DEFAULT_PORT': 'service',
+    'JobQueue': 'service',
+    'QueueFull': 'service',
+    'make_server': 'service',
+    'parse_job_request': 'service',
+    'serve': 'service',
+    'CSV_FILE': 'storage',
+    'FIX_REQUESTS_FILE': 'storage',
+    'STAFFING_OVERRIDES_FILE': 'storage',
+    'load_fix_requests_from_csv': 'storage',
+    'load_requests_from_csv': 'storage',
+    'load_staffing_overrides_from_csv': 'storage',
+    'save_fix_requests_to_csv': 'storage',
+    'save_requests_to_csv': 'storage',
+    'save_staffing_overrides_to_csv': 'storage',
+    'TELEMETRY_DB': 'telemetry',
+    'load_solve_history': 'telemetry',
+    'record_solve': 'telemetry',
+    'solve_fingerprint': 'telemetry',
+    'solve_outcome': 'telemetry',
+    'solve_trends': 'telemetry',
+    'SolveJob': 'worker',
+}
+
+
+def __getattr__(name):
+    module = _LAZY_EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(f'.{module}', __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
+
+
+__all__ = [
+    'ARCHIVE_DIR',
+    'BATCH_SUMMARY_FILE',
+    'BuildProfile',
+    'CACHE_VERSION',
+    'CARRY_OVER_DAYS',
+    'CONFIG_VERSION',
+    'CSV_CHUNK_ROWS',
+    'CSV_FILE',
+    'CsvReport',
+    'DEFAULT_BOUNDARY_TIME_LIMIT',
+    'DEFAULT_OC_RATE',
+    'DEFAULT_OT_RATE',
+    'DEFAULT_PORT',
+    'DEFAULT_RATE_SN',
+    'DEFAULT_SEQUENCE_ENCODING',
+    'DEFAULT_SOLVER_PARAMS',
+    'DEFAULT_WARD',
+    'DEFAULT_WARD_CONFIG',
+    'DEFAULT_WORKERS_PER_JOB',
+    'FIX_REQUESTS_FILE',
+    'JobQueue',
+    'MIN_WORKERS_PER_JOB',
+    'NURSE_NAMES',
+    'OFF_FAIRNESS_EXCLUDED',
+    'QueueFull',
+    'REQUESTS_DB',
+    'REQUEST_KINDS',
+    'RuleGuards',
+    'SECTION_LABELS',
+    'SEQUENCE_ENCODINGS',
+    'SHIFTS',
+    'SHIFT_CODES',
+    'SN_FAIRNESS_EXCLUDED',
+    'STAFFING_OVERRIDES_FILE',
+    'Schedule',
+    'ShiftCode',
+    'ShiftVars',
+    'SolveCache',
+    'SolveJob',
+    'TELEMETRY_DB',
+    'THAI_HOLIDAYS',
+    'WARD_CONFIG_DIR',
+    'WORK_SHIFTS',
+    'WardConfig',
+    'add_schedule_hint',
+    'add_sequence_automaton',
+    'add_stored_requests',
+    'aggregate_fairness',
+    'archive_path',
+    'build_schedule_model',
+    'cache_entry',
+    'cached_schedule',
+    'cached_solve_schedule',
+    'capacity_errors',
+    'carry_over',
+    'carry_over_from_archive',
+    'check_capacity',
+    'clear_stored_month',
+    'compute_fairness',
+    'compute_payroll',
+    'configure_solver',
+    'default_ward_config',
+    'delete_stored_ids',
+    'delete_stored_requests',
+    'describe_guard',
+    'diagnose_scheduling_issues',
+    'discover_units',
+    'explain_infeasibility',
+    'extract_codes',
+    'fairness_from_archive',
+    'fairness_summary',
+    'generate_diagnosis_md',
+    'get_holiday_name',
+    'get_week_occurrence',
+    'is_holiday',
+    'iter_archive',
+    'iter_csv',
+    'iter_solutions',
+    'lead_in',
+    'list_wards',
+    'load_archived_schedule',
+    'load_fix_requests_from_csv',
+    'load_requests_from_csv',
+    'load_solve_history',
+    'load_staffing_overrides_from_csv',
+    'load_stored_requests',
+    'load_unit_inputs',
+    'load_ward_config',
+    'make_server',
+    'migrate_csv_requests',
+    'normalize_request',
+    'normalize_requests',
+    'parse_job_request',
+    'parse_previous_month_schedule',
+    'parse_shift_cell',
+    'payroll_from_archive',
+    'profile_model_build',
+    'read_csv',
+    'record_solve',
+    'render_schedule_df',
+    'replace_stored_month',
+    'reroster_schedule',
+    'resolve_ward_config',
+    'run_batch',
+    'run_solver',
+    'save_archived_schedule',
+    'save_edited_requests',
+    'save_fix_requests_to_csv',
+    'save_requests_to_csv',
+    'save_staffing_overrides_to_csv',
+    'schedule_changes',
+    'schedule_to_assignments',
+    'serve',
+    'shift_domains',
+    'shift_var_index',
+    'sniff_encoding',
+    'solve_cache_key',
+    'solve_fingerprint',
+    'solve_horizon',
+    'solve_outcome',
+    'solve_schedule',
+    'solve_schedule_codes',
+    'solve_stats',
+    'solve_trends',
+    'standard_work_days',
+    'stored_request_changes',
+    'transition_cost',
+    'ward_config_path',
+    'year_to_date',
+]
@@ -0,0 +1,189 @@
+"""คำสั่งแบบ headless ของ Scheduler Engine (ไม่ต้องเปิด UI)::
+
+    python -m scheduler payroll --year 2025 --through 10 --ytd --out payroll_2025.csv
+    python -m scheduler fairness --year 2025 --months 1 2 3 --fix-requests fix_requests.csv
+    python -m scheduler horizon --year 2025 --month 10 --num-months 3 --overlap 7 --out-dir horizon
+    python -m scheduler batch units/ --year 2025 --month 11 --cpus 8 --time-limit 600 --out-dir batch
+    python -m scheduler serve --port 8765 --queue-size 8
+"""
+
+import argparse
+import os
+import time
+
+from .archive import ARCHIVE_DIR, save_archived_schedule
+from .batch import run_batch
+from .fairness import aggregate_fairness, fairness_from_archive
+from .horizon import solve_horizon
+from .payroll import DEFAULT_OC_RATE, DEFAULT_OT_RATE, DEFAULT_RATE_SN, payroll_from_archive, year_to_date
+from .request_store import REQUESTS_DB, load_stored_requests
+from .sequence import SEQUENCE_ENCODINGS
+from .service import DEFAULT_HOST, DEFAULT_MAX_TIME_LIMIT, DEFAULT_PORT, DEFAULT_QUEUE_SIZE, serve
+from .solver import DEFAULT_SOLVER_PARAMS, DEFAULT_WORKERS_PER_JOB
+from .storage import (
+    FIX_REQUESTS_FILE,
+    load_fix_requests_from_csv,
+    load_requests_from_csv,
+    load_staffing_overrides_from_csv,
+)
+from .ward_config import DEFAULT_WARD_CONFIG, load_ward_config
+
+
+def _write_table(df, out):
+    if out:
+        df.to_csv(out, index=False, encoding='utf-8-sig')
+        print(f"บันทึก {len(df)} แถว → {out}")
+    else:
+        print(df.to_string(index=False))
+
+
+def run_payroll(args):
+    payroll = payroll_from_archive(args.archive, year=args.year, months=_selected_months(args), wards=args.ward,
+                                   rate_sn=args.rate_sn, ot_rate=args.ot_rate, oc_rate=args.oc_rate)
+    if args.ytd:
+        payroll = year_to_date(payroll)
+    _write_table(payroll, args.out)
+
+
+def _selected_months(args):
+    if args.through:
+        return list(range(1, args.through + 1))
+    return args.months
+
+
+def run_fairness(args):
+    fix_requests = load_fix_requests_from_csv(args.fix_requests) if args.fix_requests else []
+    scores = fairness_from_archive(args.archive, year=args.year, months=_selected_months(args),
+                                   wards=args.ward, fix_requests=fix_requests)
+    if not args.monthly:
+        scores = aggregate_fairness(scores)
+    _write_table(scores, args.out)
+
+
+def run_horizon(args):
+    ward_config = load_ward_config(args.ward)
+
+    def progress(info):
+        gain = f" (+{info['gain']:.0f})" if info.get('gain') else ''
+        print(f"{info['year']}-{info['month']:02d} {info['step']}: {info['status']}{gain}")
+
+    if os.path.exists(args.requests_db):
+        # คำขอที่บันทึกจาก UI (ทุกเดือน แต่ละเดือนกรองเอง)
+        inputs = [load_stored_requests(kind, path=args.requests_db)
+                  for kind in ['requests', 'fix_requests', 'staffing_overrides']]
+    else:
+        inputs = [load_requests_from_csv(), load_fix_requests_from_csv(args.fix_requests),
+                  load_staffing_overrides_from_csv()]
+    schedules = solve_horizon(
+        args.year, args.month, args.num_months, ward_config.nurses, *inputs,
+        enable_oc=not args.no_oc, solver_params={'time_limit': args.time_limit}, ward_config=ward_config,
+        sequence_encoding=args.sequence_encoding, archive_root=args.archive, overlap_days=args.overlap,
+        progress_callback=progress,
+    )
+    for schedule in schedules:
+        print(f"บันทึก → {save_archived_schedule(args.out_dir, ward_config.ward, schedule)}")
+    if len(schedules) < args.num_months:
+        raise SystemExit(f"จัดได้ {len(schedules)} จาก {args.num_months} เดือน")
+
+
+def run_batch_command(args):
+    def progress(row):
+        print(f"{row['unit']} {row['year']}-{row['month']:02d}: {row['outcome']}"
+              + (f" ({row['error']})" if row.get('error') else ''))
+
+    started = time.perf_counter()
+    summary = run_batch(args.root, args.year, args.month, args.num_months, out_dir=args.out_dir, units=args.unit,
+                        cpus=args.cpus, workers_per_job=args.workers_per_job, time_limit=args.time_limit,
+                        enable_oc=not args.no_oc, overlap_days=args.overlap, archive_root=args.archive,
+                        sequence_encoding=args.sequence_encoding, progress_callback=progress)
+    print(summary.drop(columns=['path', 'error']).to_string(index=False))
+    print(f"{len(summary)} ตาราง ใช้เวลา {time.perf_counter() - started:.0f} วินาที → {args.out_dir}")
+    failed = summary[~summary['outcome'].isin(['optimal', 'solved'])]
+    if not failed.empty:
+        raise SystemExit(f"จัดไม่ได้ {len(failed)} ตาราง (ดู summary.csv)")
+
+
+def run_serve(args):
+    serve(args.host, args.port, cpus=args.cpus, workers_per_job=args.workers_per_job, queue_size=args.queue_size,
+          max_time_limit=args.max_time_limit)
+
+
+def _add_archive_arguments(command):
+    command.add_argument('--archive', default=ARCHIVE_DIR, help='โฟลเดอร์คลังตาราง')
+    command.add_argument('--year', type=int, required=True)
+    command.add_argument('--months', type=int, nargs='+', help='เฉพาะเดือนที่ระบุ')
+    command.add_argument('--through', type=int, help='เดือน 1 ถึงเดือนนี้ (year-to-date)')
+    command.add_argument('--ward', nargs='+', help='เฉพาะวอร์ดที่ระบุ')
+    command.add_argument('--out', help='ไฟล์ CSV ผลลัพธ์ (ไม่ระบุ = แสดงบนจอ)')
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m scheduler', description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    payroll = commands.add_parser('payroll', help='ค่าตอบแทนจากคลังตาราง (รายเดือน / ยอดสะสม)')
+    _add_archive_arguments(payroll)
+    payroll.add_argument('--rate-sn', type=int, default=DEFAULT_RATE_SN)
+    payroll.add_argument('--ot-rate', type=int, default=DEFAULT_OT_RATE)
+    payroll.add_argument('--oc-rate', type=int, default=DEFAULT_OC_RATE)
+    payroll.add_argument('--ytd', action='store_true', help='รวมเป็นยอดสะสมต่อคน (แทนรายเดือน)')
+    payroll.set_defaults(func=run_payroll)
+
+    fairness = commands.add_parser('fairness', help='คะแนนความยุติธรรมจากคลังตาราง (รวมทั้งช่วง / รายเดือน)')
+    _add_archive_arguments(fairness)
+    fairness.add_argument('--fix-requests', help='ไฟล์คำขอ Fix (CSV) สำหรับคิด Fix Rate')
+    fairness.add_argument('--monthly', action='store_true', help='แสดงรายเดือน (แทนผลรวม)')
+    fairness.set_defaults(func=run_fairness)
+
+    horizon = commands.add_parser('horizon', help='จัดตารางหลายเดือนต่อกัน (ต่อเวรท้ายเดือนให้อัตโนมัติ)')
+    horizon.add_argument('--year', type=int, required=True)
+    horizon.add_argument('--month', type=int, required=True, help='เดือนแรก')
+    horizon.add_argument('--num-months', type=int, default=3)
+    horizon.add_argument('--ward', default=DEFAULT_WARD_CONFIG, help='ค่ากฎของวอร์ด (scheduler/wards/<ward>.json)')
+    horizon.add_argument('--archive', default=ARCHIVE_DIR, help='คลังตาราง (อ่านเวรท้ายเดือนก่อนเดือนแรก)')
+    horizon.add_argument('--overlap', type=int, default=0, help='จำนวนวันแต่ละฝั่งของรอยต่อเดือนที่จัดใหม่ (0 = ไม่ปรับ)')
+    horizon.add_argument('--time-limit', type=float, default=DEFAULT_SOLVER_PARAMS['time_limit'],
+                         help='วินาทีต่อเดือน')
+    horizon.add_argument('--no-oc', action='store_true', help='ปิดเวร OC')
+    horizon.add_argument('--sequence-encoding', choices=SEQUENCE_ENCODINGS)
+    horizon.add_argument('--requests-db', default=REQUESTS_DB, help='ฐานข้อมูลคำขอของ UI (ไม่มีไฟล์ = อ่านจาก CSV)')
+    horizon.add_argument('--fix-requests', default=FIX_REQUESTS_FILE, help='ไฟล์คำขอ Fix (CSV) เมื่อไม่มีฐานข้อมูลคำขอ')
+    horizon.add_argument('--out-dir', default='horizon', help='โฟลเดอร์ผลลัพธ์ (<out-dir>/<ward>/<ปี>-<เดือน>.csv)')
+    horizon.set_defaults(func=run_horizon)
+
+    batch = commands.add_parser('batch', help='จัดตารางทุกหน่วยงานในโฟลเดอร์พร้อมกันหลาย process')
+    batch.add_argument('root', help='โฟลเดอร์ input (<root>/<unit>/ward.json + CSV คำขอ)')
+    batch.add_argument('--year', type=int, required=True)
+    batch.add_argument('--month', type=int, required=True, help='เดือนแรก')
+    batch.add_argument('--num-months', type=int, default=1)
+    batch.add_argument('--unit', nargs='+', help='เฉพาะหน่วยงานที่ระบุ')
+    batch.add_argument('--cpus', type=int, help='core ทั้งหมดที่ให้ใช้ (ไม่ระบุ = ทุก core)')
+    batch.add_argument('--workers-per-job', type=int, default=DEFAULT_WORKERS_PER_JOB,
+                       help='CP-SAT worker ต่องาน (อย่างน้อย 2)')
+    batch.add_argument('--time-limit', type=float, default=DEFAULT_SOLVER_PARAMS['time_limit'],
+                       help='วินาทีต่อเดือนต่อหน่วยงาน')
+    batch.add_argument('--no-oc', action='store_true', help='ปิดเวร OC')
+    batch.add_argument('--overlap', type=int, default=0, help='ปรับรอยต่อเดือน (ดู horizon)')
+    batch.add_argument('--archive', default=ARCHIVE_DIR, help='คลังตาราง (เวรท้ายเดือนก่อน เมื่อไม่มี prev_month.csv)')
+    batch.add_argument('--sequence-encoding', choices=SEQUENCE_ENCODINGS)
+    batch.add_argument('--out-dir', default='batch', help='โฟลเดอร์ผลลัพธ์ (<out-dir>/<unit>/<ปี>-<เดือน>.csv + summary.csv)')
+    batch.set_defaults(func=run_batch_command)
+
+    service = commands.add_parser('serve', help='HTTP service ในเครื่อง (ส่งงานจัดตาราง/ดูสถานะ/รับผล JSON หรือ CSV)')
+    service.add_argument('--host', default=DEFAULT_HOST, help='ที่อยู่ที่ฟัง (ค่าเริ่มต้น = เฉพาะเครื่องนี้)')
+    service.add_argument('--port', type=int, default=DEFAULT_PORT)
+    service.add_argument('--cpus', type=int, help='core ทั้งหมดที่ให้ใช้ (ไม่ระบุ = ทุก core)')
+    service.add_argument('--workers-per-job', type=int, default=DEFAULT_WORKERS_PER_JOB,
+                         help='CP-SAT worker ต่องาน (อย่างน้อย 2)')
+    service.add_argument('--queue-size', type=int, default=DEFAULT_QUEUE_SIZE, help='งานที่รอได้ (เกินนี้ตอบ 429)')
+    service.add_argument('--max-time-limit', type=float, default=DEFAULT_MAX_TIME_LIMIT,
+                         help='time_limit สูงสุดที่งานขอได้ (วินาที)')
+    service.set_defaults(func=run_serve)
+
+    args = parser.parse_args(argv)
+    args.func(args)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,59 @@
+"""คลังตารางเวรที่ประกาศแล้ว แยกตามวอร์ด/เดือน (ใช้คำนวณค่าตอบแทน/คะแนนย้อนหลังแบบไม่ต้องเปิด UI)
+
+โครงสร้างโฟลเดอร์::
+
+    <root>/<ward>/<year>-<month>.csv     เช่น archive/ER_KPH/2025-10.csv
+
+แต่ละไฟล์เป็นตารางแสดงผล (เหมือนที่ดาวน์โหลดจากหน้าจอ)
+"""
+
+import os
+import re
+
+import pandas as pd
+
+from .schedule import Schedule
+
+ARCHIVE_DIR = "archive"
+DEFAULT_WARD = "ER_KPH"
+_ARCHIVE_FILE = re.compile(r'^(\d{4})-(\d{1,2})\.csv$')
+
+
+def archive_path(root, ward, year, month):
+    return os.path.join(root, ward, f"{year}-{month:02d}.csv")
+
+
+def save_archived_schedule(root, ward, schedule):
+    """บันทึก Schedule ลงคลัง (ทับไฟล์เดิมของเดือนนั้น) คืนค่า path"""
+    path = archive_path(root, ward, schedule.year, schedule.month)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    schedule.to_display_df().to_csv(path, index=False, encoding='utf-8')
+    return path
+
+
+def load_archived_schedule(path, year, month):
+    df = pd.read_csv(path, encoding='utf-8', dtype=str, keep_default_na=False)
+    return Schedule.from_display_df(df, year, month)
+
+
+def iter_archive(root, wards=None, year=None, months=None):
+    """ไล่อ่านคลัง yield (ward, Schedule) เรียงตามวอร์ด/เดือน
+
+    wards/months = จำกัดเฉพาะที่ระบุ (None = ทั้งหมด), year = เฉพาะปีนั้น
+    """
+    if not os.path.isdir(root):
+        return
+    for ward in sorted(os.listdir(root)):
+        ward_dir = os.path.join(root, ward)
+        if not os.path.isdir(ward_dir) or (wards is not None and ward not in wards):
+            continue
+        entries = []
+        for name in os.listdir(ward_dir):
+            match = _ARCHIVE_FILE.match(name)
+            if not match:
+                continue
+            y, m = int(match.group(1)), int(match.group(2))
+            if (year is None or y == year) and (months is None or m in months):
+                entries.append((y, m, os.path.join(ward_dir, name)))
+        for y, m, path in sorted(entries):
+            yield ward, load_archived_schedule(path, y, m)
@@ -0,0 +1,172 @@
+"""จัดตารางหลายวอร์ด/หลายเดือนแบบ headless กระจายงานไปหลาย process (เช่นรันข้ามคืนให้ทุกหน่วยงาน)
+
+โครงสร้างโฟลเดอร์ input (1 โฟลเดอร์ย่อย = 1 หน่วยงาน ชื่อโฟลเดอร์ = ชื่อที่ใช้ในผลลัพธ์)::
+
+    <root>/<unit>/ward.json               ค่ากฎของวอร์ด (รูปแบบเดียวกับ scheduler/wards/*.json)
+    <root>/<unit>/leave_requests.csv      คำขอหยุด/ลา (ไม่มี = ไม่มีคำขอ)
+    <root>/<unit>/fix_requests.csv        คำขอเวร Fix
+    <root>/<unit>/staffing_overrides.csv  กำลังคนพิเศษ
+    <root>/<unit>/prev_month.csv          ตารางเดือนก่อน (ไม่มี → อ่านจากคลัง <archive>/<unit>/ ถ้ามี)
+
+ผลลัพธ์: <out_dir>/<unit>/<ปี>-<เดือน>.csv (รูปแบบเดียวกับคลังตาราง) + <out_dir>/summary.csv
+
+งบ CPU: cpus = จำนวน core ทั้งหมดที่ให้ใช้, workers_per_job = CP-SAT worker ต่องาน
+→ รันพร้อมกัน cpus // workers_per_job งาน (ไม่แย่ง core กันเอง)
+workers_per_job น้อย = รันพร้อมกันได้หลายหน่วยงาน แต่แต่ละงานหาคำตอบช้าลง:
+1 worker มีแค่ search หลัก ไม่มี LNS / feasibility jump (ER_KPH 2025-11 ให้ 60 วินาทียังไม่เจอคำตอบ)
+จึงใช้อย่างน้อย MIN_WORKERS_PER_JOB (2) ค่าเริ่มต้น DEFAULT_WORKERS_PER_JOB (4)
+เครื่องที่ core น้อยกว่านั้นรันทีละงานโดยยังใช้ worker ตามนี้ (thread แบ่ง core กัน)
+งบเวลา: time_limit วินาทีต่อเดือนของแต่ละงาน (หลายเดือน = จัดต่อกันด้วย solve_horizon)
+"""
+
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import pandas as pd
+
+from .archive import save_archived_schedule
+from .horizon import carry_over_from_archive, next_month, solve_horizon
+from .prev_month import parse_previous_month_schedule
+from .schedule import Schedule
+from .solver import DEFAULT_SOLVER_PARAMS, DEFAULT_WORKERS_PER_JOB, MIN_WORKERS_PER_JOB
+from .storage import (
+    CSV_FILE,
+    FIX_REQUESTS_FILE,
+    STAFFING_OVERRIDES_FILE,
+    load_fix_requests_from_csv,
+    load_requests_from_csv,
+    load_staffing_overrides_from_csv,
+)
+from .telemetry import solve_outcome
+from .ward_config import load_ward_config
+
+BATCH_CONFIG = "ward"  # <unit>/ward.json
+PREV_MONTH_FILE = "prev_month.csv"
+BATCH_SUMMARY_FILE = "summary.csv"
+
+_SUMMARY_COLUMNS = ['unit', 'ward', 'year', 'month', 'status', 'outcome', 'objective', 'best_bound', 'wall_time',
+                    'path', 'error']
+
+# spawn: เหมือน worker.py (process ลูกไม่ติด thread/lock ของ process แม่)
+_MP_CONTEXT = multiprocessing.get_context('spawn')
+
+
+def discover_units(root, units=None):
+    """โฟลเดอร์ย่อยของ root ที่มี ward.json เรียงตามชื่อ (units = เฉพาะที่ระบุ)"""
+    if not os.path.isdir(root):
+        return []
+    found = []
+    for name in sorted(os.listdir(root)):
+        if units is not None and name not in units:
+            continue
+        if os.path.isfile(os.path.join(root, name, f"{BATCH_CONFIG}.json")):
+            found.append(name)
+    return found
+
+
+def load_unit_inputs(unit_dir, unit, year, month, archive_root=None):
+    """อ่าน input ของหน่วยงาน คืนค่า dict (ward_config, requests, fix_requests, staffing_overrides, prev_month_data)"""
+    ward_config = load_ward_config(BATCH_CONFIG, root=unit_dir)
+    prev_path = os.path.join(unit_dir, PREV_MONTH_FILE)
+    if os.path.exists(prev_path):
+        prev_month_data = parse_previous_month_schedule(prev_path, ward_config.nurses)
+    elif archive_root is not None:
+        prev_month_data = carry_over_from_archive(archive_root, unit, year, month)
+    else:
+        prev_month_data = None
+    return {
+        'ward_config': ward_config,
+        'requests': load_requests_from_csv(os.path.join(unit_dir, CSV_FILE)),
+        'fix_requests': load_fix_requests_from_csv(os.path.join(unit_dir, FIX_REQUESTS_FILE)),
+        'staffing_overrides': load_staffing_overrides_from_csv(os.path.join(unit_dir, STAFFING_OVERRIDES_FILE)),
+        'prev_month_data': prev_month_data,
+    }
+
+
+def _run_unit(job):
+    """ทำงานใน process ลูก: จัดตารางทุกเดือนของ 1 หน่วยงาน คืนค่า dict (ส่ง codes กลับเป็น int8 ไม่ใช่ DataFrame)"""
+    stats = []
+    try:
+        schedules = solve_horizon(
+            job['year'], job['month'], job['num_months'], job['ward_config'].nurses, job['requests'],
+            job['fix_requests'], job['staffing_overrides'], enable_oc=job['enable_oc'],
+            prev_month_data=job['prev_month_data'], solver_params=job['solver_params'],
+            ward_config=job['ward_config'], sequence_encoding=job['sequence_encoding'],
+            overlap_days=job['overlap_days'], stats=stats,
+        )
+    except Exception as e:
+        return {'unit': job['unit'], 'codes': [], 'stats': stats, 'error': f"{type(e).__name__}: {e}"}
+    return {'unit': job['unit'], 'codes': [(s.year, s.month, s.codes) for s in schedules], 'stats': stats,
+            'error': None}
+
+
+def _summary_rows(job, result, out_dir):
+    """แถวของ summary ต่อเดือน (เดือนที่ไม่ได้จัดเพราะเดือนก่อนหน้าจัดไม่ได้ = skipped) + บันทึกตาราง"""
+    ward_config = job['ward_config']
+    paths = {}
+    for year, month, codes in result['codes']:
+        schedule = Schedule(codes, ward_config.nurses, year, month, ward_config)
+        paths[(year, month)] = save_archived_schedule(out_dir, job['unit'], schedule)
+    stats = {(s['year'], s['month']): s for s in result['stats']}
+
+    rows = []
+    year, month = job['year'], job['month']
+    for _ in range(job['num_months']):
+        s = stats.get((year, month))
+        row = {'unit': job['unit'], 'ward': ward_config.ward, 'year': year, 'month': month,
+               'path': paths.get((year, month)), 'error': result['error']}
+        if s is not None:
+            row.update(status=s.get('status'), outcome=solve_outcome(s, error=result['error']),
+                       objective=s.get('objective'), best_bound=s.get('best_bound'), wall_time=s.get('wall_time'))
+        else:
+            row.update(status=None, outcome='error' if result['error'] else 'skipped')
+        rows.append(row)
+        year, month = next_month(year, month)
+    return rows
+
+
+def run_batch(root, year, month, num_months=1, out_dir='batch', units=None, cpus=None,
+              workers_per_job=DEFAULT_WORKERS_PER_JOB, time_limit=DEFAULT_SOLVER_PARAMS['time_limit'], enable_oc=True,
+              overlap_days=0, archive_root=None, sequence_encoding=None, progress_callback=None):
+    """จัดตารางทุกหน่วยงานใน root พร้อมกันหลาย process คืนค่า DataFrame สรุป (บันทึก summary.csv ด้วย)
+
+    cpus = core ทั้งหมดที่ให้ใช้ (None = ทุก core), workers_per_job = CP-SAT worker ต่องาน (อย่างน้อย 2)
+    time_limit = วินาทีต่อเดือนต่อหน่วยงาน, overlap_days = ปรับรอยต่อเดือน (ดู solve_horizon)
+    archive_root = คลังตารางสำหรับเวรท้ายเดือนก่อน (เมื่อหน่วยงานไม่มี prev_month.csv)
+    progress_callback(row) = เรียกทุกครั้งที่หน่วยงานจัดเสร็จ (row ของแต่ละเดือนใน summary)
+    """
+    cpus = cpus or os.cpu_count() or 1
+    workers_per_job = max(MIN_WORKERS_PER_JOB, workers_per_job)
+    pool_size = max(1, cpus // workers_per_job)
+    solver_params = {'time_limit': time_limit, 'num_workers': workers_per_job}
+
+    rows = []
+    jobs = []
+    for unit in discover_units(root, units):
+        try:
+            inputs = load_unit_inputs(os.path.join(root, unit), unit, year, month, archive_root)
+        except (OSError, ValueError, KeyError) as e:  # JSONDecodeError เป็น ValueError
+            # input ของหน่วยงานนี้เสีย → บันทึกใน summary แล้วทำหน่วยงานอื่นต่อ
+            row = {'unit': unit, 'year': year, 'month': month, 'outcome': 'error', 'error': f"{type(e).__name__}: {e}"}
+            rows.append(row)
+            if progress_callback is not None:
+                progress_callback(row)
+            continue
+        jobs.append({'unit': unit, 'year': year, 'month': month, 'num_months': num_months, 'enable_oc': enable_oc,
+                     'solver_params': solver_params, 'sequence_encoding': sequence_encoding,
+                     'overlap_days': overlap_days, **inputs})
+
+    if jobs:
+        with ProcessPoolExecutor(max_workers=min(pool_size, len(jobs)), mp_context=_MP_CONTEXT) as pool:
+            futures = {pool.submit(_run_unit, job): job for job in jobs}
+            for future in as_completed(futures):
+                for row in _summary_rows(futures[future], future.result(), out_dir):
+                    rows.append(row)
+                    if progress_callback is not None:
+                        progress_callback(row)
+
+    summary = pd.DataFrame(rows, columns=_SUMMARY_COLUMNS).sort_values(['unit', 'year', 'month'], kind='stable')
+    os.makedirs(out_dir, exist_ok=True)
+    summary.to_csv(os.path.join(out_dir, BATCH_SUMMARY_FILE), index=False, encoding='utf-8-sig')
+    return summary.reset_index(drop=True)
@@ -0,0 +1,186 @@
+"""Cache ผลการจัดตาราง: input เดิม → ได้ตารางเดิมทันที ไม่ต้อง solve ใหม่
+
+แต่ละรายการเก็บสถานะของ solver และงบเวลาที่ใช้ด้วย (cache_entry): ตาราง OPTIMAL ใช้ซ้ำได้เสมอ
+ตาราง FEASIBLE (หมดเวลาก่อนพิสูจน์ว่าดีที่สุด) ใช้ซ้ำเฉพาะเมื่อขอเวลาไม่มากกว่าเดิม (ดู cached_schedule)
+"""
+
+import hashlib
+import json
+import os
+import pickle
+import threading
+from collections import OrderedDict
+
+from .solver import DEFAULT_SOLVER_PARAMS, solve_schedule
+from .ward_config import resolve_ward_config
+
+# เปลี่ยนเลขนี้เมื่อแก้กฎในโมเดล เพื่อไม่ให้ใช้ผลลัพธ์เก่าที่คำนวณด้วยกฎเดิม
+CACHE_VERSION = 2
+
+
+def _as_int(value, default=0):
+    try:
+        return int(float(value))
+    except (TypeError, ValueError):
+        return default
+
+
+def _month_records(records, year, month, fields):
+    """เลือกเฉพาะ record ของเดือน/ปีนี้ (ตรงกับที่ solver ใช้จริง) แล้วเรียงให้ได้ลำดับคงที่"""
+    selected = []
+    for rec in records or []:
+        if _as_int(rec.get('month', month)) != month or _as_int(rec.get('year', year)) != year:
+            continue
+        selected.append({f: rec.get(f) for f in fields})
+    return sorted(selected, key=lambda r: json.dumps(r, sort_keys=True, default=str))
+
+
+def solve_cache_key(year, month, days_in_month, nurses, requests, fix_requests=None,
+                    staffing_overrides=None, enable_oc=True, prev_month_data=None, ward_config=None):
+    """hash ของ input ทั้งหมดที่มีผลต่อตาราง (ลำดับของคำขอ/คำขอของเดือนอื่นไม่มีผล)
+
+    รวม fingerprint ของค่ากฎวอร์ดด้วย → แก้ไฟล์ค่ากฎแล้วจะไม่ได้ตารางเก่าจาก cache
+    """
+    canonical_requests = _month_records(requests, year, month, ['nurse', 'date', 'type', 'priority'])
+    for rec in canonical_requests:
+        rec['date'] = _as_int(rec['date'])
+        rec['priority'] = _as_int(rec['priority'], 1) if rec['type'] == 'Off' else None
+
+    canonical_fix = _month_records(fix_requests, year, month, ['nurse', 'shift', 'dates'])
+    for rec in canonical_fix:
+        rec['dates'] = sorted(_as_int(d) for d in (rec['dates'] or []))
+
+    canonical_overrides = _month_records(staffing_overrides, year, month, ['start', 'end', 'shift', 'count'])
+    for rec in canonical_overrides:
+        for f in ['start', 'end', 'count']:
+            if rec[f] is not None:
+                rec[f] = _as_int(rec[f])
+
+    payload = {
+        'version': CACHE_VERSION,
+        'year': int(year),
+        'month': int(month),
+        'days_in_month': int(days_in_month),
+        'nurses': list(nurses),
+        'requests': canonical_requests,
+        'fix_requests': canonical_fix,
+        'staffing_overrides': canonical_overrides,
+        'enable_oc': bool(enable_oc),
+        'prev_month_data': {n: list(s) for n, s in sorted((prev_month_data or {}).items())},
+        'ward_config': resolve_ward_config(ward_config).fingerprint,
+    }
+    blob = json.dumps(payload, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(blob.encode('utf-8')).hexdigest()
+
+
+def cache_entry(schedule_df, stats):
+    """รายการที่เก็บใน SolveCache: ตาราง + สถานะ solver + งบเวลาที่ใช้ (จาก stats ของ solve_stats)"""
+    params = stats.get('params') or {}
+    return {
+        'schedule': schedule_df.copy(),
+        'status': stats.get('status'),
+        'time_limit': float(params.get('time_limit') or 0.0),
+    }
+
+
+def cached_schedule(entry, time_limit=None):
+    """ตารางจาก cache entry ถ้ายังใช้ได้กับงบเวลา time_limit (None = ค่าเริ่มต้น) ไม่งั้นคืน None
+
+    OPTIMAL ใช้ได้เสมอ, FEASIBLE ใช้ได้เมื่อ time_limit ไม่มากกว่าตอนที่ solve ไว้
+    (ขอเวลามากขึ้น = solve ใหม่ อาจได้ตารางที่ดีกว่า)
+    """
+    if not isinstance(entry, dict) or entry.get('schedule') is None:
+        return None
+    if time_limit is None:
+        time_limit = DEFAULT_SOLVER_PARAMS['time_limit']
+    if entry['status'] == 'OPTIMAL' or (entry['status'] == 'FEASIBLE' and time_limit <= entry['time_limit']):
+        return entry['schedule'].copy()
+    return None
+
+
+class SolveCache:
+    """LRU cache ในหน่วยความจำ (จำกัด max_entries) + เก็บลงโฟลเดอร์ cache_dir ได้ (ถ้าระบุ)
+
+    ใช้ร่วมกันหลาย session ได้ (thread-safe)
+    """
+
+    def __init__(self, max_entries=32, cache_dir=None):
+        self.max_entries = max_entries
+        self.cache_dir = cache_dir
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.pkl")
+
+    def get(self, key):
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                return self._entries[key]
+        if not self.cache_dir or not os.path.exists(self._path(key)):
+            return None
+        try:
+            with open(self._path(key), 'rb') as f:
+                value = pickle.load(f)
+        except (OSError, pickle.UnpicklingError, EOFError) as e:
+            print(f"Error loading cache entry {key}: {e}")
+            return None
+        self._remember(key, value)
+        return value
+
+    def put(self, key, value):
+        self._remember(key, value)
+        if self.cache_dir:
+            # เขียนไฟล์ชั่วคราวก่อนแล้วค่อยย้าย กันไฟล์เสียถ้าโปรแกรมหยุดกลางคัน
+            tmp_path = self._path(key) + '.tmp'
+            with open(tmp_path, 'wb') as f:
+                pickle.dump(value, f)
+            os.replace(tmp_path, self._path(key))
+
+    def _remember(self, key, value):
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+        if self.cache_dir:
+            for name in os.listdir(self.cache_dir):
+                if name.endswith('.pkl'):
+                    os.remove(os.path.join(self.cache_dir, name))
+
+
+def cached_solve_schedule(cache, year, month, days_in_month, nurses, requests, fix_requests=None,
+                          staffing_overrides=None, enable_oc=True, prev_month_data=None, ward_config=None,
+                          refresh=False, **solve_kwargs):
+    """เหมือน solve_schedule แต่ดู cache ก่อน คืนค่า (DataFrame หรือ None, มาจาก cache หรือไม่)
+
+    ไม่ cache กรณีจัดไม่ได้ เพราะอาจแค่หมดเวลา (ลองใหม่ด้วยเวลามากขึ้นอาจได้)
+    solve_kwargs (solver_params, hint_schedule) ไม่นับเป็นส่วนของ key แต่ time_limit ใช้ตัดสินว่า
+    ผลลัพธ์ FEASIBLE เดิมยังใช้ได้หรือไม่ (ดู cached_schedule) refresh=True = solve ใหม่เสมอ
+    """
+    key = solve_cache_key(year, month, days_in_month, nurses, requests, fix_requests,
+                          staffing_overrides, enable_oc, prev_month_data, ward_config)
+    time_limit = (solve_kwargs.get('solver_params') or {}).get('time_limit')
+    if not refresh:
+        df = cached_schedule(cache.get(key), time_limit)
+        if df is not None:
+            return df, True
+
+    stats = solve_kwargs.pop('stats', None)
+    stats = stats if stats is not None else {}
+    df = solve_schedule(year, month, days_in_month, nurses, requests, fix_requests, staffing_overrides,
+                        enable_oc=enable_oc, prev_month_data=prev_month_data, ward_config=ward_config,
+                        stats=stats, **solve_kwargs)
+    if df is not None:
+        cache.put(key, cache_entry(df, stats))
+    return df, False
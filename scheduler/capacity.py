@@ -0,0 +1,164 @@
+"""ตรวจกำลังคนต่อวันก่อนสร้างโมเดล (ใช้เวลาระดับมิลลิวินาที)
+
+สร้างเมทริกซ์ พยาบาล × วัน ว่าใครว่างทำเวรได้บ้าง แล้วเทียบกับจำนวนคนขั้นต่ำของแต่ละวัน
+ทีละทั้งเดือนด้วย numpy ถ้าคนไม่พอแน่ๆ ก็ไม่ต้องเสียเวลาสร้างโมเดล/รัน CP-SAT
+
+จำนวนคนขั้นต่ำต่อวัน = M + max(S, N) + OC (NS คนเดียวนับเป็นทั้ง S และ N ได้)
+เป็นเงื่อนไขจำเป็น (ผ่านแล้วก็ยังอาจจัดไม่ได้เพราะกฎอื่น) แต่ถ้าไม่ผ่านจัดไม่ได้แน่นอน
+"""
+
+import calendar
+
+import numpy as np
+
+from .thai_calendar import is_holiday
+from .ward_config import default_ward_config, resolve_ward_config
+
+WEEKDAY_LABELS = ['จ', 'อ', 'พ', 'พฤ', 'ศ', 'ส', 'อา']
+# ค่าของวอร์ดหลัก (คงไว้ให้โค้ดเดิม) วอร์ดอื่นใช้ค่าจาก WardConfig
+OC_HARD_BAN = default_ward_config().oc_hard_ban
+OC_LAST_DAY = default_ward_config().oc_last_day
+
+
+def _day_requirements(year, month, days_in_month, staffing_overrides, enable_oc, ward):
+    """จำนวนคนขั้นต่ำของแต่ละวัน (array ยาว days_in_month): M, S, N, OC และ holiday"""
+    days = np.arange(1, days_in_month + 1)
+    weekday = np.array([calendar.weekday(year, month, d) for d in days])
+    holiday = np.array([is_holiday(year, month, d) for d in days], dtype=bool)
+    special = (weekday >= 5) | holiday
+
+    staffing = ward.staffing
+    req_m = np.where(special, staffing['M_special'], staffing['M'])
+    req_s = np.full(days_in_month, staffing['S'])
+    req_n = np.full(days_in_month, staffing['N'])
+    # override ทีหลังทับก่อนหน้า (เหมือนใน build_schedule_model)
+    for override in staffing_overrides or []:
+        if override.get('month') == month and override.get('year') == year:
+            start = max(1, override.get('start', 1))
+            end = min(days_in_month, override.get('end', days_in_month))
+            if override.get('shift') == 'N':
+                req_n[start - 1:end] = override.get('count', staffing['N'])
+            elif override.get('shift') == 'S':
+                req_s[start - 1:end] = override.get('count', staffing['S'])
+    req_oc = ((days <= ward.oc_last_day) & bool(enable_oc)).astype(int)
+    return weekday, holiday, req_m, req_s, req_n, req_oc
+
+
+def _request_mask(requests, req_type, nurse_index, year, month, days_in_month):
+    """เมทริกซ์ bool พยาบาล × วัน ของคำขอประเภท req_type"""
+    rows, cols = [], []
+    for req in requests or []:
+        if req.get('type') != req_type or req.get('nurse') not in nurse_index:
+            continue
+        if req.get('month', month) != month or req.get('year', year) != year:
+            continue
+        if 1 <= req.get('date', 0) <= days_in_month:
+            rows.append(nurse_index[req['nurse']])
+            cols.append(req['date'] - 1)
+    mask = np.zeros((len(nurse_index), days_in_month), dtype=bool)
+    mask[rows, cols] = True
+    return mask
+
+
+def _fix_masks(fix_requests, nurse_index, year, month, days_in_month):
+    """คำขอ Fix แยกตามเวร {'M': mask, 'S': mask, 'N': mask}"""
+    masks = {s: np.zeros((len(nurse_index), days_in_month), dtype=bool) for s in ['M', 'S', 'N']}
+    for req in fix_requests or []:
+        if req.get('month') != month or req.get('year') != year:
+            continue
+        if req.get('nurse') not in nurse_index or req.get('shift') not in masks:
+            continue
+        days = [d - 1 for d in req.get('dates', []) if 1 <= d <= days_in_month]
+        masks[req['shift']][nurse_index[req['nurse']], days] = True
+    return masks
+
+
+def check_capacity(year, month, days_in_month, nurses, requests, fix_requests=None, staffing_overrides=None,
+                   enable_oc=True, ward_config=None):
+    """ตรวจว่าแต่ละวันมีคนว่างพอหรือไม่ คืนค่า list ของปัญหา (ว่าง = ผ่าน)
+
+    แต่ละรายการเป็น dict: day, weekday, level, message, available, needed
+      level 'error'   = จัดไม่ได้แน่นอน (ลา/อบรม, เวรประจำ เช่น ER1, กำลังคนพิเศษ, OC)
+      level 'warning' = จัดได้ แต่ให้คำขอหยุด/Fix ทั้งหมดของวันนั้นพร้อมกันไม่ได้
+    ward_config: WardConfig หรือชื่อวอร์ด (None = วอร์ดหลัก)
+    """
+    ward = resolve_ward_config(ward_config)
+    nurse_index = {n: i for i, n in enumerate(nurses)}
+    weekday, holiday, req_m, req_s, req_n, req_oc = _day_requirements(
+        year, month, days_in_month, staffing_overrides, enable_oc, ward
+    )
+    leave = _request_mask(requests, 'Leave_Train', nurse_index, year, month, days_in_month)
+    off = _request_mask(requests, 'Off', nurse_index, year, month, days_in_month)
+    fix = _fix_masks(fix_requests, nurse_index, year, month, days_in_month)
+
+    issues = []
+
+    # เวรประจำ (เช่น ER1: ศุกร์ = M, วันอื่น = หยุด) → ไม่นับเป็นคนว่างทั่วไป แต่ช่วยเวรตาม pattern ได้
+    available = ~leave
+    fixed_work = {s: np.zeros(days_in_month, dtype=int) for s in ['M', 'S', 'N']}
+    for nurse in ward.fixed_patterns:
+        if nurse not in nurse_index:
+            continue
+        i = nurse_index[nurse]
+        pattern = np.array([ward.pattern_shift(nurse, wd, hol) for wd, hol in zip(weekday, holiday)])
+        for s in fixed_work:
+            fixed_work[s] += ((pattern == s) & ~leave[i]).astype(int)
+        available[i] = False
+        for d in np.flatnonzero(leave[i]) + 1:
+            issues.append({
+                'day': int(d), 'weekday': WEEKDAY_LABELS[weekday[d - 1]], 'level': 'error',
+                'message': f"{nurse} ขอลา/อบรม ขัดกับเวรประจำของ {nurse}",
+                'available': None, 'needed': None,
+            })
+    oc_pool = np.array([n not in ward.oc_hard_ban for n in nurses], dtype=bool)[:, None]
+
+    # ---- Hard: นับเฉพาะสิ่งที่บังคับจริง ----
+    need_m = np.maximum(req_m - fixed_work['M'], 0)
+    req_s = np.maximum(req_s - fixed_work['S'], 0)
+    req_n = np.maximum(req_n - fixed_work['N'], 0)
+    needed = need_m + np.maximum(req_s, req_n) + req_oc
+    headcount = available.sum(axis=0)
+    oc_available = (available & oc_pool).sum(axis=0)
+    short = headcount < needed
+    oc_short = oc_available < req_oc
+    for d in np.flatnonzero(short | oc_short) + 1:
+        i = d - 1
+        if short[i]:
+            message = (f"คนว่าง {headcount[i]} คน แต่ต้องการอย่างน้อย {needed[i]} คน "
+                       f"(เช้า {need_m[i]} + บ่าย/ดึก {max(req_s[i], req_n[i])} + OC {req_oc[i]})")
+        else:
+            message = f"ไม่มีคนที่ทำเวร OC ได้ ({', '.join(ward.oc_hard_ban)} ห้ามทำ OC)"
+        issues.append({
+            'day': int(d), 'weekday': WEEKDAY_LABELS[weekday[i]], 'level': 'error', 'message': message,
+            'available': int(headcount[i]), 'needed': int(needed[i]),
+        })
+
+    # ---- Soft: ถ้าให้ทุกคำขอหยุด/Fix ของวันนั้นได้ตามขอ ----
+    any_fix = fix['M'] | fix['S'] | fix['N']
+    soft_available = available & ~off
+    free = soft_available & ~any_fix
+    fixed_m = (soft_available & fix['M']).sum(axis=0)
+    fixed_s = (soft_available & fix['S']).sum(axis=0)
+    fixed_n = (soft_available & fix['N']).sum(axis=0)
+    soft_needed = (np.maximum(need_m - fixed_m, 0)
+                   + np.maximum(np.maximum(req_s - fixed_s, 0), np.maximum(req_n - fixed_n, 0))
+                   + req_oc)
+    soft_headcount = free.sum(axis=0)
+    soft_short = ((soft_headcount < soft_needed) | ((free & oc_pool).sum(axis=0) < req_oc)) & ~short & ~oc_short
+    for d in np.flatnonzero(soft_short) + 1:
+        i = d - 1
+        off_count = int((available[:, i] & off[:, i]).sum())
+        issues.append({
+            'day': int(d), 'weekday': WEEKDAY_LABELS[weekday[i]], 'level': 'warning',
+            'message': (f"ขอหยุด {off_count} คน / Fix เวร {int(any_fix[:, i].sum())} คน "
+                        f"→ เหลือคนจัดเวรได้ {soft_headcount[i]} คน ไม่พอ {soft_needed[i]} คน "
+                        f"(บางคำขอจะไม่ได้ตามขอ)"),
+            'available': int(soft_headcount[i]), 'needed': int(soft_needed[i]),
+        })
+
+    return sorted(issues, key=lambda issue: (issue['day'], issue['level']))
+
+
+def capacity_errors(issues):
+    """เฉพาะปัญหาที่ทำให้จัดไม่ได้แน่นอน"""
+    return [issue for issue in issues if issue['level'] == 'error']
@@ -0,0 +1,152 @@
+"""อ่าน CSV ที่ export มาจากหลายแหล่ง (Excel ไทย, ระบบโรงพยาบาล, ไฟล์ของ app เอง) ในรอบเดียว
+
+- เดา encoding ครั้งเดียวจาก byte ต้นไฟล์ (sniff_encoding): BOM → UTF-8 (ถอดแบบ incremental) → cp874
+  แทนการ pd.read_csv ทั้งไฟล์ซ้ำทีละ encoding (utf-8, cp874, utf-16, tis-620)
+- ไฟล์ใหญ่ (ประวัติหลายปี) อ่านทีละ chunk (iter_csv) ไม่ต้องโหลดทั้งไฟล์เป็น DataFrame เดียว
+- แถวที่อ่านไม่ได้ (จำนวนคอลัมน์ผิด, ถอดรหัสไม่ได้, ค่าไม่ถูกต้อง) บันทึกใน CsvReport แทนการทิ้งเงียบๆ
+"""
+
+import codecs
+import contextlib
+import os
+import re
+import warnings
+
+import pandas as pd
+
+SNIFF_BYTES = 64 * 1024  # byte ต้นไฟล์ที่ใช้เดา encoding
+SNIFF_MAX_BYTES = 1024 * 1024  # ต้นไฟล์เป็น ASCII ล้วน → อ่านหาตัวอักษรแรกที่ไม่ใช่ ASCII ได้ไม่เกินนี้
+CSV_CHUNK_ROWS = 50_000  # จำนวนแถวต่อ chunk ของ iter_csv
+FALLBACK_ENCODING = 'cp874'  # Windows Thai (ครอบคลุม tis-620)
+
+_BOMS = [
+    (codecs.BOM_UTF8, 'utf-8-sig'),
+    (codecs.BOM_UTF16_LE, 'utf-16'),
+    (codecs.BOM_UTF16_BE, 'utf-16'),
+]
+_BAD_LINE = re.compile(r'Skipping line (\d+): (.*)')
+
+
+class CsvReport:
+    """ผลการอ่านไฟล์: encoding ที่ใช้, จำนวนแถวที่อ่านได้, แถวที่มีปัญหา [(บรรทัด, ข้อความ)]"""
+
+    def __init__(self, source=None):
+        self.source = source
+        self.encoding = None
+        self.rows = 0
+        self.bad_rows = []
+        self._skipped = []
+
+    def add(self, line, message):
+        self.bad_rows.append((line, message))
+
+    def skip(self, line, message):
+        """บรรทัดที่ parser ข้ามไป (ไม่มีใน DataFrame)"""
+        self._skipped.append(line)
+        self.add(line, message)
+
+    def file_line(self, index):
+        """บรรทัดในไฟล์ของแถว index (0 = แถวแรกหลัง header) นับบรรทัดที่ถูกข้ามไปแล้วด้วย"""
+        line = index + 2
+        for skipped in sorted(self._skipped):
+            if skipped <= line:
+                line += 1
+        return line
+
+    def summary(self, limit=5):
+        """ข้อความสรุปสั้นๆ (ว่าง = ไม่มีแถวที่มีปัญหา)"""
+        if not self.bad_rows:
+            return ''
+        shown = '; '.join(f"บรรทัด {line}: {message}" for line, message in sorted(self.bad_rows)[:limit])
+        more = f" (และอีก {len(self.bad_rows) - limit} แถว)" if len(self.bad_rows) > limit else ''
+        return f"{self.source or 'CSV'}: {len(self.bad_rows)} แถวมีปัญหา - {shown}{more}"
+
+    def __repr__(self):
+        return f"CsvReport({self.source!r}, {self.encoding}, rows={self.rows}, bad_rows={len(self.bad_rows)})"
+
+
+def _rewind(source):
+    """(file object, เปิดเองหรือไม่, ตำแหน่งเริ่ม) ของ path หรือ file-like แบบ binary"""
+    if isinstance(source, (str, os.PathLike)):
+        return open(source, 'rb'), True, 0
+    return source, False, source.tell()
+
+
+def sniff_encoding(source, prefix_bytes=SNIFF_BYTES, max_bytes=SNIFF_MAX_BYTES):
+    """เดา encoding จาก byte ต้นไฟล์ (ไม่ parse) แล้วคืนตำแหน่งอ่านของ file-like กลับที่เดิม
+
+    ต้นไฟล์เป็น ASCII ล้วน → อ่านต่อทีละ prefix_bytes จนเจอตัวอักษรแรกที่ไม่ใช่ ASCII แต่ไม่เกิน max_bytes
+    (ยังไม่เจอ → ถือเป็น UTF-8 ถ้าไฟล์ท้ายๆ เป็น cp874 ตัวอักษรที่ถอดไม่ได้จะถูกรายงานใน CsvReport)
+    """
+    handle, owned, start = _rewind(source)
+    try:
+        prefix = handle.read(prefix_bytes)
+        for bom, encoding in _BOMS:
+            if prefix.startswith(bom):
+                return encoding
+        if b'\x00' in prefix[:1024]:
+            # UTF-16 ไม่มี BOM: byte 0 อยู่ตำแหน่งคี่ = little endian (ตัวอักษร ASCII)
+            return 'utf-16-le' if prefix[1::2].count(0) >= prefix[0::2].count(0) else 'utf-16-be'
+        block, scanned = prefix, len(prefix)
+        while block and block.isascii():
+            if scanned >= max_bytes:
+                return 'utf-8'
+            # block ก่อนหน้าเป็น ASCII ล้วน → block ใหม่เริ่มที่ขอบตัวอักษรเสมอ ไม่ต้องต่อ byte เดิม
+            block = handle.read(prefix_bytes)
+            scanned += len(block)
+        if not block:
+            return 'utf-8'
+        try:
+            # final=False: ตัวอักษรหลาย byte ที่ถูกตัดท้าย block ไม่นับเป็น error
+            codecs.getincrementaldecoder('utf-8')().decode(block, final=False)
+        except UnicodeDecodeError:
+            return FALLBACK_ENCODING
+        return 'utf-8'
+    finally:
+        if owned:
+            handle.close()
+        else:
+            handle.seek(start)
+
+
+def _record_skipped(caught, report):
+    for warning in caught:
+        for line, message in _BAD_LINE.findall(str(warning.message)):
+            report.skip(int(line), f"ข้ามแถว ({message.strip()})")
+    caught.clear()
+
+
+def iter_csv(source, report=None, chunksize=CSV_CHUNK_ROWS, **read_csv_kwargs):
+    """อ่าน CSV ทีละ chunk (DataFrame) ในรอบเดียวด้วย encoding จาก sniff_encoding
+
+    chunksize=None → อ่านทั้งไฟล์เป็น DataFrame เดียว (yield ครั้งเดียว)
+    แถวที่จำนวนคอลัมน์ไม่ตรง header ถูกข้ามและบันทึกใน report
+    ตัวอักษรที่ถอดรหัสไม่ได้ถูกแทนด้วย � และบันทึกแถวนั้นใน report
+    """
+    report = report if report is not None else CsvReport(source if isinstance(source, str) else None)
+    report.encoding = sniff_encoding(source)
+    with warnings.catch_warnings(record=True) as caught:
+        warnings.simplefilter('always', pd.errors.ParserWarning)
+        reader = pd.read_csv(source, encoding=report.encoding, encoding_errors='replace', on_bad_lines='warn',
+                             chunksize=chunksize, **read_csv_kwargs)
+        # chunksize=None ได้ DataFrame ไม่ใช่ TextFileReader (ไม่มี context manager)
+        chunks = contextlib.nullcontext([reader]) if chunksize is None else reader
+        with chunks as frames:
+            for chunk in frames:
+                _record_skipped(caught, report)
+                text = chunk.select_dtypes(include=['object', 'string'])
+                if not text.empty:
+                    garbled = text.apply(lambda col: col.astype(str).str.contains('�', regex=False)).any(axis=1)
+                    for index in chunk.index[garbled]:
+                        report.add(report.file_line(index), f"ถอดรหัส {report.encoding} ไม่ได้บางตัวอักษร")
+                report.rows += len(chunk)
+                yield chunk
+        _record_skipped(caught, report)
+
+
+def read_csv(source, report=None, **read_csv_kwargs):
+    """อ่าน CSV ทั้งไฟล์เป็น DataFrame เดียว (ไฟล์เล็ก เช่นตารางเดือนก่อน) ดู iter_csv"""
+    chunks = list(iter_csv(source, report, **read_csv_kwargs))
+    if not chunks:
+        return pd.DataFrame()
+    return chunks[0] if len(chunks) == 1 else pd.concat(chunks)
@@ -0,0 +1,136 @@
+"""วิเคราะห์สาเหตุที่จัดตารางไม่ได้"""
+
+import calendar
+
+from .thai_calendar import is_holiday
+
+
+def diagnose_scheduling_issues(year, month, days_in_month, nurses, requests, staffing_overrides, enable_oc):
+    """วิเคราะห์ปัญหาที่อาจทำให้จัดตารางไม่ได้"""
+    issues = []
+    
+    # นับจำนวนคนที่ลาแต่ละวัน
+    off_per_day = {d: [] for d in range(1, days_in_month + 1)}
+    leave_per_day = {d: [] for d in range(1, days_in_month + 1)}
+    
+    for req in requests:
+        if req.get('month') == month and req.get('year') == year:
+            if req.get('nurse') in nurses:
+                d = req.get('date')
+                if 1 <= d <= days_in_month:
+                    if req.get('type') == 'Off':
+                        off_per_day[d].append(req['nurse'])
+                    elif req.get('type') == 'Leave_Train':
+                        leave_per_day[d].append(req['nurse'])
+    
+    # ตรวจสอบแต่ละวัน
+    for d in range(1, days_in_month + 1):
+        weekday = calendar.weekday(year, month, d)
+        is_special_day = weekday >= 5 or is_holiday(year, month, d)
+        
+        # จำนวนคนที่ว่าง (ไม่ได้ลา Off หรือ L_T)
+        unavailable = set(off_per_day[d]) | set(leave_per_day[d])
+        available = [n for n in nurses if n not in unavailable]
+        available_count = len(available)
+        
+        # ความต้องการขั้นต่ำ
+        req_m = 4 if is_special_day else 3  # เวรเช้า
+        req_s = 2  # เวรบ่าย  
+        req_n = 1  # เวรดึก
+        
+        # ตรวจสอบ Override
+        for override in staffing_overrides:
+            if override.get('month') == month and override.get('year') == year:
+                if override.get('start', 1) <= d <= override.get('end', days_in_month):
+                    if override.get('shift') == 'N':
+                        req_n = override.get('count', 1)
+                    elif override.get('shift') == 'S':
+                        req_s = override.get('count', 2)
+        
+        # OC ต้องการอีก 1 คน (ถ้าเปิดใช้งาน และเป็นวันที่ 1-10)
+        req_oc = 1 if enable_oc and d <= 10 else 0
+        
+        # ต้องการอย่างน้อย M + S + N + OC (แม้จะซ้อนได้บางส่วน แต่ใช้ประมาณการ)
+        min_needed = req_m + req_s + req_n + req_oc
+        
+        # ER1 Fix: ศุกร์ M, อื่นๆ Off
+        er1_available_for_m = 1 if 'ER1' in available and weekday == 4 else 0
+        
+        # คนที่ลา/ประชุม นับเป็น M ได้
+        leave_count = len(leave_per_day[d])
+        
+        # จำนวนคนที่ต้องการทำเวรจริง (หลังหักคนลา)
+        need_for_m = max(0, req_m - leave_count - er1_available_for_m)
+        need_for_sn = req_s + req_n
+        
+        # คนที่ว่างหลังหัก ER1 (ER1 ทำได้แค่ M ศุกร์)
+        workers = [n for n in available if n != 'ER1']
+        
+        if len(off_per_day[d]) > 0 and available_count < need_for_m + need_for_sn:
+            day_type = "ส-อา/นักขัตฤกษ์" if is_special_day else "วันธรรมดา"
+            issues.append({
+                'day': d,
+                'weekday': ['จ','อ','พ','พฤ','ศ','ส','อา'][weekday],
+                'type': day_type,
+                'off_nurses': off_per_day[d],
+                'leave_nurses': leave_per_day[d],
+                'available': available_count,
+                'needed_m': req_m,
+                'needed_s': req_s,
+                'needed_n': req_n,
+                'needed_oc': req_oc,
+                'er1_status': 'หยุดเสาร์-อาทิตย์/นักขัตฤกษ์' if 'ER1' in available and is_special_day and weekday != 4 else 'พร้อม'
+            })
+    
+    return issues
+
+def generate_diagnosis_md(issues, total_nurses=10):
+    """สร้างรายงานปัญหาแบบละเอียด"""
+    md = []
+    
+    # Group issues by exact same problem type for summary? No, user wants case by case.
+    
+    md.append("### ⚠️ พบปัญหาในการจัดเวร")
+    md.append("ระบบไม่สามารถจัดตารางได้เนื่องจาก **คนไม่พอ** ในบางวันครับ")
+    md.append("")
+    
+    for issue in issues:
+        d = issue['day']
+        wd = issue['weekday']
+        
+        # Calculate totals
+        total_off = len(issue['off_nurses']) + len(issue['leave_nurses'])
+        
+        # Special check for ER1 implicit off
+        er1_note = ""
+        er1_off = 0
+        if issue['er1_status'].startswith('หยุด'):
+             er1_note = f"\n*   **ER1:** {issue['er1_status']} (ตามเงื่อนไข Fix) -> รวมเป็นคนหยุด {total_off + 1} คน"
+             er1_off = 1
+        
+        needed_total = issue['needed_m'] + issue['needed_s'] + issue['needed_n'] + issue['needed_oc']
+        available_real = issue['available'] - er1_off
+        missing = needed_total - available_real
+        
+        # Format the block
+        md.append(f"#### 📅 วันที่ {d} ({wd})")
+        
+        # List who is off/leave
+        who_off = []
+        if issue['off_nurses']:
+            who_off.append(f"ขอหยุด: {', '.join(issue['off_nurses'])}")
+        if issue['leave_nurses']:
+            who_off.append(f"ลา/ประชุม: {', '.join(issue['leave_nurses'])}")
+            
+        md.append(f"*   **คนขอหยุด/ลา:** {total_off} คน ({'; '.join(who_off)}){er1_note}")
+        md.append(f"*   **เหลือคนทำงาน:** {total_nurses} - {total_off + er1_off} = **{available_real} คน**")
+        md.append(f"*   **ความต้องการขั้นต่ำ:** เช้า({issue['needed_m']}) + บ่าย({issue['needed_s']}) + ดึก({issue['needed_n']}) = **{needed_total} คน**")
+        md.append(f"*   **ผลลัพธ์:** คนขาด {missing} คน (มี {available_real} แต่ต้องการ {needed_total}) ทำให้จัดไม่ได้ครับ")
+        md.append("")
+    
+    md.append("### 💡 วิธีแก้ไข")
+    md.append("*   **ลดคนลา:** ในวันที่มีปัญหา ต้องมีคนขอหยุด/ลาให้น้อยลง เพื่อให้เหลือคนพอ")
+    md.append("*   **ลดเวร:** ใช้เมนู **'👥 กำลังคนพิเศษ'** เพื่อลดจำนวนเวรเช้า (M) ในวันนั้นๆ ลง (เช่น จาก 4 เหลือ 3)")
+    md.append("")
+    
+    return "\n".join(md)
@@ -0,0 +1,165 @@
+"""หาสาเหตุที่จัดตารางไม่ได้จากโมเดลจริง (แทนการเดาแบบ diagnose_scheduling_issues)
+
+กฎ Hard แต่ละกลุ่ม/คำขอแต่ละรายการผูกกับ assumption literal ของตัวเอง แล้วให้ CP-SAT บอกว่า
+ชุด literal ไหนพอจะทำให้จัดไม่ได้ (SufficientAssumptionsForInfeasibility) จาก solve รอบเดียว
+(minimize=True = ตัดตัวที่ไม่จำเป็นออกเพิ่ม ภายในงบเวลารวม minimize_time_limit)
+"""
+
+import time
+
+from ortools.sat.python import cp_model
+
+from .solver import build_schedule_model
+from .ward_config import resolve_ward_config
+
+# เวลาที่ให้ต่อการ solve หนึ่งรอบ (ไม่มี objective → ปกติรู้ผลเร็วมาก)
+DEFAULT_EXPLAIN_TIME_LIMIT = 10.0
+# งบเวลารวมของทุกรอบที่ใช้ตัดชุดที่ขัดกันให้เล็กลง (minimize=True)
+DEFAULT_MINIMIZE_TIME_LIMIT = 10.0
+
+RULE_LABELS = {
+    'S-M-N': 'ห้าม S → M → N',
+    'N-N': 'ห้ามดึกติดกัน N/NS → N/NS',
+    'S-O-N': 'ห้าม S/NS → O → N/NS',
+    'S-S-N': 'ห้าม S → S → N/NS',
+    'NS-spacing': 'NS ต้องห่างกันอย่างน้อย 4 วัน',
+    '7-in-8': 'ทำงานไม่เกิน 7 วันใน 8 วัน',
+    'NS-after-6': 'ห้าม NS หลังทำงานติดกัน 6 วัน',
+    'OC-spacing': 'OC ต้องห่างกันอย่างน้อย 3 วัน',
+    'OC-M': 'ห้าม OC → M',
+}
+
+# กฎที่เป็น Hard เฉพาะนอกช่วง OC (ในช่วง OC เป็น Soft) → ต่อท้ายช่วงวันจากค่ากฎวอร์ด
+OUTSIDE_OC_RULES = {'S-M-N', 'N-N'}
+
+NURSE_RULE_LABELS = {
+    'no_NS': 'ห้ามเวร NS',
+    'no_OC': 'ห้ามเวร OC',
+    'fixed_pattern': 'รูปแบบเวรประจำ (fixed_patterns ในค่ากฎวอร์ด)',
+    'caps': 'เพดานจำนวนเวรต่อเดือน (caps ในค่ากฎวอร์ด)',
+}
+
+FAIRNESS_LABELS = {
+    'total_work': 'เวรรวมของทุกคนต่างกันไม่เกิน 1',
+    'special_offs': 'วันหยุดเสาร์-อาทิตย์/นักขัตฤกษ์ต่างกันไม่เกิน 1',
+    's_shifts': 'เวรบ่ายต่างกันไม่เกิน 1',
+    'n_shifts': 'เวรดึกต่างกันไม่เกิน 1',
+    'off_days': 'วันหยุดของแต่ละคน = วันหยุดของเดือน ±1',
+}
+
+
+class RuleGuards:
+    """เก็บ assumption literal ของกฎแต่ละกลุ่ม (key → BoolVar) ส่งให้ build_schedule_model(guards=...)
+
+    strict_requests=True → คำขอ Off และ Fix (ปกติเป็น Soft) กลายเป็น Hard ที่มี literal แยกทีละรายการ
+    ใช้หาว่าคำขอชุดไหนให้พร้อมกันทั้งหมดไม่ได้
+    """
+
+    def __init__(self, strict_requests=False):
+        self.strict_requests = strict_requests
+        self.literals = {}
+
+    def literal(self, model, key):
+        if key not in self.literals:
+            name = 'guard_' + '_'.join(str(k) for k in key)
+            self.literals[key] = model.NewBoolVar(name)
+        return self.literals[key]
+
+
+def _nurse_label(n, ward):
+    return f"{n} ({ward.nurse_names[n]})" if n in ward.nurse_names else str(n)
+
+
+def _rule_label(rule, ward, enable_oc):
+    label = RULE_LABELS.get(rule, rule)
+    if rule in OUTSIDE_OC_RULES:
+        label += f" (นอกช่วง OC วันที่ 1-{ward.oc_last_day})" if enable_oc else " (ปิด OC: ทั้งเดือน)"
+    return label
+
+
+def describe_guard(key, ward_config=None, enable_oc=True):
+    """ข้อความภาษาไทยของกฎ/คำขอตาม key (ชื่อพยาบาลและช่วง OC จากค่ากฎวอร์ด)"""
+    ward = resolve_ward_config(ward_config)
+    kind = key[0]
+    if kind == 'staffing':
+        return f"จำนวนคนขั้นต่ำต่อเวร วันที่ {key[1]}"
+    if kind == 'oc_coverage':
+        return f"ต้องมีเวร OC วันที่ {key[1]}"
+    if kind == 'rule':
+        return _rule_label(key[1], ward, enable_oc)
+    if kind == 'nurse_rule':
+        return f"{_nurse_label(key[1], ward)}: {NURSE_RULE_LABELS.get(key[2], key[2])}"
+    if kind == 'cross_month':
+        return f"{_nurse_label(key[1], ward)}: กฎต่อเนื่องจากเวรปลายเดือนก่อน"
+    if kind == 'fairness':
+        return f"เกลี่ยเวร: {FAIRNESS_LABELS.get(key[1], key[1])}"
+    if kind == 'leave':
+        return f"คำขอลา/อบรมของ {_nurse_label(key[1], ward)} วันที่ {key[2]}"
+    if kind == 'off':
+        return f"คำขอหยุดของ {_nurse_label(key[1], ward)} วันที่ {key[2]}"
+    if kind == 'fix':
+        return f"คำขอ Fix เวร {key[2]} ของ {_nurse_label(key[1], ward)} วันที่ {key[3]}"
+    return str(key)
+
+
+def _solve_with(model, solver, literals):
+    model.ClearAssumptions()
+    model.AddAssumptions(literals)
+    return solver.Solve(model)
+
+
+def explain_infeasibility(year, month, days_in_month, nurses, requests, fix_requests=None, staffing_overrides=None,
+                          enable_oc=True, prev_month_data=None, strict_requests=False,
+                          time_limit=DEFAULT_EXPLAIN_TIME_LIMIT, minimize=False,
+                          minimize_time_limit=DEFAULT_MINIMIZE_TIME_LIMIT, ward_config=None):
+    """หาชุดกฎ/คำขอที่ขัดกันจนจัดตารางไม่ได้
+
+    คืนค่า dict:
+      status    = 'infeasible' (เจอชุดที่ขัดกัน) / 'feasible' (จัดได้ถ้าไม่สนคะแนน) / 'unknown' (หมดเวลา)
+      conflicts = [{'key': ..., 'label': ...}, ...] ชุดที่ขัดกันจาก solve รอบแรก
+                  (minimize=True: ตัดตัวที่ไม่จำเป็นออกจนหมดงบ minimize_time_limit วินาที
+                  ถ้าทำครบ = ตัดตัวใดออกก็จัดได้)
+      wall_time = เวลาที่ใช้ (วินาที)
+    """
+    start = time.time()
+    guards = RuleGuards(strict_requests=strict_requests)
+    model, _, _ = build_schedule_model(year, month, days_in_month, nurses, requests, fix_requests,
+                                       staffing_overrides, enable_oc=enable_oc, prev_month_data=prev_month_data,
+                                       guards=guards, ward_config=ward_config)
+    # ต้องการแค่ว่าจัดได้หรือไม่ → ตัด objective ออกให้เร็วขึ้น
+    model.ClearObjective()
+
+    solver = cp_model.CpSolver()
+    solver.parameters.max_time_in_seconds = time_limit
+    # SufficientAssumptionsForInfeasibility ใช้ได้เฉพาะ single worker
+    solver.parameters.num_workers = 1
+
+    index_to_key = {lit.Index(): key for key, lit in guards.literals.items()}
+    status = _solve_with(model, solver, list(guards.literals.values()))
+    if status in [cp_model.OPTIMAL, cp_model.FEASIBLE]:
+        return {'status': 'feasible', 'conflicts': [], 'wall_time': time.time() - start}
+    if status != cp_model.INFEASIBLE:
+        return {'status': 'unknown', 'conflicts': [], 'wall_time': time.time() - start}
+
+    core = [index_to_key[i] for i in solver.SufficientAssumptionsForInfeasibility() if i in index_to_key]
+
+    if minimize:
+        # ลองเอาออกทีละตัว: ถ้ายังจัดไม่ได้ แปลว่าตัวนั้นไม่จำเป็น (ตัดทิ้ง และใช้ core ใหม่ที่เล็กกว่าได้เลย)
+        # ทุกรอบใช้งบเวลาร่วมกัน หมดงบ → คืน core เท่าที่ตัดได้
+        deadline = time.time() + minimize_time_limit
+        i = 0
+        while i < len(core):
+            remaining = deadline - time.time()
+            if remaining <= 0:
+                break
+            solver.parameters.max_time_in_seconds = min(time_limit, remaining)
+            candidate = core[:i] + core[i + 1:]
+            status = _solve_with(model, solver, [guards.literals[k] for k in candidate])
+            if status == cp_model.INFEASIBLE:
+                smaller = {index_to_key[j] for j in solver.SufficientAssumptionsForInfeasibility() if j in index_to_key}
+                core = [k for k in candidate if k in smaller] or candidate
+            else:
+                i += 1
+
+    conflicts = [{'key': key, 'label': describe_guard(key, ward_config, enable_oc)} for key in core]
+    return {'status': 'infeasible', 'conflicts': conflicts, 'wall_time': time.time() - start}
@@ -0,0 +1,101 @@
+"""คะแนนความยุติธรรม (วันหยุด ส-อา/นักขัตฤกษ์, สมดุล S+N, Fix Rate) จาก Schedule ทีเดียวทั้งตาราง
+และรวมย้อนหลังทั้งปีจากคลังตาราง
+"""
+
+import numpy as np
+import pandas as pd
+
+from .archive import ARCHIVE_DIR, iter_archive
+from .schedule import ShiftCode
+from .ward_config import default_ward_config, resolve_ward_config
+
+# ไม่นำมาเทียบความยุติธรรม (ค่าของวอร์ดหลัก): ER1 มีเวรประจำ (หยุด ส-อา เสมอ), ER7 จำกัดเวร S/N
+OFF_FAIRNESS_EXCLUDED = default_ward_config().report_off_excluded
+SN_FAIRNESS_EXCLUDED = default_ward_config().report_sn_excluded
+
+FAIRNESS_SUM_COLUMNS = ['special_off', 'special_days', 's', 'n', 'ns', 'sn', 'fix_total', 'fix_matched']
+
+
+def _fix_targets(schedule, fix_requests):
+    """matrix พยาบาล × วัน ของเวรที่ขอ Fix (-1 = ไม่มีคำขอ)"""
+    targets = np.full(schedule.codes.shape, -1, dtype=np.int8)
+    nurse_index = {n: i for i, n in enumerate(schedule.nurses)}
+    for fix in fix_requests or []:
+        if fix.get('month') != schedule.month or fix.get('year') != schedule.year:
+            continue
+        if fix.get('nurse') not in nurse_index or fix.get('shift') not in ShiftCode.__members__:
+            continue
+        days = [d - 1 for d in fix.get('dates', []) if 1 <= d <= schedule.days_in_month]
+        targets[nurse_index[fix['nurse']], days] = ShiftCode[fix['shift']]
+    return targets
+
+
+def compute_fairness(schedule, fix_requests=None):
+    """คะแนนของทุกคนในตาราง คืนค่า DataFrame หนึ่งแถวต่อพยาบาล
+
+    special_off = วันหยุด (O/NCD) ที่ตรงกับ ส-อา/นักขัตฤกษ์ จาก special_days วัน
+    sn = S + N (ไม่รวม NS), fix_rate = % วันที่ได้เวรตามที่ขอ Fix (NaN = ไม่มีคำขอ)
+    """
+    counts = schedule.shift_counts()
+    special_off = schedule.count(ShiftCode.O, days=schedule.special)
+    targets = _fix_targets(schedule, fix_requests)
+    requested = targets >= 0
+    fix_total = requested.sum(axis=1)
+    fix_matched = (requested & (schedule.codes == targets)).sum(axis=1)
+
+    scores = pd.DataFrame({
+        'year': schedule.year,
+        'month': schedule.month,
+        'nurse': schedule.nurses,
+        'special_off': special_off,
+        'special_days': int(schedule.special.sum()),
+        's': counts[:, ShiftCode.S],
+        'n': counts[:, ShiftCode.N],
+        'ns': counts[:, ShiftCode.NS],
+        'sn': counts[:, ShiftCode.S] + counts[:, ShiftCode.N],
+        'fix_total': fix_total,
+        'fix_matched': fix_matched,
+    })
+    scores['fix_rate'] = _fix_rate(scores)
+    return scores
+
+
+def _fix_rate(scores):
+    total = scores['fix_total'].astype(float)
+    return (scores['fix_matched'] / total.where(total > 0)) * 100
+
+
+def fairness_summary(scores, ward_config=None):
+    """สถิติรวมของตาราง: ค่าเฉลี่ย/ต่ำสุด/สูงสุด (ไม่นับคนใน report_*_excluded ของค่ากฎวอร์ด)"""
+    ward = resolve_ward_config(ward_config)
+    off = scores.loc[~scores['nurse'].isin(ward.report_off_excluded), 'special_off']
+    sn = scores.loc[~scores['nurse'].isin(ward.report_sn_excluded), 'sn']
+    fix = scores['fix_rate'].dropna()
+    summary = {}
+    for name, values in [('special_off', off), ('sn', sn), ('fix_rate', fix)]:
+        summary[name] = None if values.empty else {
+            'mean': float(values.mean()), 'min': float(values.min()), 'max': float(values.max()),
+        }
+    return summary
+
+
+def fairness_from_archive(root=ARCHIVE_DIR, year=None, months=None, wards=None, fix_requests=None):
+    """คะแนนรายเดือนของทุกวอร์ด/เดือนในคลัง (fix_requests = คำขอ Fix ทุกเดือน ใช้เฉพาะเดือนที่ตรงกัน)"""
+    frames = []
+    for ward, schedule in iter_archive(root, wards=wards, year=year, months=months):
+        frame = compute_fairness(schedule, fix_requests)
+        frame.insert(0, 'ward', ward)
+        frames.append(frame)
+    if not frames:
+        return pd.DataFrame(columns=['ward', 'year', 'month', 'nurse'] + FAIRNESS_SUM_COLUMNS + ['fix_rate'])
+    return pd.concat(frames, ignore_index=True)
+
+
+def aggregate_fairness(scores):
+    """รวมคะแนนหลายเดือนต่อ วอร์ด × พยาบาล (เช่น ทั้งไตรมาส/ทั้งปี) fix_rate คิดจากยอดรวม"""
+    grouped = scores.groupby(['ward', 'nurse'], sort=True)
+    total = grouped[FAIRNESS_SUM_COLUMNS].sum()
+    total.insert(0, 'months', grouped['month'].nunique())
+    total = total.reset_index()
+    total['fix_rate'] = _fix_rate(total)
+    return total
@@ -0,0 +1,161 @@
+"""จัดตารางหลายเดือนต่อกัน (rolling horizon) โดยต่อเวรท้ายเดือนเข้าเดือนถัดไปให้อัตโนมัติ
+
+แต่ละเดือนใช้ 7 วันสุดท้ายของเดือนก่อนหน้าเป็น prev_month_data แทนการอัปโหลด/กรอกเอง
+(เดือนแรกอ่านจากคลังตาราง archive/<วอร์ด>/<ปี>-<เดือน>.csv ได้)
+
+overlap_days > 0 → หลังจัดครบทุกเดือน ปรับรอยต่อเดือนอีกรอบ (ไม่ใช่แค่ให้เดือนหลังยอมตามเดือนก่อน):
+    1. ท้ายเดือนก่อน overlap_days วัน จัดใหม่โดยรู้เวรต้นเดือนถัดไป (next_month_data)
+    2. ต้นเดือนถัดไป overlap_days วัน จัดใหม่ตามท้ายเดือนที่ปรับแล้ว
+วันอื่นล็อกตามเดิม รับผลใหม่เฉพาะเมื่อคะแนนของเดือนนั้นดีขึ้น (ตารางเดิมผ่านกฎรอยต่ออยู่แล้ว จึงไม่มีทางแย่ลง)
+"""
+
+import calendar
+import os
+
+from ortools.sat.python import cp_model
+
+from .archive import archive_path, load_archived_schedule
+from .schedule import Schedule
+from .solver import (
+    SHIFTS,
+    add_schedule_hint,
+    build_schedule_model,
+    extract_codes,
+    run_solver,
+    shift_var_index,
+    solve_schedule_codes,
+)
+from .ward_config import resolve_ward_config
+
+CARRY_OVER_DAYS = 7  # จำนวนวันท้ายเดือนที่กฎข้ามเดือนใช้ (กฎ 7 วันใน 8 วัน)
+DEFAULT_BOUNDARY_TIME_LIMIT = 5.0  # วินาทีต่อการปรับรอยต่อ 1 ฝั่ง
+
+
+def next_month(year, month):
+    return (year + 1, 1) if month == 12 else (year, month + 1)
+
+
+def previous_month(year, month):
+    return (year - 1, 12) if month == 1 else (year, month - 1)
+
+
+def carry_over(schedule, days=CARRY_OVER_DAYS):
+    """เวร days วันสุดท้ายของ Schedule เป็น prev_month_data ของเดือนถัดไป {nurse: ['S', 'O', ...]}"""
+    return {n: [SHIFTS[c] for c in schedule.codes[i, -days:]] for i, n in enumerate(schedule.nurses)}
+
+
+def lead_in(schedule, days=CARRY_OVER_DAYS):
+    """เวร days วันแรกของ Schedule เป็น next_month_data ของเดือนก่อนหน้า"""
+    return {n: [SHIFTS[c] for c in schedule.codes[i, :days]] for i, n in enumerate(schedule.nurses)}
+
+
+def carry_over_from_archive(root, ward, year, month):
+    """prev_month_data ของเดือน year/month จากตารางเดือนก่อนในคลัง (None = ไม่มีในคลัง)"""
+    prev_year, prev_month = previous_month(year, month)
+    path = archive_path(root, ward, prev_year, prev_month)
+    if not os.path.exists(path):
+        return None
+    return carry_over(load_archived_schedule(path, prev_year, prev_month))
+
+
+def _resolve_days(schedule, free_days, prev_month_data, next_month_data, requests, fix_requests, staffing_overrides,
+                  enable_oc, ward_config, sequence_encoding, solver_params):
+    """จัดใหม่เฉพาะ free_days (วันอื่นล็อกตาม schedule) คืนค่า (Schedule ใหม่, คะแนนที่เพิ่มขึ้น) หรือ None ถ้าไม่ดีขึ้น"""
+    year, month, days_in_month, nurses = schedule.year, schedule.month, schedule.days_in_month, schedule.nurses
+    current = {n: [SHIFTS[c] for c in schedule.codes[i]] for i, n in enumerate(nurses)}
+
+    def month_model():
+        return build_schedule_model(year, month, days_in_month, nurses, requests, fix_requests, staffing_overrides,
+                                    enable_oc=enable_oc, prev_month_data=prev_month_data, ward_config=ward_config,
+                                    sequence_encoding=sequence_encoding, next_month_data=next_month_data)
+
+    def pin(model, shifts_var, days):
+        for n in nurses:
+            for d in days:
+                model.Add(shifts_var[(n, d, current[n][d - 1])] == 1)
+
+    # คะแนนของตารางเดิมในโมเดลเดียวกัน (ล็อกทุกวัน → presolve จบเอง)
+    model, shifts_var, _ = month_model()
+    pin(model, shifts_var, range(1, days_in_month + 1))
+    solver, status = run_solver(model, solver_params)
+    if status != cp_model.OPTIMAL:
+        return None
+    baseline = solver.ObjectiveValue()
+
+    model, shifts_var, _ = month_model()
+    pin(model, shifts_var, [d for d in range(1, days_in_month + 1) if d not in free_days])
+    add_schedule_hint(model, shifts_var, current, nurses, days_in_month)
+    solver, status = run_solver(model, solver_params)
+    if status not in [cp_model.OPTIMAL, cp_model.FEASIBLE] or solver.ObjectiveValue() <= baseline:
+        return None
+    codes = extract_codes(solver, shift_var_index(shifts_var, nurses, days_in_month))
+    return Schedule(codes, nurses, year, month, ward_config), solver.ObjectiveValue() - baseline
+
+
+def solve_horizon(year, month, num_months, nurses, requests, fix_requests=None, staffing_overrides=None,
+                  enable_oc=True, prev_month_data=None, solver_params=None, ward_config=None, sequence_encoding=None,
+                  archive_root=None, overlap_days=0, boundary_params=None, progress_callback=None, stats=None):
+    """จัดตาราง num_months เดือนติดกันเริ่มที่ year/month คืนค่า list ของ Schedule ตามลำดับเดือน
+
+    prev_month_data = เวรท้ายเดือนก่อนเดือนแรก (None + archive_root → อ่านจากคลังของวอร์ด ward_config)
+    requests / fix_requests / staffing_overrides = ของทุกเดือนรวมกันได้ (แต่ละเดือนกรองตาม month/year เอง)
+    overlap_days = จำนวนวันแต่ละฝั่งของรอยต่อที่จัดใหม่หลังจัดครบทุกเดือน (0 = ไม่ปรับรอยต่อ)
+    boundary_params = solver_params ของการปรับรอยต่อ (None = time_limit DEFAULT_BOUNDARY_TIME_LIMIT)
+    progress_callback(dict) = แจ้งทุกขั้น: step ('month' / 'boundary'), year, month, status (+ gain ของรอยต่อ)
+    stats = list (ถ้าส่งมา) เติม stats ของการ solve แต่ละเดือน (ดู solve_stats) พร้อม year/month
+    ถ้าเดือนไหนจัดไม่ได้ จะหยุดที่เดือนนั้น (list สั้นกว่า num_months) เพราะเดือนถัดไปไม่มีเวรท้ายเดือนให้ต่อ
+    """
+    nurses = list(nurses)
+    if prev_month_data is None and archive_root is not None:
+        prev_month_data = carry_over_from_archive(archive_root, resolve_ward_config(ward_config).ward, year, month)
+
+    def notify(**info):
+        if progress_callback is not None:
+            progress_callback(info)
+
+    schedules = []
+    first_prev = prev_month_data
+    for _ in range(num_months):
+        _, days_in_month = calendar.monthrange(year, month)
+        month_stats = {}
+        codes = solve_schedule_codes(year, month, days_in_month, nurses, requests, fix_requests, staffing_overrides,
+                                     enable_oc=enable_oc, prev_month_data=prev_month_data,
+                                     solver_params=solver_params, stats=month_stats, ward_config=ward_config,
+                                     sequence_encoding=sequence_encoding)
+        if stats is not None:
+            stats.append({'year': year, 'month': month, **month_stats})
+        notify(step='month', year=year, month=month, status=month_stats.get('status'))
+        if codes is None:
+            break
+        schedule = Schedule(codes, nurses, year, month, ward_config)
+        schedules.append(schedule)
+        prev_month_data = carry_over(schedule)
+        year, month = next_month(year, month)
+
+    if overlap_days > 0:
+        params = {'time_limit': DEFAULT_BOUNDARY_TIME_LIMIT, **(boundary_params or {})}
+        common = dict(requests=requests, fix_requests=fix_requests, staffing_overrides=staffing_overrides,
+                      enable_oc=enable_oc, ward_config=ward_config, sequence_encoding=sequence_encoding,
+                      solver_params=params)
+        for i in range(len(schedules) - 1):
+            left, right = schedules[i], schedules[i + 1]
+            left_prev = first_prev if i == 0 else carry_over(schedules[i - 1])
+            right_next = lead_in(schedules[i + 2]) if i + 2 < len(schedules) else None
+
+            # 1. ท้ายเดือนก่อน (รู้เวรต้นเดือนถัดไปแล้ว)
+            tail = range(max(1, left.days_in_month - overlap_days + 1), left.days_in_month + 1)
+            improved = _resolve_days(left, tail, left_prev, lead_in(right), **common)
+            if improved is not None:
+                schedules[i] = left = improved[0]
+            notify(step='boundary', year=left.year, month=left.month, status='improved' if improved else 'kept',
+                   gain=improved[1] if improved else 0)
+
+            # 2. ต้นเดือนถัดไป (ตามท้ายเดือนที่ปรับแล้ว)
+            head = range(1, min(overlap_days, right.days_in_month) + 1)
+            improved = _resolve_days(right, head, carry_over(left), right_next, **common)
+            if improved is not None:
+                schedules[i + 1] = improved[0]
+            notify(step='boundary', year=right.year, month=right.month, status='improved' if improved else 'kept',
+                   gain=improved[1] if improved else 0)
+
+    return schedules
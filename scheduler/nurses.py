@@ -0,0 +1,7 @@
+"""รายชื่อพยาบาล"""
+
+from .ward_config import default_ward_config
+
+# --- Nurse Names Mapping (Anonymized for Public Sharing) ---
+# roster ของวอร์ดหลัก (scheduler/wards/ER_KPH.json) วอร์ดอื่นใช้ WardConfig.nurse_names
+NURSE_NAMES = default_ward_config().nurse_names
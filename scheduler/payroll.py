@@ -0,0 +1,80 @@
+"""คำนวณค่าเวร/OC/OT จาก Schedule (ทั้งตารางทีเดียวด้วย numpy) และสรุปย้อนหลังจากคลังตาราง
+
+ใช้แบบ headless ได้ เช่น สรุปยอดสะสมทั้งปีทุกวอร์ดให้การเงิน::
+
+    python -m scheduler payroll --archive archive --year 2025 --through 10 --ytd --out payroll_2025.csv
+"""
+
+import numpy as np
+import pandas as pd
+
+from .archive import ARCHIVE_DIR, iter_archive
+from .schedule import ShiftCode
+
+DEFAULT_RATE_SN = 360  # ค่าเวร บ่าย/ดึก (บาท/เวร)
+DEFAULT_OT_RATE = 800  # ค่าตอบแทน OT (บาท/เวร)
+DEFAULT_OC_RATE = 400  # ค่าเวร OC (บาท/ครั้ง)
+
+PAYROLL_COUNT_COLUMNS = ['m_plus_lt', 's', 'n', 'ns', 'oc', 'lt', 'total_work', 'ot_shifts']
+PAYROLL_PAY_COLUMNS = ['shift_allowance', 'oc_pay', 'ot_pay', 'total_income']
+
+
+def standard_work_days(schedule):
+    """เกณฑ์วันทำงานปกติของเดือน = จำนวนวัน - (ส-อา + นักขัตฤกษ์ที่ตรงวันธรรมดา) เกินจากนี้เป็น OT"""
+    return schedule.days_in_month - int(schedule.special.sum())
+
+
+def compute_payroll(schedule, rate_sn=DEFAULT_RATE_SN, ot_rate=DEFAULT_OT_RATE, oc_rate=DEFAULT_OC_RATE):
+    """ค่าตอบแทนของทุกคนในตาราง คืนค่า DataFrame หนึ่งแถวต่อพยาบาล
+
+    NS = บ่าย+ดึกในวันเดียว: ได้ค่าเวร 2 เวร และนับเป็น OT เสมอ
+    ลา/อบรม นับเป็นวันทำงาน (รวมกับเวรเช้าในคอลัมน์ m_plus_lt)
+    """
+    counts = schedule.shift_counts()
+    c_m, c_s, c_n = counts[:, ShiftCode.M], counts[:, ShiftCode.S], counts[:, ShiftCode.N]
+    c_ns, c_oc, c_lt = counts[:, ShiftCode.NS], counts[:, ShiftCode.OC], counts[:, ShiftCode.L_T]
+
+    total_work = c_m + c_s + c_n + c_ns + c_lt
+    shift_allowance = (c_s + c_n + c_ns * 2) * rate_sn
+    oc_pay = c_oc * oc_rate
+    ot_shifts = np.maximum(total_work - standard_work_days(schedule), 0) + c_ns
+    ot_pay = ot_shifts * ot_rate
+
+    return pd.DataFrame({
+        'year': schedule.year,
+        'month': schedule.month,
+        'nurse': schedule.nurses,
+        'm_plus_lt': c_m + c_lt,
+        's': c_s,
+        'n': c_n,
+        'ns': c_ns,
+        'oc': c_oc,
+        'lt': c_lt,
+        'total_work': total_work,
+        'shift_allowance': shift_allowance,
+        'oc_pay': oc_pay,
+        'ot_shifts': ot_shifts,
+        'ot_pay': ot_pay,
+        'total_income': shift_allowance + oc_pay + ot_pay,
+    })
+
+
+def payroll_from_archive(root=ARCHIVE_DIR, year=None, months=None, wards=None, **rates):
+    """ค่าตอบแทนรายเดือนของทุกวอร์ด/เดือนในคลัง (หนึ่งแถวต่อ วอร์ด × เดือน × พยาบาล)"""
+    frames = []
+    for ward, schedule in iter_archive(root, wards=wards, year=year, months=months):
+        frame = compute_payroll(schedule, **rates)
+        frame.insert(0, 'ward', ward)
+        frames.append(frame)
+    if not frames:
+        return pd.DataFrame(columns=['ward', 'year', 'month', 'nurse']
+                            + PAYROLL_COUNT_COLUMNS + PAYROLL_PAY_COLUMNS)
+    return pd.concat(frames, ignore_index=True)
+
+
+def year_to_date(payroll):
+    """รวมยอดรายเดือนเป็นยอดสะสมต่อ วอร์ด × พยาบาล (months = จำนวนเดือนที่มีตาราง)"""
+    grouped = payroll.groupby(['ward', 'nurse'], sort=True)
+    summary = grouped[PAYROLL_COUNT_COLUMNS + PAYROLL_PAY_COLUMNS].sum()
+    summary.insert(0, 'months', grouped['month'].nunique())
+    return summary.reset_index()
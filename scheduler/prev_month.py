@@ -0,0 +1,97 @@
+"""อ่านตารางเวรเดือนก่อน (สำหรับกฎข้ามเดือน)"""
+
+import re
+
+import pandas as pd
+
+from .csv_io import CsvReport, read_csv
+
+
+def parse_previous_month_schedule(uploaded_file, nurses, report=None):
+    """อ่านไฟล์ตารางเดือนก่อนและดึงข้อมูล 7 วันสุดท้าย
+
+    uploaded_file = path หรือไฟล์ที่ upload (binary) report = CsvReport รับแถว/เวรที่อ่านไม่ได้
+    """
+    if uploaded_file is None:
+        return None
+    report = report if report is not None else CsvReport(getattr(uploaded_file, 'name', uploaded_file))
+
+    try:
+        # เดา encoding ครั้งเดียวจากต้นไฟล์ แล้วอ่านรอบเดียว
+        df = read_csv(uploaded_file, report)
+        
+        # หา column ที่เป็นตัวเลข (วันที่)
+        date_cols = [col for col in df.columns if col.isdigit() or any(c.isdigit() for c in str(col))]
+        
+        if not date_cols:
+            return None
+        
+        # เรียงลำดับและเอา 7 วันสุดท้าย
+        # ลบ emoji ออกก่อนเรียง
+        def extract_day(col):
+            return int(''.join(filter(str.isdigit, str(col))))
+        
+        date_cols_sorted = sorted(date_cols, key=extract_day)
+        last_7_days = date_cols_sorted[-7:] if len(date_cols_sorted) >= 7 else date_cols_sorted
+        
+        # สร้าง dict: nurse -> list of shifts (7 วันสุดท้าย)
+        prev_data = {}
+        # เรียงลำดับ nurse ตามความยาวจากมากไปน้อย เพื่อป้องกัน ER1 ไป match กับ ER10
+        sorted_nurses = sorted(nurses, key=len, reverse=True)
+        for index, row in df.iterrows():
+            nurse_col = str(row.iloc[0])  # Column แรกคือชื่อพยาบาล
+            
+            # Extract nurse ID - รองรับหลายรูปแบบ
+            nurse_id = None
+            
+            # รูปแบบ 1: "ER1", "ER2", ... "ER10"
+            for n in sorted_nurses:
+                if n in nurse_col:
+                    nurse_id = n
+                    break
+            
+            # รูปแบบ 2: "Nurse 1", "Nurse 2", ... "Nurse 10"
+            if nurse_id is None:
+                match = re.search(r'Nurse\s*(\d+)', nurse_col)
+                if match:
+                    num = int(match.group(1))
+                    nurse_id = f'ER{num}'
+            
+            if nurse_id and nurse_id in nurses:
+                shifts = []
+                for col in last_7_days:
+                    raw = row[col] if col in row.index else ''
+                    # แปลงกลับเป็น code (รองรับทั้งภาษาอังกฤษและภาษาไทย)
+                    shift = '' if pd.isna(raw) else str(raw).strip()
+                    
+                    # Thai abbreviations mapping
+                    if shift == 'บ':  # บ่าย
+                        shift = 'S'
+                    elif shift == 'ช':  # เช้า
+                        shift = 'M'
+                    elif shift == 'ค':  # ดึก
+                        shift = 'N'
+                    elif shift == 'ดบ':  # ดึก+บ่าย (NS)
+                        shift = 'NS'
+                    elif shift in ['o', 'O', '']:  # Off
+                        shift = 'O'
+                    elif shift in ['VA', 'ประชุม']:  # ลา/ประชุม
+                        shift = 'L_T'
+                    elif shift in ['ncd', 'NCD']:
+                        shift = 'O'
+                    elif 'ลา' in shift or 'อบรม' in shift or 'ประชุม' in shift:
+                        shift = 'L_T'
+                    elif 'OC' in shift or '📞' in shift:
+                        shift = 'OC'
+                    elif shift in ['M', 'S', 'N', 'NS']:
+                        pass  # ใช้ค่าเดิม
+                    else:
+                        report.add(report.file_line(index), f"{nurse_id} วันที่ {col}: ไม่รู้จักเวร {shift!r} (ใช้ O)")
+                        shift = 'O'  # default
+                    
+                    prev_data[nurse_id] = prev_data.get(nurse_id, []) + [shift]
+        
+        return prev_data
+    except (OSError, ValueError) as e:  # ParserError / EmptyDataError เป็น ValueError
+        report.add(0, f"อ่านไฟล์ไม่ได้: {e}")
+        return None
@@ -0,0 +1,99 @@
+"""วัดขนาดโมเดลที่กฎแต่ละกลุ่มสร้าง (เวลา, จำนวน BoolVar, จำนวน constraint)
+
+build_schedule_model(..., profile=BuildProfile()) จะเรียก profile.start() ทุกครั้งที่ขึ้นส่วนใหม่
+ตัวเลขคิดจากผลต่างของ model proto ก่อน/หลังแต่ละส่วน จึงไม่ต้องแก้กฎเดิมเลย
+ใช้ดูว่ากฎกลุ่มไหนทำให้โมเดลบวมก่อนเพิ่มกฎใหม่
+"""
+
+import time
+
+import pandas as pd
+
+from .solver import build_schedule_model
+
+SECTION_LABELS = {
+    'variables': 'ตัวแปรเวร (พยาบาล × วัน × เวร)',
+    'cross_month': 'กฎข้ามเดือน',
+    'staffing': 'เวรเดียวต่อวัน + กำลังคน',
+    'sn_transitions': 'สลับเวร S↔N (Soft)',
+    's_m_n': 'S-M-N',
+    'night': 'กฎเวรดึก (N)',
+    'ns': 'เวร NS',
+    '7_in_8': 'ทำงานไม่เกิน 7 ใน 8 วัน',
+    'oc': 'เวร OC',
+    'sequence': 'กฎลำดับเวร (automaton)',
+    'preferences': 'รายบุคคล / Fix / คำขอ',
+    'fairness': 'เกลี่ยเวร',
+    'soft_objectives': 'Soft constraint + objective',
+}
+
+
+def _is_bool(variable):
+    domain = variable.domain
+    return len(domain) == 2 and domain[0] == 0 and domain[1] == 1
+
+
+class BuildProfile:
+    """บันทึกของแต่ละส่วน: ชื่อ, เวลา (ms), BoolVar / IntVar / constraint ที่เพิ่มขึ้น"""
+
+    def __init__(self):
+        self.sections = []
+        self._current = None
+
+    def start(self, model, name):
+        """ปิดส่วนก่อนหน้า แล้วเริ่มนับส่วน name"""
+        self.finish(model)
+        proto = model.Proto()
+        self._current = (name, time.perf_counter(), len(proto.variables), len(proto.constraints))
+
+    def finish(self, model):
+        if self._current is None:
+            return
+        name, started, num_vars, num_constraints = self._current
+        elapsed = time.perf_counter() - started
+        proto = model.Proto()
+        variables = proto.variables
+        new_vars = len(variables) - num_vars
+        bool_vars = sum(1 for i in range(num_vars, len(variables)) if _is_bool(variables[i]))
+        self.sections.append({
+            'section': name,
+            'label': SECTION_LABELS.get(name, name),
+            'wall_ms': elapsed * 1000,
+            'bool_vars': bool_vars,
+            'int_vars': new_vars - bool_vars,
+            'constraints': len(proto.constraints) - num_constraints,
+        })
+        self._current = None
+
+    def report(self):
+        """list ของ dict หนึ่งรายการต่อส่วน (ส่วนที่ชื่อซ้ำจะรวมกัน) เรียงตามลำดับที่สร้าง"""
+        merged = {}
+        for row in self.sections:
+            if row['section'] in merged:
+                total = merged[row['section']]
+                for key in ['wall_ms', 'bool_vars', 'int_vars', 'constraints']:
+                    total[key] += row[key]
+            else:
+                merged[row['section']] = dict(row)
+        return list(merged.values())
+
+    def totals(self):
+        report = self.report()
+        return {key: sum(row[key] for row in report) for key in ['wall_ms', 'bool_vars', 'int_vars', 'constraints']}
+
+    def to_frame(self):
+        return pd.DataFrame(self.report(), columns=['section', 'label', 'wall_ms', 'bool_vars', 'int_vars',
+                                                    'constraints'])
+
+
+def profile_model_build(year, month, days_in_month, nurses, requests, fix_requests=None, staffing_overrides=None,
+                        enable_oc=True, prev_month_data=None, ward_config=None, sequence_encoding=None):
+    """สร้างโมเดลครั้งเดียว (ไม่ solve) คืนค่า BuildProfile
+
+    sequence_encoding = 'linear' / 'automaton' (None = ค่าเริ่มต้น) ใช้เทียบขนาดกฎลำดับเวรสองแบบ
+    """
+    profile = BuildProfile()
+    build_schedule_model(year, month, days_in_month, nurses, requests, fix_requests, staffing_overrides,
+                         enable_oc=enable_oc, prev_month_data=prev_month_data, profile=profile,
+                         ward_config=ward_config, sequence_encoding=sequence_encoding)
+    return profile
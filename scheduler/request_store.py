@@ -0,0 +1,313 @@
+"""คำขอวันลา/ขอหยุด, คำขอเวร Fix และกำลังคนพิเศษ ใน SQLite (แทนการเขียน CSV ใหม่ทั้งไฟล์ทุกครั้งที่แก้)
+
+- ทุกตารางมี index (year, month, nurse) → โหลดเฉพาะเดือนที่กำลังจัด ไม่ต้องอ่านคำขอหลายปีทุก session
+- เพิ่ม/แก้/ลบเป็นรายแถว (อ้างอิง id) ใน transaction (WAL) → หัวหน้าพยาบาล 2 คนแก้พร้อมกันไม่ทับของกันและกัน
+  (replace_stored_month / clear_stored_month ใช้เฉพาะคำสั่งล้าง/นำเข้าทั้งเดือน)
+- ครั้งแรกที่เปิดใช้ ย้ายข้อมูลจาก CSV เดิมให้อัตโนมัติ (migrate_csv_requests)
+
+kind = 'requests' (วันลา/ขอหยุด) / 'fix_requests' / 'staffing_overrides'
+record เป็น dict รูปแบบเดียวกับที่ load_*_from_csv คืนค่า (ใช้กับ solver ได้เลย)
+"""
+
+import math
+import os
+import sqlite3
+
+from .storage import (
+    CSV_FILE,
+    FIX_REQUESTS_FILE,
+    STAFFING_OVERRIDES_FILE,
+    load_fix_requests_from_csv,
+    load_requests_from_csv,
+    load_staffing_overrides_from_csv,
+)
+
+REQUESTS_DB = "requests.sqlite3"
+REQUEST_KINDS = ('requests', 'fix_requests', 'staffing_overrides')
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS requests (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    year INTEGER NOT NULL,
+    month INTEGER NOT NULL,
+    nurse TEXT NOT NULL,
+    date INTEGER NOT NULL,
+    type TEXT NOT NULL,
+    priority INTEGER NOT NULL DEFAULT 1,
+    reason TEXT
+);
+CREATE INDEX IF NOT EXISTS requests_by_month ON requests (year, month, nurse);
+CREATE TABLE IF NOT EXISTS fix_requests (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    year INTEGER NOT NULL,
+    month INTEGER NOT NULL,
+    nurse TEXT NOT NULL,
+    shift TEXT NOT NULL,
+    dates TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS fix_requests_by_month ON fix_requests (year, month, nurse);
+CREATE TABLE IF NOT EXISTS staffing_overrides (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    year INTEGER NOT NULL,
+    month INTEGER NOT NULL,
+    "start" INTEGER NOT NULL,
+    "end" INTEGER NOT NULL,
+    shift TEXT NOT NULL,
+    count INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS staffing_overrides_by_month ON staffing_overrides (year, month);
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+"""
+
+# คอลัมน์ของแต่ละ kind (ไม่รวม id) ตามลำดับใน record และคอลัมน์ที่เป็นตัวเลข
+_COLUMNS = {
+    'requests': ['nurse', 'date', 'month', 'year', 'type', 'priority', 'reason'],
+    'fix_requests': ['nurse', 'shift', 'dates', 'month', 'year'],
+    'staffing_overrides': ['start', 'end', 'shift', 'count', 'month', 'year'],
+}
+_INT_COLUMNS = {'date', 'month', 'year', 'priority', 'start', 'end', 'count'}
+_OPTIONAL = {'requests': {'priority': 1, 'reason': None}}
+
+
+def _connect(path):
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    conn = sqlite3.connect(path, timeout=10)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.executescript(_SCHEMA)
+    return conn
+
+
+def _missing(value):
+    return value is None or (isinstance(value, float) and math.isnan(value)) or (isinstance(value, str)
+                                                                                and not value.strip())
+
+
+def _columns(kind):
+    if kind not in _COLUMNS:
+        raise ValueError(f"ไม่รู้จัก kind {kind!r} (ต้องเป็นหนึ่งใน {REQUEST_KINDS})")
+    return _COLUMNS[kind]
+
+
+def normalize_request(kind, record):
+    """record → dict รูปแบบมาตรฐาน (int, dates เป็น list) หรือ None ถ้าข้อมูลจำเป็นไม่ครบ (เช่นแถวว่างจาก data_editor)"""
+    optional = _OPTIONAL.get(kind, {})
+    row = {}
+    for column in _columns(kind):
+        value = record.get(column)
+        if _missing(value):
+            if column not in optional:
+                return None
+            if optional[column] is not None:
+                row[column] = optional[column]
+            continue
+        if column == 'dates':
+            value = [int(d) for d in str(value).split(',')] if isinstance(value, str) else [int(d) for d in value]
+        elif column in _INT_COLUMNS:
+            value = int(value)
+        else:
+            value = str(value)
+        row[column] = value
+    return row
+
+
+def normalize_requests(kind, records):
+    """normalize_request ทุกแถว (ตัดแถวที่ข้อมูลไม่ครบทิ้ง)"""
+    rows = (normalize_request(kind, r) for r in records)
+    return [r for r in rows if r is not None]
+
+
+def _column_list(columns):
+    return ', '.join(f'"{c}"' for c in columns)
+
+
+def _values(kind, row):
+    return tuple(','.join(map(str, row[c])) if c == 'dates' else row.get(c) for c in _columns(kind))
+
+
+def load_stored_requests(kind, year=None, month=None, path=REQUESTS_DB, with_ids=False):
+    """คำขอ kind ของ year/month (None = ทุกปี/ทุกเดือน) เรียงตามลำดับที่เพิ่ม
+
+    with_ids = ใส่ 'id' ของแถวใน record ด้วย (ใช้กับ save_edited_requests / delete_stored_ids)
+    """
+    columns = _columns(kind)
+    if not os.path.exists(path):
+        return []
+    where, args = [], []
+    for column, value in [('year', year), ('month', month)]:
+        if value is not None:
+            where.append(f"{column} = ?")
+            args.append(int(value))
+    sql = f"SELECT id, {_column_list(columns)} FROM {kind}"
+    if where:
+        sql += " WHERE " + " AND ".join(where)
+    sql += " ORDER BY id"
+    conn = _connect(path)
+    try:
+        rows = []
+        for row_id, *values in conn.execute(sql, args):
+            row = normalize_request(kind, dict(zip(columns, values)))
+            if row is not None:
+                rows.append({'id': row_id, **row} if with_ids else row)
+        return rows
+    finally:
+        conn.close()
+
+
+def _insert(conn, kind, rows):
+    columns = _columns(kind)
+    conn.executemany(
+        f"INSERT INTO {kind} ({_column_list(columns)}) VALUES ({', '.join('?' * len(columns))})",
+        [_values(kind, row) for row in rows],
+    )
+
+
+def add_stored_requests(kind, records, path=REQUESTS_DB):
+    """เพิ่มคำขอ (1 transaction) คืนค่าจำนวนแถวที่เพิ่ม (แถวที่ข้อมูลไม่ครบถูกข้าม)"""
+    rows = normalize_requests(kind, records)
+    conn = _connect(path)
+    try:
+        with conn:
+            _insert(conn, kind, rows)
+    finally:
+        conn.close()
+    return len(rows)
+
+
+def delete_stored_requests(kind, records, path=REQUESTS_DB):
+    """ลบคำขอที่ตรงกับ records ทีละ 1 แถวต่อ record (แถวซ้ำกันลบเท่าจำนวนที่ส่งมา) คืนค่าจำนวนแถวที่ลบ"""
+    columns = _columns(kind)
+    match = " AND ".join(f'"{c}" IS ?' for c in columns)
+    deleted = 0
+    conn = _connect(path)
+    try:
+        with conn:
+            for row in normalize_requests(kind, records):
+                cursor = conn.execute(
+                    f"DELETE FROM {kind} WHERE id = (SELECT id FROM {kind} WHERE {match} ORDER BY id LIMIT 1)",
+                    _values(kind, row),
+                )
+                deleted += cursor.rowcount
+    finally:
+        conn.close()
+    return deleted
+
+
+def _delete_ids(conn, kind, ids):
+    conn.executemany(f"DELETE FROM {kind} WHERE id = ?", [(int(i),) for i in ids])
+
+
+def delete_stored_ids(kind, ids, path=REQUESTS_DB):
+    """ลบคำขอตาม id (จาก load_stored_requests(..., with_ids=True))"""
+    _columns(kind)
+    conn = _connect(path)
+    try:
+        with conn:
+            _delete_ids(conn, kind, ids)
+    finally:
+        conn.close()
+
+
+def stored_request_changes(kind, before, after):
+    """เทียบแถวก่อน/หลังแก้ (มี 'id') คืนค่า (แถวใหม่, [(id, แถวที่แก้)], [id ที่ลบ])
+
+    แถวที่ไม่มี id = เพิ่มใหม่, แถวที่ข้อมูลจำเป็นไม่ครบ = ยังไม่บันทึก (แถวเดิมคงไว้ตามเดิม)
+    """
+    original = {int(r['id']): normalize_request(kind, r) for r in before}
+    added, updated, seen = [], [], set()
+    for record in after:
+        row = normalize_request(kind, record)
+        row_id = record.get('id')
+        if _missing(row_id):
+            if row is not None:
+                added.append(row)
+            continue
+        row_id = int(row_id)
+        seen.add(row_id)
+        if row is not None and row != original.get(row_id):
+            updated.append((row_id, row))
+    deleted = [row_id for row_id in original if row_id not in seen]
+    return added, updated, deleted
+
+
+def save_edited_requests(kind, before, after, path=REQUESTS_DB):
+    """บันทึกเฉพาะส่วนที่แก้ (เพิ่ม / แก้ตาม id / ลบตาม id) ใน 1 transaction คืนค่าจำนวนแถวที่เปลี่ยน
+
+    แถวที่คนอื่นเพิ่มระหว่างนั้นไม่ถูกแตะ (ต่างจาก replace_stored_month)
+    """
+    added, updated, deleted = stored_request_changes(kind, before, after)
+    if not (added or updated or deleted):
+        return 0
+    assignments = ', '.join(f'"{c}" = ?' for c in _columns(kind))
+    conn = _connect(path)
+    try:
+        with conn:
+            _delete_ids(conn, kind, deleted)
+            conn.executemany(
+                f"UPDATE {kind} SET {assignments} WHERE id = ?",
+                [_values(kind, row) + (row_id,) for row_id, row in updated],
+            )
+            _insert(conn, kind, added)
+    finally:
+        conn.close()
+    return len(added) + len(updated) + len(deleted)
+
+
+def replace_stored_month(kind, year, month, records, path=REQUESTS_DB):
+    """แทนคำขอ kind ทั้งเดือน year/month ด้วย records (1 transaction, เดือนอื่นไม่ถูกแตะ) คืนค่าจำนวนแถว
+
+    สำหรับนำเข้าทั้งเดือนเท่านั้น (แถวที่คนอื่นเพิ่งเพิ่มจะหายด้วย) การแก้จาก UI ใช้ save_edited_requests
+    """
+    rows = [r for r in normalize_requests(kind, records) if (r['year'], r['month']) == (year, month)]
+    conn = _connect(path)
+    try:
+        with conn:
+            conn.execute(f"DELETE FROM {kind} WHERE year = ? AND month = ?", (year, month))
+            _insert(conn, kind, rows)
+    finally:
+        conn.close()
+    return len(rows)
+
+
+def clear_stored_month(year, month, kinds=REQUEST_KINDS, path=REQUESTS_DB):
+    """ลบคำขอทุก kind ใน kinds ของเดือน year/month (1 transaction)"""
+    conn = _connect(path)
+    try:
+        with conn:
+            for kind in kinds:
+                _columns(kind)
+                conn.execute(f"DELETE FROM {kind} WHERE year = ? AND month = ?", (year, month))
+    finally:
+        conn.close()
+
+
+def migrate_csv_requests(path=REQUESTS_DB, requests_csv=CSV_FILE, fix_requests_csv=FIX_REQUESTS_FILE,
+                         staffing_overrides_csv=STAFFING_OVERRIDES_FILE):
+    """ย้ายคำขอจาก CSV เดิมเข้า SQLite ครั้งเดียว (ทำซ้ำได้ ครั้งถัดไปไม่ทำอะไร) คืนค่าจำนวนแถวต่อ kind
+
+    ไฟล์ CSV เดิมไม่ถูกลบ (เก็บไว้เป็น backup) แต่หลังจากนี้ app อ่าน/เขียนที่ SQLite เท่านั้น
+    """
+    conn = _connect(path)
+    try:
+        with conn:
+            # จองสิทธิ์ย้ายข้อมูลใน transaction เดียวกับการ insert: session ที่เปิดพร้อมกันจะรอ lock
+            # แล้วเห็นว่ามีคนย้ายไปแล้ว (rowcount = 0) ไม่ย้ายซ้ำ
+            claimed = conn.execute(
+                "INSERT OR IGNORE INTO meta (key, value) VALUES ('csv_migrated', datetime('now'))"
+            ).rowcount
+            if not claimed:
+                return {}
+            loaded = {
+                'requests': load_requests_from_csv(requests_csv),
+                'fix_requests': load_fix_requests_from_csv(fix_requests_csv),
+                'staffing_overrides': load_staffing_overrides_from_csv(staffing_overrides_csv),
+            }
+            counts = {}
+            for kind, records in loaded.items():
+                rows = normalize_requests(kind, records)
+                _insert(conn, kind, rows)
+                counts[kind] = len(rows)
+        return counts
+    finally:
+        conn.close()
@@ -0,0 +1,111 @@
+"""ปรับตารางกลางเดือน (Re-roster) เมื่อมีคนป่วย/ลากะทันหัน โดยแตะเวรที่ประกาศไปแล้วให้น้อยที่สุด"""
+
+from ortools.sat.python import cp_model
+
+from .solver import (
+    SHIFTS,
+    _extract_schedule,
+    add_schedule_hint,
+    build_schedule_model,
+    run_solver,
+    schedule_to_assignments,
+)
+
+# re-roster ต้องเร็ว: จำกัดเวลาต่อรอบ (ถ้าไม่ได้ จะขยายขอบเขตแล้วลองใหม่)
+DEFAULT_REROSTER_TIME_LIMIT = 3.0
+# ลบคะแนนต่อ 1 ช่องที่เปลี่ยนจากตารางที่ประกาศแล้ว (สูงกว่า soft constraint อื่นทั้งหมด)
+DEFAULT_DEVIATION_WEIGHT = 1000
+
+
+def _neighborhood_windows(cutoff_day, days_in_month, window_days, neighborhood_nurses, nurses):
+    """ลำดับขอบเขตที่จะลอง: เริ่มจากช่วงเล็ก แล้วขยายเป็น 2 เท่าจนถึงสิ้นเดือน/ทุกคน"""
+    windows = []
+    span = max(1, window_days)
+    limited = list(neighborhood_nurses) if neighborhood_nurses else list(nurses)
+    while True:
+        last_day = min(days_in_month, cutoff_day + span - 1)
+        windows.append((last_day, limited))
+        if last_day >= days_in_month:
+            break
+        span *= 2
+    if len(limited) < len(nurses):
+        # ขยายทั้งช่วงวันแล้วยังไม่ได้ → เปิดให้ทุกคนขยับได้
+        windows.append((days_in_month, list(nurses)))
+    return windows
+
+
+def _pinned_shift(shifts_var, n, d):
+    """เวรที่ใช้แทนเวรเดิมที่ถูกตัดออกจากโดเมน ในช่องที่ต้องล็อก (เหลือเวรเดียว → เวรนั้น, ไม่งั้น O)"""
+    remaining = [s for s in SHIFTS if (n, d, s) in shifts_var]
+    if len(remaining) == 1:
+        return remaining[0]
+    if 'O' in remaining:
+        return 'O'
+    raise ValueError(f"{n} วันที่ {d}: เวรเดิมใช้ไม่ได้แล้ว และไม่มีเวรแทนที่ล็อกได้ ({remaining})")
+
+
+def schedule_changes(published_schedule, new_schedule, nurses, days_in_month):
+    """รายการช่องที่เปลี่ยน [(nurse, day, เวรเดิม, เวรใหม่), ...]"""
+    before = schedule_to_assignments(published_schedule, nurses, days_in_month)
+    after = schedule_to_assignments(new_schedule, nurses, days_in_month)
+    changes = []
+    for n in nurses:
+        for d in range(1, days_in_month + 1):
+            old, new = before.get((n, d)), after.get((n, d))
+            if old != new:
+                changes.append((n, d, old, new))
+    return changes
+
+
+def reroster_schedule(year, month, days_in_month, nurses, requests, published_schedule, cutoff_day,
+                      fix_requests=None, staffing_overrides=None, enable_oc=True, prev_month_data=None,
+                      window_days=3, neighborhood_nurses=None, deviation_weight=DEFAULT_DEVIATION_WEIGHT,
+                      solver_params=None, ward_config=None):
+    """จัดตารางใหม่เฉพาะรอบๆ จุดที่มีปัญหา โดยยึดตารางที่ประกาศแล้ว (published_schedule)
+
+    - วันก่อน cutoff_day: ล็อกตามตารางเดิมทั้งหมด (Hard)
+    - วัน cutoff_day .. cutoff_day + window_days - 1 ของพยาบาลใน neighborhood_nurses
+      (None = ทุกคน): ขยับได้ แต่ลบคะแนน deviation_weight ต่อช่องที่เปลี่ยน
+    - นอกขอบเขตนั้น: ล็อกตามตารางเดิม
+    ช่องที่เวรเดิมใช้ไม่ได้แล้ว (เช่นยกเลิกลา → ไม่มี L_T): ในขอบเขตที่ขยับได้ = นับเป็นช่องที่ต้องเปลี่ยน,
+    นอกขอบเขต (รวมวันก่อน cutoff_day) = ล็อกเป็นเวรแทน (_pinned_shift) ไม่ปล่อยให้ solver เลือกเอง
+    ถ้าจัดไม่ได้ในขอบเขตเล็ก จะขยายช่วงวันเป็น 2 เท่า (และสุดท้ายเปิดให้ทุกคน) แล้วลองใหม่
+
+    requests ต้องรวมคำขอใหม่ (เช่น ลาป่วยวันที่ 14) แล้ว คืนค่า DataFrame หรือ None
+    """
+    published = schedule_to_assignments(published_schedule, nurses, days_in_month)
+    params = {'time_limit': DEFAULT_REROSTER_TIME_LIMIT}
+    if solver_params:
+        params.update(solver_params)
+
+    for last_day, free_nurses in _neighborhood_windows(cutoff_day, days_in_month, window_days,
+                                                       neighborhood_nurses, nurses):
+        model, shifts_var, objective = build_schedule_model(
+            year, month, days_in_month, nurses, requests, fix_requests, staffing_overrides,
+            enable_oc=enable_oc, prev_month_data=prev_month_data, ward_config=ward_config
+        )
+
+        deviations = []
+        forced_changes = 0
+        for (n, d), shift in published.items():
+            is_free = n in free_nurses and cutoff_day <= d <= last_day
+            if (n, d, shift) not in shifts_var:
+                # เวรเดิมถูกตัดออกจากโดเมน (เช่นยกเลิกลา) → ต้องเปลี่ยนแน่นอน
+                forced_changes += 1
+                if not is_free:
+                    model.Add(shifts_var[(n, d, _pinned_shift(shifts_var, n, d))] == 1)
+                continue
+            if is_free:
+                # เปลี่ยนจากเดิม = 1 - (ยังเป็นเวรเดิม)
+                deviations.append(1 - shifts_var[(n, d, shift)])
+            else:
+                model.Add(shifts_var[(n, d, shift)] == 1)
+
+        model.Maximize(objective - deviation_weight * (sum(deviations) + forced_changes))
+        add_schedule_hint(model, shifts_var, published_schedule, nurses, days_in_month)
+
+        solver, status = run_solver(model, params)
+        if status in [cp_model.OPTIMAL, cp_model.FEASIBLE]:
+            return _extract_schedule(solver, shifts_var, year, month, days_in_month, nurses, ward_config)
+
+    return None
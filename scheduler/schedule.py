@@ -0,0 +1,120 @@
+"""ตารางเวร 1 เดือนแบบ compact (int8 array + ข้อมูลวัน) ใช้ร่วมกันทั้งหน้าค่าตอบแทน คะแนน และการบันทึก
+
+แทนการอ่าน DataFrame ที่แสดงผล (มี emoji/ข้อความไทย) ซ้ำหลายรอบในแต่ละหน้า
+"""
+
+import calendar
+import re
+from enum import IntEnum
+
+import numpy as np
+import pandas as pd
+
+from .solver import DISPLAY_TO_SHIFT, SHIFT_CODES, render_schedule_df
+from .thai_calendar import is_holiday
+
+
+class ShiftCode(IntEnum):
+    """รหัสเวร (ค่าเดียวกับ SHIFT_CODES / ตำแหน่งใน SHIFTS)"""
+    S = SHIFT_CODES['S']
+    M = SHIFT_CODES['M']
+    N = SHIFT_CODES['N']
+    O = SHIFT_CODES['O']
+    L_T = SHIFT_CODES['L_T']
+    NS = SHIFT_CODES['NS']
+    OC = SHIFT_CODES['OC']
+
+
+HOLIDAY_PREFIX = '🟡'
+WEEKEND_PREFIX = '🔵'
+_DAY_COLUMN = re.compile(r'^\D*?(\d+)$')
+
+
+def parse_shift_cell(value):
+    """ข้อความในช่องตาราง → ShiftCode (ช่องว่าง/อ่านไม่ออก = O)"""
+    text = '' if pd.isna(value) else str(value).strip()
+    shift = DISPLAY_TO_SHIFT.get(text) or DISPLAY_TO_SHIFT.get(text.upper())
+    if shift is None:
+        # แก้มือใน data_editor อาจพิมพ์ไม่ตรงรูปแบบ เช่น "ลา" หรือ "OC"
+        if 'ลา' in text:
+            shift = 'L_T'
+        elif 'OC' in text.upper():
+            shift = 'OC'
+        else:
+            shift = 'O'
+    return ShiftCode(SHIFT_CODES[shift])
+
+
+class Schedule:
+    """ตารางเวร 1 เดือน: codes[i, d - 1] = ShiftCode ของ nurses[i] ในวันที่ d
+
+    weekday / holiday / special เป็น array ยาวเท่าจำนวนวัน (special = ส-อา หรือ นักขัตฤกษ์)
+    """
+
+    def __init__(self, codes, nurses, year, month, ward_config=None):
+        self.codes = np.asarray(codes, dtype=np.int8)
+        self.ward_config = ward_config
+        self.nurses = list(nurses)
+        self.year = year
+        self.month = month
+        self.days_in_month = self.codes.shape[1]
+        days = range(1, self.days_in_month + 1)
+        self.weekday = np.array([calendar.weekday(year, month, d) for d in days])
+        self.holiday = np.array([is_holiday(year, month, d) for d in days], dtype=bool)
+        self.special = (self.weekday >= 5) | self.holiday
+
+    @classmethod
+    def from_display_df(cls, df, year, month, ward_config=None):
+        """อ่านตารางแสดงผล (จาก solve_schedule หรือ data_editor) ครั้งเดียว
+
+        คอลัมน์วันอ่านได้ทั้ง '5', '🟡5', '🔵5' / พยาบาล = คำแรกของคอลัมน์แรก (เช่น 'ER1 (Nurse 1)')
+        """
+        _, days_in_month = calendar.monthrange(year, month)
+        day_columns = {}
+        for col in df.columns[1:]:
+            match = _DAY_COLUMN.match(str(col))
+            if match and 1 <= int(match.group(1)) <= days_in_month:
+                day_columns[int(match.group(1))] = col
+
+        nurses = [str(name).split(' ')[0] for name in df.iloc[:, 0]]
+        codes = np.full((len(nurses), days_in_month), ShiftCode.O, dtype=np.int8)
+        if day_columns:
+            # ข้อความในตารางซ้ำกันมาก → แปลงเฉพาะค่าที่ไม่ซ้ำ แล้ว map กลับทั้งตาราง
+            cells = df[list(day_columns.values())].fillna('').astype(str)
+            values, inverse = np.unique(cells.to_numpy(), return_inverse=True)
+            lookup = np.array([parse_shift_cell(v) for v in values], dtype=np.int8)
+            codes[:, [d - 1 for d in day_columns]] = lookup[inverse].reshape(cells.shape)
+        return cls(codes, nurses, year, month, ward_config)
+
+    def to_display_df(self):
+        return render_schedule_df(self.codes, self.nurses, self.year, self.month, self.ward_config)
+
+    def day_labels(self):
+        """ชื่อคอลัมน์วันสำหรับแสดงผล (🟡 = นักขัตฤกษ์, 🔵 = ส-อา)"""
+        labels = []
+        for d in range(1, self.days_in_month + 1):
+            if self.holiday[d - 1]:
+                labels.append(f"{HOLIDAY_PREFIX}{d}")
+            elif self.weekday[d - 1] >= 5:
+                labels.append(f"{WEEKEND_PREFIX}{d}")
+            else:
+                labels.append(str(d))
+        return labels
+
+    def index(self, nurse):
+        return self.nurses.index(nurse)
+
+    def shift(self, nurse, day):
+        return ShiftCode(int(self.codes[self.index(nurse), day - 1]))
+
+    def shift_counts(self):
+        """จำนวนเวรแต่ละรหัสของแต่ละคน array (พยาบาล, ShiftCode) คำนวณทีเดียวทั้งตาราง"""
+        num_codes = len(ShiftCode)
+        flat = self.codes.astype(np.int64) + num_codes * np.arange(len(self.nurses))[:, None]
+        counts = np.bincount(flat.ravel(), minlength=len(self.nurses) * num_codes)
+        return counts.reshape(len(self.nurses), num_codes)
+
+    def count(self, *shift_codes, days=None):
+        """จำนวนเวรในรหัสที่ระบุของแต่ละคน (array ยาวเท่าจำนวนพยาบาล) days = mask/ลิสต์ index วัน (ถ้าจำกัด)"""
+        codes = self.codes if days is None else self.codes[:, days]
+        return np.isin(codes, [int(c) for c in shift_codes]).sum(axis=1)
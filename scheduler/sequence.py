@@ -0,0 +1,118 @@
+"""กฎลำดับเวร (เวรของวันติดกัน 2-3 วัน) แบบ automaton: สถานะ = เวรของ 2 วันก่อนหน้า
+
+แทน constraint รายคู่/รายสามวันหลายพันข้อ (S→N, N→S, N→N, S-M-N, S-O-N, S-S-N,
+N-?-N, O→N, NS→ทำงาน, OC→M) ด้วยตารางการเปลี่ยนสถานะ 1 ตารางต่อพยาบาลต่อวัน::
+
+    (เวรวัน d-2, เวรวัน d-1, เวรวัน d, ค่าปรับของวัน d)
+
+ลำดับที่ห้าม (Hard) ไม่มีในตาราง, ลำดับที่ควรเลี่ยง (Soft) มีค่าปรับ = ผลรวมน้ำหนักของ
+ทุกกฎที่ผิด → objective ลบผลรวมค่าปรับ (คะแนนเท่ากับแบบ linear ทุกตาราง)
+กฎที่ต่างกันในช่วง OC (N→N, S-M-N เป็น Soft) ใช้ตารางคนละชุดตามวัน
+ตารางเดียวกันใช้ซ้ำทุกวัน/ทุกคนที่มีเงื่อนไขเหมือนกัน
+"""
+
+from ortools.sat.python import cp_model
+
+SEQUENCE_ENCODINGS = ('linear', 'automaton')
+DEFAULT_SEQUENCE_ENCODING = 'linear'
+
+NONE = None  # ก่อนวันที่ 1 (ไม่มีข้อมูล → ไม่มีกฎ)
+NIGHTS = ('N', 'NS')
+
+
+def transition_cost(prev2, prev1, shift, weights, night_soft=False, smn_soft=False, oc_ban=False,
+                    ns_rules=True):
+    """ค่าปรับเมื่อเวร prev2 → prev1 → shift (None = ห้าม)
+
+    night_soft = วัน d-1 อยู่ในช่วง OC (ดึกติดกันเป็น Soft)
+    smn_soft = วัน d-2 อยู่ในช่วง OC (S-M-N เป็น Soft)
+    oc_ban = วัน d-1 อยู่ในช่วง OC (ห้าม OC→M, OC→OC)
+    ns_rules = พยาบาลทำ NS ได้ (หลัง NS ควรหยุด)
+    """
+    cost = 0
+    if prev1 is not NONE:
+        # สลับเวร S↔N (Soft)
+        if (prev1 == 'S' and shift in NIGHTS) or (prev1 in NIGHTS and shift == 'S'):
+            cost += weights['s_n_transition']
+        # ดึกติดกัน: ช่วง OC = Soft, ช่วงอื่น = Hard
+        if prev1 in NIGHTS and shift in NIGHTS:
+            if not night_soft:
+                return None
+            cost += weights['n_consecutive']
+        # หยุดแล้วดึก (Soft)
+        if prev1 == 'O' and shift in NIGHTS:
+            cost += weights['o_before_n']
+        # หลัง NS ควรหยุด (Soft)
+        if ns_rules and prev1 == 'NS' and shift in ('S', 'M', 'N', 'NS'):
+            cost += weights['o_before_n']
+        # ช่วง OC: ห้าม OC→M, OC→OC
+        if oc_ban and prev1 == 'OC' and shift in ('M', 'OC'):
+            return None
+    if prev2 is not NONE:
+        # S-M-N: ช่วง OC = Soft, ช่วงอื่น = Hard
+        if prev2 == 'S' and prev1 == 'M' and shift in NIGHTS:
+            if not smn_soft:
+                return None
+            cost += weights['s_m_n']
+        # ดึกสลับวัน N-?-N (Soft)
+        if prev2 in NIGHTS and shift in NIGHTS:
+            cost += weights['n_skip_day']
+        # S-O-N, NS-O-N, S-S-N (Hard)
+        if prev2 in ('S', 'NS') and prev1 == 'O' and shift in NIGHTS:
+            return None
+        if prev2 == 'S' and prev1 == 'S' and shift in NIGHTS:
+            return None
+    return cost
+
+
+def transition_table(shifts, weights, with_prev2, **flags):
+    """tuple ที่อนุญาตของ (prev2?, prev1, shift, cost) เป็นรหัสเวร (ตำแหน่งใน shifts)"""
+    codes = list(enumerate(shifts))
+    table = []
+    for c1, prev1 in codes:
+        for c2, shift in codes:
+            if with_prev2:
+                for c0, prev2 in codes:
+                    cost = transition_cost(prev2, prev1, shift, weights, **flags)
+                    if cost is not None:
+                        table.append((c0, c1, c2, cost))
+            else:
+                cost = transition_cost(NONE, prev1, shift, weights, **flags)
+                if cost is not None:
+                    table.append((c1, c2, cost))
+    return table
+
+
+def add_sequence_automaton(model, shifts_var, shifts, nurses, days_in_month, weights, enable_oc, oc_last_day,
+                           ns_nurses):
+    """เพิ่มกฎลำดับเวรแบบตาราง คืนค่า list ของตัวแปรค่าปรับ (รวมน้ำหนักแล้ว ลบออกจาก objective ได้ตรงๆ)"""
+    tables = {}
+    penalties = []
+    for n in nurses:
+        # รหัสเวรของแต่ละวัน (เชื่อมกับ BoolVar ของเวรนั้น)
+        day_code = {}
+        for d in range(1, days_in_month + 1):
+            # โดเมนของรหัส = เฉพาะเวรที่มีตัวแปร (ช่องที่ถูกตัดใน shift_domains ไม่อยู่ในโดเมน)
+            allowed = [i for i, s in enumerate(shifts) if (n, d, s) in shifts_var] or [0]
+            code = model.NewIntVarFromDomain(cp_model.Domain.FromValues(allowed), f'code_{n}_{d}')
+            model.Add(code == sum(i * shifts_var[(n, d, s)] for i, s in enumerate(shifts)))
+            day_code[d] = code
+
+        for d in range(2, days_in_month + 1):
+            flags = {
+                'night_soft': enable_oc and d - 1 <= oc_last_day,
+                'smn_soft': enable_oc and d - 2 <= oc_last_day,
+                'oc_ban': enable_oc and d - 1 < min(oc_last_day, days_in_month),
+                'ns_rules': n in ns_nurses,
+            }
+            key = (d >= 3,) + tuple(sorted(flags.items()))
+            if key not in tables:
+                tables[key] = transition_table(shifts, weights, d >= 3, **flags)
+            table = tables[key]
+            costs = sorted({row[-1] for row in table})
+            cost = model.NewIntVarFromDomain(cp_model.Domain.FromValues(costs), f'seq_cost_{n}_{d}')
+            window = [day_code[d - 2]] if d >= 3 else []
+            model.AddAllowedAssignments(window + [day_code[d - 1], day_code[d], cost], table)
+            if costs != [0]:
+                penalties.append(cost)
+    return penalties
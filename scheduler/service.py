@@ -0,0 +1,372 @@
+"""HTTP service ในเครื่อง (ไม่ต้องเปิด Streamlit) ให้เครื่องมืออื่นขอจัดตารางผ่าน JSON
+
+    python -m scheduler serve --port 8765
+
+endpoint (ฟังเฉพาะ 127.0.0.1 เป็นค่าเริ่มต้น ไม่ต้องต่อเน็ต)::
+
+    POST   /jobs                      ส่งงาน (JSON ดู parse_job_request) → 202 {id, status, ...}
+                                      คิวเต็ม → 429 + Retry-After
+    GET    /jobs                      สถานะทุกงาน
+    GET    /jobs/<id>                 สถานะ + ความคืบหน้า + ตารางดีที่สุดที่เจอแล้ว (best)
+    GET    /jobs/<id>/result          ผลลัพธ์ JSON (?format=csv หรือ /result.csv = ตารางแสดงผลแบบ CSV)
+    DELETE /jobs/<id>                 ยกเลิก (งานที่กำลังรันจะจบพร้อมคำตอบดีที่สุดที่เจอแล้ว)
+    GET    /health                    จำนวนงานที่รัน/รอ และความจุของคิว
+
+งานแต่ละงานรันใน process แยก (SolveJob) รันพร้อมกันได้ไม่เกิน cpus // workers_per_job งาน
+ที่เหลือรอในคิวขนาด queue_size
+workers_per_job ใช้ค่าเดียวกับ batch (DEFAULT_WORKERS_PER_JOB, อย่างน้อย MIN_WORKERS_PER_JOB):
+1 worker ไม่มี LNS / feasibility jump งานที่ time_limit สั้นมักจบโดยไม่มีตาราง
+"""
+
+import calendar
+import itertools
+import json
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from .sequence import SEQUENCE_ENCODINGS
+from .solver import (
+    DEFAULT_SOLVER_PARAMS,
+    DEFAULT_WORKERS_PER_JOB,
+    MIN_WORKERS_PER_JOB,
+    SHIFTS,
+    render_schedule_df,
+)
+from .telemetry import solve_outcome
+from .ward_config import DEFAULT_WARD_CONFIG, list_wards, load_ward_config
+from .worker import SolveJob
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+DEFAULT_QUEUE_SIZE = 8          # งานที่รอได้ (เกินนี้ตอบ 429)
+DEFAULT_MAX_TIME_LIMIT = 600.0  # วินาทีสูงสุดที่ให้ขอต่องาน
+KEEP_FINISHED = 100             # เก็บผลของงานที่จบแล้วกี่งาน (เก่าสุดถูกลบก่อน)
+
+_JOB_FIELDS = {'year', 'month', 'ward', 'nurses', 'requests', 'fix_requests', 'staffing_overrides', 'enable_oc',
+               'prev_month_data', 'time_limit', 'random_seed', 'deterministic', 'sequence_encoding'}
+
+
+class QueueFull(Exception):
+    """คิวเต็ม (ตอบ 429)"""
+
+
+def parse_job_request(body, max_time_limit=DEFAULT_MAX_TIME_LIMIT):
+    """ตรวจ JSON ของงาน คืนค่า (args, kwargs) ของ solve_schedule_codes ข้อมูลผิด → ValueError
+
+    year, month (จำเป็น), ward (ชื่อค่ากฎวอร์ด), nurses (ไม่ระบุ = ทุกคนของวอร์ด),
+    requests / fix_requests / staffing_overrides (list ของ dict แบบเดียวกับ CSV),
+    enable_oc, prev_month_data ({nurse: [เวร 7 วันสุดท้าย]}), time_limit, random_seed, deterministic,
+    sequence_encoding
+    """
+    if not isinstance(body, dict):
+        raise ValueError("body ต้องเป็น JSON object")
+    unknown = set(body) - _JOB_FIELDS
+    if unknown:
+        raise ValueError(f"ไม่รู้จัก field {sorted(unknown)}")
+    try:
+        year, month = int(body['year']), int(body['month'])
+    except (KeyError, TypeError, ValueError):
+        raise ValueError("ต้องระบุ year และ month เป็นตัวเลข")
+    if not 1 <= month <= 12:
+        raise ValueError("month ต้องอยู่ระหว่าง 1-12")
+
+    ward = body.get('ward', DEFAULT_WARD_CONFIG)
+    if ward not in list_wards():
+        raise ValueError(f"ไม่มีค่ากฎของวอร์ด {ward!r}")
+    ward_config = load_ward_config(ward)
+    nurses = body.get('nurses')
+    if nurses is not None and not (isinstance(nurses, list) and all(isinstance(n, str) for n in nurses)):
+        raise ValueError("nurses ต้องเป็น list ของรหัสพยาบาล")
+    nurses = nurses or ward_config.nurses
+    unknown_nurses = [n for n in nurses if n not in ward_config.nurse_names]
+    if unknown_nurses:
+        raise ValueError(f"ไม่มี {unknown_nurses} ในวอร์ด {ward}")
+    for field in ['requests', 'fix_requests', 'staffing_overrides']:
+        if not isinstance(body.get(field, []), list):
+            raise ValueError(f"{field} ต้องเป็น list")
+    if not isinstance(body.get('prev_month_data') or {}, dict):
+        raise ValueError("prev_month_data ต้องเป็น object {nurse: [เวร, ...]}")
+    if body.get('sequence_encoding') not in (None,) + SEQUENCE_ENCODINGS:
+        raise ValueError(f"sequence_encoding ต้องเป็นหนึ่งใน {SEQUENCE_ENCODINGS}")
+
+    time_limit = body.get('time_limit', DEFAULT_SOLVER_PARAMS['time_limit'])
+    if isinstance(time_limit, bool) or not isinstance(time_limit, (int, float)) \
+            or not 0 < time_limit <= max_time_limit:
+        raise ValueError(f"time_limit ต้องเป็นตัวเลขระหว่าง 0-{max_time_limit:g} วินาที")
+    random_seed = body.get('random_seed')
+    if random_seed is not None and (isinstance(random_seed, bool) or not isinstance(random_seed, int)):
+        raise ValueError("random_seed ต้องเป็นจำนวนเต็ม")
+    solver_params = {'time_limit': float(time_limit), 'deterministic': bool(body.get('deterministic', False)),
+                     'random_seed': random_seed}
+
+    _, days_in_month = calendar.monthrange(year, month)
+    args = (year, month, days_in_month, list(nurses), body.get('requests', []))
+    kwargs = {
+        'fix_requests': body.get('fix_requests', []),
+        'staffing_overrides': body.get('staffing_overrides', []),
+        'enable_oc': bool(body.get('enable_oc', True)),
+        'prev_month_data': body.get('prev_month_data'),
+        'solver_params': solver_params,
+        'ward_config': ward_config,
+        'sequence_encoding': body.get('sequence_encoding'),
+    }
+    return args, kwargs
+
+
+def codes_to_json(codes, nurses):
+    """matrix รหัสเวร → {nurse: ['S', 'O', ...]}"""
+    if codes is None:
+        return None
+    return {n: [SHIFTS[c] for c in codes[i]] for i, n in enumerate(nurses)}
+
+
+class _Entry:
+    def __init__(self, job_id, args, kwargs):
+        self.id = job_id
+        self.year, self.month, _, self.nurses, _ = args
+        self.ward_config = kwargs['ward_config']
+        self.job = SolveJob(*args, **kwargs)
+        self.submitted_at = time.time()
+        self.cancelled_in_queue = False
+
+    @property
+    def status(self):
+        if self.cancelled_in_queue:
+            return 'cancelled'
+        if self.job.done:
+            return 'finished'
+        return 'running' if self.job.started_at is not None else 'queued'
+
+    def snapshot(self, include_best=True):
+        job = self.job
+        info = {
+            'id': self.id,
+            'status': self.status,
+            'year': self.year,
+            'month': self.month,
+            'ward': self.ward_config.ward,
+            'submitted_at': time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(self.submitted_at)),
+            'elapsed': round(job.elapsed, 2),
+            'progress': job.progress,
+        }
+        if job.done:
+            info['outcome'] = solve_outcome(job.stats, cancelled=job.cancelled, error=job.error)
+            info['stats'] = job.stats
+            info['error'] = job.error
+        if include_best:
+            info['best'] = codes_to_json(job.result_codes if job.done else job.best_codes, self.nurses)
+        return info
+
+
+class JobQueue:
+    """คิวงานจัดตาราง: รันพร้อมกันไม่เกิน max_running งาน, รอได้ไม่เกิน queue_size งาน
+
+    dispatcher thread คอยอ่านความคืบหน้าของงานที่รันอยู่ และเริ่มงานถัดไปเมื่อมีที่ว่าง
+    """
+
+    def __init__(self, cpus=None, workers_per_job=DEFAULT_WORKERS_PER_JOB, queue_size=DEFAULT_QUEUE_SIZE,
+                 keep_finished=KEEP_FINISHED):
+        cpus = cpus or os.cpu_count() or 1
+        self.workers_per_job = max(MIN_WORKERS_PER_JOB, workers_per_job)
+        self.max_running = max(1, cpus // self.workers_per_job)
+        self.queue_size = queue_size
+        self.keep_finished = keep_finished
+        self._entries = OrderedDict()
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _counts(self):
+        statuses = [e.status for e in self._entries.values()]
+        return statuses.count('running'), statuses.count('queued')
+
+    def submit(self, args, kwargs):
+        """เพิ่มงานเข้าคิว คืนค่า snapshot ของงาน (คิวเต็ม → QueueFull)"""
+        kwargs = dict(kwargs, solver_params={**kwargs['solver_params'], 'num_workers': self.workers_per_job})
+        with self._lock:
+            _, queued = self._counts()
+            if queued >= self.queue_size:
+                raise QueueFull(f"คิวเต็ม ({queued} งานรออยู่)")
+            entry = _Entry(str(next(self._ids)), args, kwargs)
+            self._entries[entry.id] = entry
+            self._dispatch()
+            return entry.snapshot(include_best=False)
+
+    def snapshot(self, job_id, include_best=True):
+        with self._lock:
+            entry = self._entries.get(job_id)
+            return None if entry is None else entry.snapshot(include_best)
+
+    def snapshots(self):
+        with self._lock:
+            return [e.snapshot(include_best=False) for e in self._entries.values()]
+
+    def result(self, job_id):
+        """(entry, codes) ของงานที่จบแล้ว / (entry, None) ถ้ายังไม่จบหรือไม่มีคำตอบ / (None, None) ถ้าไม่มีงานนี้"""
+        with self._lock:
+            entry = self._entries.get(job_id)
+            if entry is None or not entry.job.done:
+                return entry, None
+            return entry, entry.job.result_codes
+
+    def cancel(self, job_id):
+        with self._lock:
+            entry = self._entries.get(job_id)
+            if entry is None:
+                return None
+            if entry.status == 'queued':
+                entry.cancelled_in_queue = True
+            elif entry.status == 'running':
+                entry.job.cancel()
+            return entry.snapshot(include_best=False)
+
+    def health(self):
+        with self._lock:
+            running, queued = self._counts()
+        return {'running': running, 'queued': queued, 'max_running': self.max_running,
+                'queue_size': self.queue_size, 'workers_per_job': self.workers_per_job}
+
+    def _dispatch(self):
+        """อ่านความคืบหน้า + เริ่มงานที่รอ (เรียกขณะถือ lock)"""
+        for entry in self._entries.values():
+            if entry.status == 'running':
+                entry.job.poll()
+        running, _ = self._counts()
+        for entry in self._entries.values():
+            if running >= self.max_running:
+                break
+            if entry.status == 'queued':
+                entry.job.start()
+                running += 1
+        # ลบงานที่จบแล้วเก่าสุดเมื่อเกิน keep_finished
+        finished = [job_id for job_id, e in self._entries.items() if e.status in ('finished', 'cancelled')]
+        for job_id in finished[:max(0, len(finished) - self.keep_finished)]:
+            del self._entries[job_id]
+
+    def _run(self, interval):
+        while not self._stop.wait(interval):
+            with self._lock:
+                self._dispatch()
+
+    def start(self, interval=0.2):
+        self._thread = threading.Thread(target=self._run, args=(interval,), daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """หยุด dispatcher และยกเลิกทุกงานที่ยังรันอยู่"""
+        self._stop.set()
+        with self._lock:
+            for entry in self._entries.values():
+                if entry.status == 'running':
+                    entry.job.cancel()
+
+
+_JOB_PATH = re.compile(r'^/jobs/(?P<id>[^/]+?)(?P<result>/result(?P<csv>\.csv)?)?/?$')
+
+
+class SchedulerRequestHandler(BaseHTTPRequestHandler):
+    """แปลง HTTP ↔ JobQueue (self.server.jobs)"""
+
+    server_version = "NurseScheduler/1"
+
+    def _send(self, status, body, content_type='application/json; charset=utf-8', headers=None):
+        data = body if isinstance(body, bytes) else json.dumps(body, ensure_ascii=False, default=str).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(data)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _error(self, status, message, headers=None):
+        self._send(status, {'error': message}, headers=headers)
+
+    def log_message(self, format, *args):
+        if not self.server.quiet:
+            super().log_message(format, *args)
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        jobs = self.server.jobs
+        if url.path == '/health':
+            return self._send(200, jobs.health())
+        if url.path.rstrip('/') == '/jobs':
+            return self._send(200, {'jobs': jobs.snapshots()})
+        match = _JOB_PATH.match(url.path)
+        if match is None:
+            return self._error(404, "ไม่มี endpoint นี้")
+        job_id = match.group('id')
+        if not match.group('result'):
+            info = jobs.snapshot(job_id)
+            return self._send(200, info) if info else self._error(404, f"ไม่มีงาน {job_id}")
+
+        entry, codes = jobs.result(job_id)
+        if entry is None:
+            return self._error(404, f"ไม่มีงาน {job_id}")
+        if not entry.job.done:
+            return self._error(409, f"งาน {job_id} ยังไม่เสร็จ ({entry.status})")
+        if codes is None:
+            return self._send(409, jobs.snapshot(job_id, include_best=False))
+        fmt = 'csv' if match.group('csv') else parse_qs(url.query).get('format', ['json'])[0]
+        if fmt == 'csv':
+            df = render_schedule_df(codes, entry.nurses, entry.year, entry.month, entry.ward_config)
+            return self._send(200, df.to_csv(index=False).encode('utf-8-sig'), 'text/csv; charset=utf-8',
+                              {'Content-Disposition': f'attachment; filename="{entry.year}-{entry.month:02d}.csv"'})
+        info = jobs.snapshot(job_id, include_best=False)
+        info['schedule'] = codes_to_json(codes, entry.nurses)
+        return self._send(200, info)
+
+    def do_POST(self):
+        if urlparse(self.path).path.rstrip('/') != '/jobs':
+            return self._error(404, "ไม่มี endpoint นี้")
+        try:
+            length = int(self.headers.get('Content-Length', 0))
+            body = json.loads(self.rfile.read(length) or b'{}')
+            args, kwargs = parse_job_request(body, self.server.max_time_limit)
+        except (ValueError, TypeError, OSError) as e:  # JSONDecodeError เป็น ValueError
+            return self._error(400, str(e))
+        try:
+            info = self.server.jobs.submit(args, kwargs)
+        except QueueFull as e:
+            return self._error(429, str(e), headers={'Retry-After': '10'})
+        return self._send(202, info, headers={'Location': f"/jobs/{info['id']}"})
+
+    def do_DELETE(self):
+        match = _JOB_PATH.match(urlparse(self.path).path)
+        if match is None or match.group('result'):
+            return self._error(404, "ไม่มี endpoint นี้")
+        info = self.server.jobs.cancel(match.group('id'))
+        return self._send(200, info) if info else self._error(404, f"ไม่มีงาน {match.group('id')}")
+
+
+def make_server(host=DEFAULT_HOST, port=DEFAULT_PORT, jobs=None, max_time_limit=DEFAULT_MAX_TIME_LIMIT, quiet=False):
+    """สร้าง HTTP server (ยังไม่เริ่มรับงาน) server.jobs = JobQueue ที่เริ่ม dispatcher แล้ว"""
+    server = ThreadingHTTPServer((host, port), SchedulerRequestHandler)
+    server.daemon_threads = True
+    server.jobs = (jobs or JobQueue()).start()
+    server.max_time_limit = max_time_limit
+    server.quiet = quiet
+    return server
+
+
+def serve(host=DEFAULT_HOST, port=DEFAULT_PORT, cpus=None, workers_per_job=DEFAULT_WORKERS_PER_JOB,
+          queue_size=DEFAULT_QUEUE_SIZE, max_time_limit=DEFAULT_MAX_TIME_LIMIT):
+    """รัน service จนกด Ctrl+C (งานที่ค้างอยู่จะถูกยกเลิก)"""
+    jobs = JobQueue(cpus=cpus, workers_per_job=workers_per_job, queue_size=queue_size)
+    server = make_server(host, port, jobs, max_time_limit)
+    print(f"NurseScheduler service: http://{host}:{port} (รันพร้อมกัน {jobs.max_running} งาน, คิว {queue_size})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        jobs.stop()
+        server.server_close()
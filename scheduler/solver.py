@@ -0,0 +1,1131 @@
+"""Scheduler Engine - สร้างโมเดล CP-SAT และจัดตารางเวร"""
+
+import calendar
+import itertools
+import os
+import queue
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+from ortools.sat.python import cp_model
+
+from .capacity import capacity_errors, check_capacity
+from .sequence import DEFAULT_SEQUENCE_ENCODING, SEQUENCE_ENCODINGS, add_sequence_automaton
+from .thai_calendar import THAI_HOLIDAYS, is_holiday
+from .ward_config import resolve_ward_config
+
+# เพิ่ม NS (บ่าย+ดึก 16 ชม.) เป็น OT shift, OC = On-Call Standby
+SHIFTS = ['S', 'M', 'N', 'O', 'L_T', 'NS', 'OC']
+WORK_SHIFTS = ['S', 'M', 'N', 'L_T', 'NS']  # NS นับเป็นวันทำงาน (OC ไม่นับ)
+# รหัสเวรแบบตัวเลข (int8) ใช้ใน matrix ผลลัพธ์ และข้อความที่แสดงของแต่ละรหัส
+SHIFT_CODES = {s: i for i, s in enumerate(SHIFTS)}
+SHIFT_DISPLAY = np.array(['S', 'M', 'N', '', 'ลา/อบรม', 'NS', '📞OC'], dtype=object)
+
+# ข้อความที่แสดงในตาราง -> รหัสเวร (ใช้อ่านตารางที่จัดไว้แล้วกลับมาเป็นรหัส)
+DISPLAY_TO_SHIFT = {
+    '': 'O', 'O': 'O', 'NCD': 'O',
+    'M': 'M', 'S': 'S', 'N': 'N', 'NS': 'NS',
+    'ลา/อบรม': 'L_T', 'L_T': 'L_T',
+    '📞OC': 'OC', 'OC': 'OC',
+}
+
+# ค่าเริ่มต้นของ CP-SAT (ปรับได้ผ่าน solver_params)
+DEFAULT_SOLVER_PARAMS = {
+    'time_limit': 20.0,      # วินาที (โหมด deterministic ใช้เป็น deterministic time)
+    'num_workers': 0,        # 0 = ใช้ทุก core ของเครื่อง
+    'random_seed': None,     # None = ค่า default ของ CP-SAT
+    'deterministic': False,  # True = ผลลัพธ์เหมือนเดิมทุกครั้งเมื่อ input เหมือนเดิม
+    'subsolvers': None,      # None = portfolio มาตรฐานของ CP-SAT ตามจำนวน worker
+}
+DETERMINISTIC_SEED = 42
+
+# CP-SAT worker ต่องานเมื่อรันหลายงานพร้อมกัน (batch / service)
+# 1 worker = ไม่มี LNS / feasibility jump → เดือนจริงมักหาคำตอบแรกไม่เจอในเวลาที่ให้
+# (ER_KPH 2025-11: 1 worker 60 วินาที = UNKNOWN, 2 worker = FEASIBLE)
+DEFAULT_WORKERS_PER_JOB = 4
+MIN_WORKERS_PER_JOB = 2
+
+
+def configure_solver(solver, solver_params=None):
+    """ตั้งค่า CpSolver ตาม solver_params คืนค่า dict ของค่าที่ใช้จริง
+
+    โหมด deterministic: ใช้ seed คงที่ + interleave_search (ทุก worker
+    สลับกันทำงานเป็นรอบๆ แบบกำหนดลำดับได้) และจำกัดเวลาด้วย deterministic
+    time แทนเวลาจริง ทำให้ input เดิมได้ตารางเดิมเสมอ ไม่ขึ้นกับโหลดของเครื่อง
+    """
+    params = dict(DEFAULT_SOLVER_PARAMS)
+    if solver_params:
+        params.update(solver_params)
+
+    num_workers = int(params['num_workers'] or os.cpu_count() or 1)
+    params['num_workers'] = num_workers
+    solver.parameters.num_workers = num_workers
+
+    if params['subsolvers']:
+        solver.parameters.subsolvers.extend(params['subsolvers'])
+
+    if params['deterministic']:
+        if params['random_seed'] is None:
+            params['random_seed'] = DETERMINISTIC_SEED
+        solver.parameters.interleave_search = True
+        solver.parameters.max_deterministic_time = float(params['time_limit'])
+    else:
+        solver.parameters.max_time_in_seconds = float(params['time_limit'])
+
+    if params['random_seed'] is not None:
+        solver.parameters.random_seed = int(params['random_seed'])
+
+    return params
+
+
+def add_spread_limit(model, values, max_spread, upper_bound, name, enforce=None):
+    """บังคับให้ทุกค่าใน values ต่างกันไม่เกิน max_spread
+
+    ใช้ตัวแปรต่ำสุด/สูงสุดของกลุ่มแทนการเทียบทีละคู่ จำนวน constraint จึงโตแบบ
+    O(n) ตามจำนวนพยาบาล แทน O(n²)
+    enforce = BoolVar (ถ้ามี) → บังคับเฉพาะเมื่อ enforce เป็นจริง
+    """
+    values = list(values)
+    if len(values) < 2:
+        return
+    group_min = model.NewIntVar(0, upper_bound, f'{name}_min')
+    group_max = model.NewIntVar(0, upper_bound, f'{name}_max')
+    for v in values:
+        model.Add(v >= group_min)
+        model.Add(v <= group_max)
+    spread = model.Add(group_max - group_min <= max_spread)
+    if enforce is not None:
+        spread.OnlyEnforceIf(enforce)
+
+
+class ShiftVars(dict):
+    """BoolVar ของเวร {(nurse, day, shift): BoolVar} เฉพาะช่องที่เป็นไปได้ (ดู shift_domains)
+
+    ช่องที่ถูกตัดออกอ่านได้เป็นค่าคงที่ 0 → กฎเดิมที่รวม/เทียบ shifts_var ใช้ได้เหมือนเดิม
+    เช็คว่าช่องมีตัวแปรจริงหรือไม่ด้วย (n, d, s) in shifts_var
+    """
+
+    def __missing__(self, key):
+        return 0
+
+
+def shift_domains(year, month, days_in_month, nurses, requests, enable_oc=True, ward_config=None, guarded=False):
+    """เวรที่เป็นไปได้ของแต่ละช่อง {(nurse, day): [shift, ...]} (เรียงตาม SHIFTS) ก่อนสร้างโมเดล
+
+    ตัดเสมอ: OC เมื่อปิด OC / หลังวันที่ oc_last_day, L_T ในวันที่ไม่มีคำขอลา
+    guarded=False (ไม่ได้หาสาเหตุจัดไม่ได้) ตัดเพิ่ม: OC ของ oc.hard_ban, NS ของ ns_excluded,
+    วันที่มีเวรประจำ/ลา เหลือเฉพาะเวรนั้น (กฎ Hard ยังอยู่ในโมเดล ถ้าขัดกันเองก็ยังจัดไม่ได้เหมือนเดิม)
+    guarded=True คงช่องเหล่านี้ไว้ เพื่อให้ explain_infeasibility ปิดกฎทีละกลุ่มได้
+    """
+    ward = resolve_ward_config(ward_config)
+    leave_days = set()
+    for req in requests:
+        if req.get('month', month) == month and req.get('year', year) == year \
+                and req['nurse'] in nurses and req['type'] == 'Leave_Train':
+            leave_days.add((req['nurse'], req['date']))
+
+    domains = {}
+    for d in range(1, days_in_month + 1):
+        wd = calendar.weekday(year, month, d)
+        is_hol = is_holiday(year, month, d)
+        for n in nurses:
+            removed = set()
+            if not enable_oc or d > ward.oc_last_day:
+                removed.add('OC')
+            if (n, d) not in leave_days:
+                removed.add('L_T')
+            forced = set()
+            if not guarded:
+                if n in ward.oc_hard_ban:
+                    removed.add('OC')
+                if n in ward.ns_excluded:
+                    removed.add('NS')
+                pattern = ward.pattern_shift(n, wd, is_hol)
+                if pattern is not None:
+                    forced.add(pattern)
+                if (n, d) in leave_days:
+                    forced.add('L_T')
+            domains[(n, d)] = [s for s in SHIFTS if s not in removed and (not forced or s in forced)]
+    return domains
+
+
+def build_schedule_model(year, month, days_in_month, nurses, requests, fix_requests=None, staffing_overrides=None, enable_oc=True, prev_month_data=None, guards=None, profile=None, ward_config=None, sequence_encoding=None, next_month_data=None):
+    """สร้างโมเดล CP-SAT ของทั้งเดือน คืนค่า (model, shifts_var, objective)
+
+    shifts_var[(nurse, day, shift)] = BoolVar ของเวรนั้น (ShiftVars: ช่องที่เป็นไปไม่ได้ไม่มีตัวแปร อ่านได้เป็น 0)
+    objective = นิพจน์คะแนนที่ Maximize อยู่ (ต่อเติมแล้วเรียก model.Maximize ใหม่ได้)
+    guards = RuleGuards (ถ้ามี) → กฎ Hard แต่ละกลุ่มผูกกับ literal ของตัวเอง (ใช้ใน explain_infeasibility)
+    profile = BuildProfile (ถ้ามี) → บันทึกเวลา/จำนวนตัวแปร/constraint ของกฎแต่ละส่วน
+    ward_config = WardConfig หรือชื่อวอร์ด (None = วอร์ดหลัก) → กฎรายบุคคล/น้ำหนักของ objective
+    sequence_encoding = 'linear' (constraint รายคู่/รายสามวัน) หรือ 'automaton' (ตารางการเปลี่ยนเวร ดู sequence.py)
+                        None = DEFAULT_SEQUENCE_ENCODING, ส่ง guards มา → 'linear' เสมอ (ต้องแยกกฎทีละกลุ่ม)
+    next_month_data = {nurse: [เวรวันที่ 1, 2, ...]} ของเดือนถัดไปที่จัดไว้แล้ว (ถ้ามี) → กฎข้ามเดือนชุดเดียวกับ
+                      prev_month_data แต่บังคับที่ท้ายเดือนนี้ (ใช้ตอนปรับรอยต่อเดือนใน horizon.py)
+    """
+    ward = resolve_ward_config(ward_config)
+    weights = ward.weights
+    sequence_encoding = sequence_encoding or DEFAULT_SEQUENCE_ENCODING
+    if sequence_encoding not in SEQUENCE_ENCODINGS:
+        raise ValueError(f"sequence_encoding ต้องเป็นหนึ่งใน {SEQUENCE_ENCODINGS}")
+    use_automaton = sequence_encoding == 'automaton' and guards is None
+    if fix_requests is None:
+        fix_requests = []
+    if staffing_overrides is None:
+        staffing_overrides = []
+    
+    model = cp_model.CpModel()
+    
+    shifts = SHIFTS
+    work_shifts = WORK_SHIFTS
+
+    def hard(key, ct):
+        """Hard constraint ที่ explain_infeasibility เปิด/ปิดเป็นกลุ่มได้ (ผ่าน assumption literal)"""
+        if guards is not None:
+            ct.OnlyEnforceIf(guards.literal(model, key))
+        return ct
+
+    def section(name):
+        """ขึ้นส่วนใหม่ของโมเดล (นับขนาดแยกส่วนเมื่อส่ง profile มา)"""
+        if profile is not None:
+            profile.start(model, name)
+    
+    # กลุ่มพยาบาลสำหรับเวร OC (On-Call วันที่ 1 ถึง oc_last_day) ตามค่ากฎของวอร์ด
+    oc_last_day = ward.oc_last_day
+    oc_hard_ban = [n for n in ward.oc_hard_ban if n in nurses]      # Hard: ห้ามเด็ดขาด
+    oc_soft_avoid = [n for n in ward.oc_soft_avoid if n in nurses]  # Soft: ขอเลี่ยง (จัดให้คนอื่นก่อน)
+
+    section('variables')
+    # สร้าง BoolVar เฉพาะเวรที่เป็นไปได้ (ช่องที่ถูกตัดอ่านได้เป็น 0)
+    domains = shift_domains(year, month, days_in_month, nurses, requests, enable_oc, ward, guarded=guards is not None)
+    shifts_var = ShiftVars()
+    for n in nurses:
+        for d in range(1, days_in_month + 1):
+            for s in domains[(n, d)]:
+                shifts_var[(n, d, s)] = model.NewBoolVar(f'shift_{n}_{d}_{s}')
+
+    def live(*keys):
+        """ทุกช่องใน keys มีตัวแปร (ถ้ามีช่องที่ถูกตัด กฎคู่/สามวันนั้นเป็นจริงเสมอ ไม่ต้องสร้าง)"""
+        return all(key in shifts_var for key in keys)
+
+    section('cross_month')
+    # ==========================================
+    # 0. Cross-Month Constraints (ข้อมูลจากเดือนก่อน)
+    # ==========================================
+    if prev_month_data:
+        for n in nurses:
+            if n in prev_month_data and len(prev_month_data[n]) >= 1:
+                last_shift = prev_month_data[n][-1]  # เวรวันสุดท้ายของเดือนก่อน
+                
+                # ห้าม N/NS → M ข้ามเดือน (ทำดึกเดือนก่อน → ห้ามเช้าวันที่ 1)
+                if last_shift in ['N', 'NS']:
+                    hard(('cross_month', n), model.Add(shifts_var[(n, 1, 'M')] == 0))
+                
+                # ห้าม S → N/NS ข้ามเดือน (ทำบ่ายเดือนก่อน → ห้ามดึกวันที่ 1)
+                if last_shift == 'S':
+                    hard(('cross_month', n), model.Add(shifts_var[(n, 1, 'N')] == 0))
+                    hard(('cross_month', n), model.Add(shifts_var[(n, 1, 'NS')] == 0))
+                
+                # ห้าม Off → N/NS ข้ามเดือน
+                if last_shift == 'O':
+                    hard(('cross_month', n), model.Add(shifts_var[(n, 1, 'N')] == 0))
+                    hard(('cross_month', n), model.Add(shifts_var[(n, 1, 'NS')] == 0))
+                    hard(('cross_month', n), model.Add(shifts_var[(n, 1, 'OC')] == 0))
+            
+            # นับวันทำงานต่อเนื่องข้ามเดือน (กฎ 7 วันใน 8 วัน)
+            if n in prev_month_data and len(prev_month_data[n]) >= 7:
+                # นับจำนวนวันทำงานติดกันจากท้ายเดือนก่อน
+                consecutive_work = 0
+                for s in reversed(prev_month_data[n]):
+                    if s in ['S', 'M', 'N', 'L_T', 'NS']:
+                        consecutive_work += 1
+                    else:
+                        break  # หยุดนับเมื่อเจอวันหยุด
+                
+                # ถ้าทำงานติดกัน X วันท้ายเดือนก่อน → วันแรกๆ ของเดือนใหม่ต้องหยุด
+                if consecutive_work >= 7:
+                    # ทำงาน 7 วันติด → วันที่ 1 ต้องหยุด (Hard)
+                    for work_s in ['S', 'M', 'N', 'NS']:
+                        hard(('cross_month', n), model.Add(shifts_var[(n, 1, work_s)] == 0))
+                elif consecutive_work >= 6:
+                    # ทำงาน 6 วันติด → วันที่ 1-2 ต้องมีหยุดอย่างน้อย 1 วัน
+                    hard(('cross_month', n), model.Add(
+                        shifts_var[(n, 1, 'O')] + shifts_var[(n, 2, 'O')] >= 1
+                    ))
+                elif consecutive_work >= 5:
+                    # ทำงาน 5 วันติด → วันที่ 1-3 ต้องมีหยุดอย่างน้อย 1 วัน  
+                    hard(('cross_month', n), model.Add(
+                        shifts_var[(n, 1, 'O')] + shifts_var[(n, 2, 'O')] + shifts_var[(n, 3, 'O')] >= 1
+                    ))
+
+    # ==========================================
+    # 0.1 Cross-Month Constraints (ข้อมูลต้นเดือนถัดไป) = กฎข้อ 0 มองจากท้ายเดือนนี้
+    # ==========================================
+    if next_month_data:
+        last = days_in_month
+
+        def work_on(n, d):
+            return sum(shifts_var[(n, d, s)] for s in ['S', 'M', 'N', 'L_T', 'NS'])
+
+        for n in nurses:
+            if n in next_month_data and len(next_month_data[n]) >= 1:
+                first_shift = next_month_data[n][0]  # เวรวันที่ 1 ของเดือนถัดไป
+
+                # N/NS → M: เดือนหน้าเริ่มด้วยเช้า → ห้ามดึกวันสุดท้าย
+                if first_shift == 'M':
+                    hard(('cross_month', n), model.Add(shifts_var[(n, last, 'N')] == 0))
+                    hard(('cross_month', n), model.Add(shifts_var[(n, last, 'NS')] == 0))
+
+                # S → N/NS, O → N/NS: เดือนหน้าเริ่มด้วยดึก → ห้ามบ่าย/หยุดวันสุดท้าย
+                if first_shift in ['N', 'NS']:
+                    hard(('cross_month', n), model.Add(shifts_var[(n, last, 'S')] == 0))
+                    hard(('cross_month', n), model.Add(shifts_var[(n, last, 'O')] == 0))
+
+                # O → OC
+                if first_shift == 'OC':
+                    hard(('cross_month', n), model.Add(shifts_var[(n, last, 'O')] == 0))
+
+            if n in next_month_data and len(next_month_data[n]) >= 7 and days_in_month >= 8:
+                next_shifts = next_month_data[n]
+                # ทำงานติดกัน 7 / 6 / 5 วันท้ายเดือนนี้ (นับเฉพาะช่วงที่ติดกันพอดี) → ต้นเดือนหน้าต้องมีหยุดตามกฎข้อ 0
+                if next_shifts[0] in ['S', 'M', 'N', 'NS']:
+                    hard(('cross_month', n), model.Add(sum(work_on(n, last - k) for k in range(7)) <= 6))
+                if 'O' not in next_shifts[:2]:
+                    hard(('cross_month', n), model.Add(
+                        sum(work_on(n, last - k) for k in range(6)) - work_on(n, last - 6) <= 5
+                    ))
+                if 'O' not in next_shifts[:3]:
+                    hard(('cross_month', n), model.Add(
+                        sum(work_on(n, last - k) for k in range(5)) - work_on(n, last - 5) <= 4
+                    ))
+
+            # 7 วันใน 8 วัน: ช่วง 8 วันที่คร่อมไปต้นเดือนหน้า j วัน
+            if n in next_month_data:
+                next_shifts = next_month_data[n]
+                for j in range(1, min(8, days_in_month + 1)):
+                    if j <= len(next_shifts):
+                        next_work_count = sum(1 for s in next_shifts[:j] if s in ['S', 'M', 'N', 'L_T', 'NS'])
+                        hard(('cross_month', n), model.Add(
+                            sum(work_on(n, last - k) for k in range(8 - j)) <= max(0, 7 - next_work_count)
+                        ))
+
+    section('staffing')
+    # ==========================================
+    # 1. กฎพื้นฐานและกำลังคน (Hard Constraints)
+    # ==========================================
+    for d in range(1, days_in_month + 1):
+        weekday = calendar.weekday(year, month, d)
+        is_weekend = weekday >= 5 
+
+        # สถานะเดียวต่อวัน
+        for n in nurses:
+            model.Add(sum(shifts_var[(n, d, s)] for s in shifts) == 1)
+
+        # กำลังคน (NS นับเป็นทั้ง S และ N)
+        # วันหยุดนักขัตฤกษ์ ต้องการคนเท่าวันเสาร์-อาทิตย์ (M=4)
+        is_special_day = is_weekend or is_holiday(year, month, d)
+        
+        # ค่า Default ของวอร์ด (เช่น N+NS >= 1, S+NS >= 2)
+        n_req = ward.staffing['N']
+        s_req = ward.staffing['S']
+        
+        # ตรวจสอบ Override จาก staffing_overrides
+        for override in staffing_overrides:
+            if override.get('month') == month and override.get('year') == year:
+                if override.get('start', 1) <= d <= override.get('end', days_in_month):
+                    if override.get('shift') == 'N':
+                        n_req = override.get('count', ward.staffing['N'])
+                    elif override.get('shift') == 'S':
+                        s_req = override.get('count', ward.staffing['S'])
+        
+        # N + NS >= n_req (RELAXED - อย่างน้อย n_req คน)
+        hard(('staffing', d), model.Add(sum(shifts_var[(n, d, 'N')] + shifts_var[(n, d, 'NS')] for n in nurses) >= n_req))
+        # S + NS >= s_req (RELAXED - อย่างน้อย s_req คน)
+        hard(('staffing', d), model.Add(sum(shifts_var[(n, d, 'S')] + shifts_var[(n, d, 'NS')] for n in nurses) >= s_req))
+        req_m = ward.staffing['M_special'] if is_special_day else ward.staffing['M']  # ส-อา/นักขัตฤกษ์ ใช้ M_special
+        hard(('staffing', d), model.Add(sum(shifts_var[(n, d, 'M')] for n in nurses) >= req_m))  # RELAXED
+
+    # ค่าปรับของกฎลำดับเวร (แบบ automaton รวมทุกกฎไว้ใน sequence_penalty ที่คูณน้ำหนักแล้ว)
+    s_n_penalty, s_m_n_penalty, n_consecutive_penalty = [], [], []
+    o_before_n_penalty, n_skip_day_penalty, sequence_penalty = [], [], []
+    if use_automaton:
+        section('sequence')
+        # S↔N, S-M-N, ดึกติดกัน/สลับวัน, O→N, S-O-N, S-S-N, หลัง NS, OC→M ในตารางเดียวต่อวัน
+        sequence_penalty = add_sequence_automaton(
+            model, shifts_var, shifts, nurses, days_in_month, weights, enable_oc, oc_last_day,
+            [n for n in nurses if n not in ward.ns_excluded]
+        )
+    else:
+        section('sn_transitions')
+        # กฎการสลับเวร - SOFT (ควรหลีกเลี่ยง แต่ยอมได้ถ้าจำเป็น)
+        for n in nurses:
+            for d in range(1, days_in_month):
+                # S -> N (บ่ายตามด้วยดึก) - SOFT
+                if live((n, d, 'S'), (n, d + 1, 'N')):
+                    pen_sn = model.NewBoolVar(f'sn_pen_{n}_{d}')
+                    model.Add(shifts_var[(n, d, 'S')] + shifts_var[(n, d + 1, 'N')] <= 1 + pen_sn)
+                    s_n_penalty.append(pen_sn)
+            
+                if live((n, d, 'S'), (n, d + 1, 'NS')):
+                    pen_sns = model.NewBoolVar(f'sns_pen_{n}_{d}')
+                    model.Add(shifts_var[(n, d, 'S')] + shifts_var[(n, d + 1, 'NS')] <= 1 + pen_sns)
+                    s_n_penalty.append(pen_sns)
+            
+                # N -> S (ดึกตามด้วยบ่าย) - SOFT
+                if live((n, d, 'N'), (n, d + 1, 'S')):
+                    pen_ns = model.NewBoolVar(f'ns_pen_{n}_{d}')
+                    model.Add(shifts_var[(n, d, 'N')] + shifts_var[(n, d + 1, 'S')] <= 1 + pen_ns)
+                    s_n_penalty.append(pen_ns)
+            
+                if live((n, d, 'NS'), (n, d + 1, 'S')):
+                    pen_nss = model.NewBoolVar(f'nss_pen_{n}_{d}')
+                    model.Add(shifts_var[(n, d, 'NS')] + shifts_var[(n, d + 1, 'S')] <= 1 + pen_nss)
+                    s_n_penalty.append(pen_nss)
+    
+        section('s_m_n')
+        # ห้าม S -> M -> N (บ่าย -> เช้า -> ดึก ใน 3 วันติด)
+        # เหตุผล: พัก 8hr-8hr เหนื่อยมาก
+        # แต่ช่วง OC อนุโลม เพราะ OC แค่ standby ไม่ได้ทำงานจริง (S→M→OC→N ได้)
+        for n in nurses:
+            for d in range(1, days_in_month - 1):
+                is_oc_period = enable_oc and d <= oc_last_day
+            
+                if is_oc_period:
+                    # SOFT during OC period - allow but penalize
+                    if live((n, d, 'S'), (n, d + 1, 'M'), (n, d + 2, 'N')):
+                        pen1 = model.NewBoolVar(f'smn_pen_{n}_{d}')
+                        model.Add(shifts_var[(n, d, 'S')] + shifts_var[(n, d + 1, 'M')] + shifts_var[(n, d + 2, 'N')] <= 2 + pen1)
+                        s_m_n_penalty.append(pen1)
+                
+                    if live((n, d, 'S'), (n, d + 1, 'M'), (n, d + 2, 'NS')):
+                        pen2 = model.NewBoolVar(f'smns_pen_{n}_{d}')
+                        model.Add(shifts_var[(n, d, 'S')] + shifts_var[(n, d + 1, 'M')] + shifts_var[(n, d + 2, 'NS')] <= 2 + pen2)
+                        s_m_n_penalty.append(pen2)
+                else:
+                    # HARD for non-OC period
+                    if live((n, d, 'S'), (n, d + 1, 'M'), (n, d + 2, 'N')):
+                        hard(('rule', 'S-M-N'), model.Add(shifts_var[(n, d, 'S')] + shifts_var[(n, d + 1, 'M')] + shifts_var[(n, d + 2, 'N')] <= 2))
+                    if live((n, d, 'S'), (n, d + 1, 'M'), (n, d + 2, 'NS')):
+                        hard(('rule', 'S-M-N'), model.Add(shifts_var[(n, d, 'S')] + shifts_var[(n, d + 1, 'M')] + shifts_var[(n, d + 2, 'NS')] <= 2))
+
+        section('night')
+        # ==========================================
+        # กฎเวรดึก (N) เดี่ยว - ต้องทำงานก่อนดึก และหยุดหลังดึก
+        # ==========================================
+        # o_before_n_penalty: Soft O → N ควรหลีกเลี่ยง, n_skip_day_penalty: Soft N-O-N ควรหลีกเลี่ยง
+    
+        # n_consecutive_penalty: Soft N→N ในช่วง OC
+    
+        for n in nurses:
+            # 1. ห้าม N-N, NS-NS, N-NS, NS-N (ดึกติดกัน)
+            # - ช่วง OC (วันที่ 1 ถึง oc_last_day): SOFT (ยอมได้ถ้าจำเป็น แต่หักคะแนน)
+            # - ช่วงอื่น: HARD (ห้ามเด็ดขาด)
+            for d in range(1, days_in_month):
+                is_oc_period = enable_oc and d <= oc_last_day
+            
+                if is_oc_period:
+                    # SOFT constraint during OC period - allow but penalize
+                    if live((n, d, 'N'), (n, d + 1, 'N')):
+                        pen_nn = model.NewBoolVar(f'nn_pen_{n}_{d}')
+                        model.Add(shifts_var[(n, d, 'N')] + shifts_var[(n, d + 1, 'N')] <= 1 + pen_nn)
+                        n_consecutive_penalty.append(pen_nn)
+                
+                    if live((n, d, 'NS'), (n, d + 1, 'NS')):
+                        pen_nsns = model.NewBoolVar(f'nsns_pen_{n}_{d}')
+                        model.Add(shifts_var[(n, d, 'NS')] + shifts_var[(n, d + 1, 'NS')] <= 1 + pen_nsns)
+                        n_consecutive_penalty.append(pen_nsns)
+                
+                    if live((n, d, 'N'), (n, d + 1, 'NS')):
+                        pen_nns = model.NewBoolVar(f'nns_pen_{n}_{d}')
+                        model.Add(shifts_var[(n, d, 'N')] + shifts_var[(n, d + 1, 'NS')] <= 1 + pen_nns)
+                        n_consecutive_penalty.append(pen_nns)
+                
+                    if live((n, d, 'NS'), (n, d + 1, 'N')):
+                        pen_nsn = model.NewBoolVar(f'nsn_pen_{n}_{d}')
+                        model.Add(shifts_var[(n, d, 'NS')] + shifts_var[(n, d + 1, 'N')] <= 1 + pen_nsn)
+                        n_consecutive_penalty.append(pen_nsn)
+                else:
+                    # HARD constraint for non-OC period
+                    if live((n, d, 'N'), (n, d + 1, 'N')):
+                        hard(('rule', 'N-N'), model.Add(shifts_var[(n, d, 'N')] + shifts_var[(n, d + 1, 'N')] <= 1))
+                    if live((n, d, 'NS'), (n, d + 1, 'NS')):
+                        hard(('rule', 'N-N'), model.Add(shifts_var[(n, d, 'NS')] + shifts_var[(n, d + 1, 'NS')] <= 1))
+                    if live((n, d, 'N'), (n, d + 1, 'NS')):
+                        hard(('rule', 'N-N'), model.Add(shifts_var[(n, d, 'N')] + shifts_var[(n, d + 1, 'NS')] <= 1))
+                    if live((n, d, 'NS'), (n, d + 1, 'N')):
+                        hard(('rule', 'N-N'), model.Add(shifts_var[(n, d, 'NS')] + shifts_var[(n, d + 1, 'N')] <= 1))
+        
+            # 2. O-N, O-NS (ควรทำงานก่อนดึก) - SOFT (ลดจุด แต่ยอมได้ถ้าจำเป็น)
+            for d in range(1, days_in_month):
+                # สร้างตัวแปร penalty แทน hard constraint
+                if live((n, d, 'O'), (n, d + 1, 'N')):
+                    penalty_on = model.NewBoolVar(f'o_n_penalty_{n}_{d}')
+                    model.Add(shifts_var[(n, d, 'O')] + shifts_var[(n, d + 1, 'N')] <= 1 + penalty_on)
+                    o_before_n_penalty.append(penalty_on)
+            
+                if live((n, d, 'O'), (n, d + 1, 'NS')):
+                    penalty_ons = model.NewBoolVar(f'o_ns_penalty_{n}_{d}')
+                    model.Add(shifts_var[(n, d, 'O')] + shifts_var[(n, d + 1, 'NS')] <= 1 + penalty_ons)
+                    o_before_n_penalty.append(penalty_ons)
+        
+            # 3. N-O-N, NS-O-NS (ควรหลีกเลี่ยงดึกสลับวัน) - SOFT
+            for d in range(1, days_in_month - 1):
+                if live((n, d, 'N'), (n, d + 2, 'N')):
+                    pen1 = model.NewBoolVar(f'non_pen_{n}_{d}')
+                    model.Add(shifts_var[(n, d, 'N')] + shifts_var[(n, d + 2, 'N')] <= 1 + pen1)
+                    n_skip_day_penalty.append(pen1)
+            
+                if live((n, d, 'NS'), (n, d + 2, 'NS')):
+                    pen2 = model.NewBoolVar(f'nson_pen_{n}_{d}')
+                    model.Add(shifts_var[(n, d, 'NS')] + shifts_var[(n, d + 2, 'NS')] <= 1 + pen2)
+                    n_skip_day_penalty.append(pen2)
+            
+                if live((n, d, 'N'), (n, d + 2, 'NS')):
+                    pen3 = model.NewBoolVar(f'n_ns_pen_{n}_{d}')
+                    model.Add(shifts_var[(n, d, 'N')] + shifts_var[(n, d + 2, 'NS')] <= 1 + pen3)
+                    n_skip_day_penalty.append(pen3)
+            
+                if live((n, d, 'NS'), (n, d + 2, 'N')):
+                    pen4 = model.NewBoolVar(f'ns_n_pen_{n}_{d}')
+                    model.Add(shifts_var[(n, d, 'NS')] + shifts_var[(n, d + 2, 'N')] <= 1 + pen4)
+                    n_skip_day_penalty.append(pen4)
+        
+            # 4. S-O-N, NS-O-N (ห้ามเย็น-Off-ดึก และ ดึกพิเศษ-Off-ดึก) - HARD
+            # เหตุผล: พักไม่พอ ทำเย็นแล้วหยุด 1 วัน แล้วมาดึก = เหนื่อยมาก
+            for d in range(1, days_in_month - 1):
+                # S-O-N: ห้ามทำ S วันที่ d แล้ว Off d+1 แล้ว N วันที่ d+2
+                if live((n, d, 'S'), (n, d + 1, 'O'), (n, d + 2, 'N')):
+                    hard(('rule', 'S-O-N'), model.Add(shifts_var[(n, d, 'S')] + shifts_var[(n, d + 1, 'O')] + shifts_var[(n, d + 2, 'N')] <= 2))
+                # S-O-NS: ห้ามทำ S วันที่ d แล้ว Off d+1 แล้ว NS วันที่ d+2
+                if live((n, d, 'S'), (n, d + 1, 'O'), (n, d + 2, 'NS')):
+                    hard(('rule', 'S-O-N'), model.Add(shifts_var[(n, d, 'S')] + shifts_var[(n, d + 1, 'O')] + shifts_var[(n, d + 2, 'NS')] <= 2))
+                # NS-O-N: ห้ามทำ NS วันที่ d แล้ว Off d+1 แล้ว N วันที่ d+2
+                if live((n, d, 'NS'), (n, d + 1, 'O'), (n, d + 2, 'N')):
+                    hard(('rule', 'S-O-N'), model.Add(shifts_var[(n, d, 'NS')] + shifts_var[(n, d + 1, 'O')] + shifts_var[(n, d + 2, 'N')] <= 2))
+                # NS-O-NS: ห้ามทำ NS วันที่ d แล้ว Off d+1 แล้ว NS วันที่ d+2
+                if live((n, d, 'NS'), (n, d + 1, 'O'), (n, d + 2, 'NS')):
+                    hard(('rule', 'S-O-N'), model.Add(shifts_var[(n, d, 'NS')] + shifts_var[(n, d + 1, 'O')] + shifts_var[(n, d + 2, 'NS')] <= 2))
+        
+            # 5. S-S-N, S-S-NS (ห้ามเย็น-เย็น-ดึก) - HARD
+            # เหตุผล: ทำบ่าย 2 วันติด แล้วมาดึก = ไม่เหมาะสม
+            for d in range(1, days_in_month - 1):
+                # S-S-N: ห้ามทำ S วันที่ d แล้ว S วันที่ d+1 แล้ว N วันที่ d+2
+                if live((n, d, 'S'), (n, d + 1, 'S'), (n, d + 2, 'N')):
+                    hard(('rule', 'S-S-N'), model.Add(shifts_var[(n, d, 'S')] + shifts_var[(n, d + 1, 'S')] + shifts_var[(n, d + 2, 'N')] <= 2))
+                # S-S-NS: ห้ามทำ S วันที่ d แล้ว S วันที่ d+1 แล้ว NS วันที่ d+2
+                if live((n, d, 'S'), (n, d + 1, 'S'), (n, d + 2, 'NS')):
+                    hard(('rule', 'S-S-N'), model.Add(shifts_var[(n, d, 'S')] + shifts_var[(n, d + 1, 'S')] + shifts_var[(n, d + 2, 'NS')] <= 2))
+
+    section('ns')
+    # ==========================================
+    # กฎเวร NS (บ่าย+ดึก 16 ชม.) - OT Shift (ลดความซับซ้อน)
+    # ==========================================
+    nurses_for_ns = [n for n in nurses if n not in ward.ns_excluded]  # ยกเว้นคนที่ห้ามทำ NS
+    
+    for n in nurses_for_ns:
+        # NS ต้องห่างกันอย่างน้อย 4 วัน (ง่ายขึ้น)
+        for d in range(1, days_in_month - 3):
+            hard(('rule', 'NS-spacing'), model.Add(shifts_var[(n, d, 'NS')] + shifts_var[(n, d + 1, 'NS')] + 
+                                                   shifts_var[(n, d + 2, 'NS')] + shifts_var[(n, d + 3, 'NS')] + 
+                                                   shifts_var[(n, d + 4, 'NS')] <= 1))
+        
+        if not use_automaton:
+            # หลัง NS ควร Off วันถัดไป (1 วัน) - SOFT (ควรหลีกเลี่ยง แต่ยอมได้)
+            for d in range(1, days_in_month):
+                # NS วันที่ d → วันที่ d+1 ควรหยุด (SOFT)
+                for work_s in ['S', 'M', 'N', 'NS']:
+                    if live((n, d, 'NS'), (n, d + 1, work_s)):
+                        pen_ns_work = model.NewBoolVar(f'ns_work_pen_{n}_{d}_{work_s}')
+                        model.Add(shifts_var[(n, d, 'NS')] + shifts_var[(n, d + 1, work_s)] <= 1 + pen_ns_work)
+                        o_before_n_penalty.append(pen_ns_work)  # reuse penalty list
+    
+    # ns_excluded ห้ามทำ NS
+    for n in ward.ns_excluded:
+        if n in nurses:
+            for d in range(1, days_in_month + 1):
+                if (n, d, 'NS') in shifts_var:  # ตัดออกแล้วตอนสร้างตัวแปร ยกเว้นตอนหาสาเหตุจัดไม่ได้
+                    hard(('nurse_rule', n, 'no_NS'), model.Add(shifts_var[(n, d, 'NS')] == 0))
+
+    section('7_in_8')
+    # ทำงานต่อเนื่องสูงสุด 7 วัน ใน 8 วัน (รวม NS + ข้ามเดือน)
+    for n in nurses:
+        # กรณีปกติ: ใช้เฉพาะข้อมูลเดือนนี้
+        for d in range(1, days_in_month - 6):
+            hard(('rule', '7-in-8'), model.Add(sum(sum(shifts_var[(n, d + k, s)] for s in work_shifts) for k in range(8)) <= 7))
+        
+        # กรณีข้ามเดือน: วันที่ 1-7 ต้องรวมข้อมูลจากเดือนก่อน
+        if prev_month_data and n in prev_month_data:
+            prev_shifts = prev_month_data[n]  # 7 วันสุดท้ายของเดือนก่อน
+            
+            for d in range(1, min(8, days_in_month + 1)):
+                days_from_prev = max(0, 8 - d)  # จำนวนวันที่ต้องดูจากเดือนก่อน
+                
+                if days_from_prev > 0 and days_from_prev <= len(prev_shifts):
+                    # นับวันทำงานจากเดือนก่อน
+                    prev_work_count = sum(
+                        1 for s in prev_shifts[-days_from_prev:] 
+                        if s in ['S', 'M', 'N', 'L_T', 'NS']
+                    )
+                    
+                    # จำกัดวันทำงานเดือนนี้ให้ไม่เกิน 7 - prev_work_count
+                    max_curr_work = max(0, 7 - prev_work_count)
+                    hard(('cross_month', n), model.Add(
+                        sum(sum(shifts_var[(n, k, s)] for s in work_shifts) 
+                            for k in range(1, d + 1)) <= max_curr_work
+                    ))
+    
+    # ป้องกัน NS หลังทำงานติด 6 วัน (เพราะ NS = 2 เวร จะทำให้เกิน 7 เวร)
+    for n in nurses_for_ns:
+        for d in range(7, days_in_month + 1):
+            # ถ้า 6 วันก่อนหน้าทำงานทั้งหมด แล้ววันนี้เป็น NS = 8 เวร (เกิน!)
+            # ดังนั้น ถ้าจะทำ NS ต้องมี Off อย่างน้อย 1 วันใน 6 วันก่อนหน้า
+            prev_work = sum(sum(shifts_var[(n, d - k, s)] for s in ['S', 'M', 'N', 'NS']) for k in range(1, 7))
+            # ถ้าทำงาน 6 วันก่อนหน้า (prev_work=6) แล้ว NS ห้าม
+            hard(('rule', 'NS-after-6'), model.Add(prev_work + shifts_var[(n, d, 'NS')] <= 6))
+
+    section('oc')
+    # ==========================================
+    # กฎเวร OC (On-Call Standby) - เฉพาะวันที่ 1 ถึง oc_last_day (ER_KPH = 1-10)
+    # ==========================================
+    oc_avoid_penalty = []  # สำหรับ Soft Constraint oc_soft_avoid
+    
+    if enable_oc:
+        # ช่วง OC ต้องมี OC อย่างน้อย 1 คน
+        for d in range(1, min(oc_last_day + 1, days_in_month + 1)):
+            hard(('oc_coverage', d), model.Add(sum(shifts_var[(n, d, 'OC')] for n in nurses) >= 1))
+        
+        # หลังช่วง OC ห้ามมี OC (ไม่มีตัวแปร OC หลัง oc_last_day อยู่แล้ว ดู shift_domains)
+        
+        # oc_hard_ban ห้ามทำ OC เด็ดขาด (Hard Constraint)
+        for d in range(1, days_in_month + 1):
+            for n in oc_hard_ban:
+                if (n, d, 'OC') in shifts_var:  # ตัดออกแล้วตอนสร้างตัวแปร ยกเว้นตอนหาสาเหตุจัดไม่ได้
+                    hard(('nurse_rule', n, 'no_OC'), model.Add(shifts_var[(n, d, 'OC')] == 0))
+        
+        # กฎ OC - OC ต้องห่างกันอย่างน้อย 3 วัน (เฉพาะคนที่มีตัวแปร OC วันใดวันหนึ่งในช่วง OC
+        # วันที่ 1 อาจถูกตัดเพราะลา/เวรประจำ แต่วันอื่นยังต้องใช้กฎเหมือนเดิม)
+        oc_days = range(1, min(oc_last_day, days_in_month) + 1)
+        oc_nurses = [n for n in nurses if any((n, d, 'OC') in shifts_var for d in oc_days)]
+        for n in oc_nurses: # RE-ENABLED Partial
+            if not use_automaton:  # OC→OC, OC→M อยู่ในตาราง automaton แล้ว
+                for d in range(1, min(oc_last_day, days_in_month)):
+                #     # ห้าม OC ติดกัน (OC-OC)
+                    if live((n, d, 'OC'), (n, d + 1, 'OC')):
+                        hard(('rule', 'OC-spacing'), model.Add(shifts_var[(n, d, 'OC')] + shifts_var[(n, d + 1, 'OC')] <= 1))
+                    # ห้าม OC แล้วเช้า (OC-M)
+                    if live((n, d, 'OC'), (n, d + 1, 'M')):
+                        hard(('rule', 'OC-M'), model.Add(shifts_var[(n, d, 'OC')] + shifts_var[(n, d + 1, 'M')] <= 1))
+                    # ห้าม Off แล้ว OC (O-OC) -- RELAXED
+                    # model.Add(shifts_var[(n, d, 'O')] + shifts_var[(n, d + 1, 'OC')] <= 1)
+            
+            # OC ต้องห่างกันอย่างน้อย 3 วัน (ในช่วง OC)
+            # แก้ไข: Loop ถึงแค่วันที่ d+3 ยังอยู่ในเดือน
+            for d in range(1, min(oc_last_day - 2, days_in_month - 3 + 1)):
+                window = [shifts_var[(n, d + k, 'OC')] for k in range(4) if (n, d + k, 'OC') in shifts_var]
+                if len(window) >= 2:  # เหลือช่องเดียว = เป็นจริงเสมอ
+                    hard(('rule', 'OC-spacing'), model.Add(sum(window) <= 1))
+        
+        # oc_soft_avoid ขอเลี่ยง (Soft Constraint - ลด penalty ใน objective)
+        for d in range(1, min(oc_last_day + 1, days_in_month + 1)):
+            for n in oc_soft_avoid:
+                oc_avoid_penalty.append(shifts_var[(n, d, 'OC')])
+    # ปิด OC → ไม่มีตัวแปร OC เลย (ดู shift_domains)
+
+    section('preferences')
+    # ==========================================
+    # 2. เงื่อนไขรายบุคคล (Preferences & Fix)
+    # ==========================================
+    preferred_constraints = [] 
+
+    for d in range(1, days_in_month + 1):
+        wd = calendar.weekday(year, month, d)
+        is_hol = is_holiday(year, month, d)
+
+        # เวรประจำ (Hard Fix) เช่น ER1: จ-พฤ NCD, ศุกร์ M, ส-อา/นักขัตฤกษ์ หยุด (NCD แสดงเป็น O ในโมเดล)
+        for n in ward.fixed_patterns:
+            if n in nurses:
+                hard(('nurse_rule', n, 'fixed_pattern'),
+                     model.Add(shifts_var[(n, d, ward.pattern_shift(n, wd, is_hol))] == 1))
+
+        # เวรที่อยากได้ (Soft Fix) เช่น ER3: M วันพุธ พฤหัส ทุกสัปดาห์ (เท่าที่ได้ ไม่เบียดเบียนผู้อื่น)
+        for pref in ward.preferred_shifts:
+            if pref['nurse'] in nurses and wd in pref['weekdays']:
+                preferred_constraints.append(shifts_var[(pref['nurse'], d, pref['shift'])])
+
+    # จำกัดจำนวนเวรต่อเดือน เช่น ER7: M+ลา ≤ 10, S+N ≤ 10, N ≤ 4
+    for cap in ward.caps:
+        if cap['nurse'] in nurses:
+            capped = [shifts_var[(cap['nurse'], d, s)] for d in range(1, days_in_month + 1) for s in cap['shifts']]
+            hard(('nurse_rule', cap['nurse'], 'caps'), model.Add(sum(capped) <= cap['max']))
+
+    # ==========================================
+    # 2.1 ขอเวร Fix จาก UI (Dynamic Shift Fix Requests)
+    # ==========================================
+    for req in fix_requests:
+        if req.get('month') == month and req.get('year') == year:
+            nurse = req.get('nurse')
+            shift = req.get('shift')
+            dates = req.get('dates', [])
+            if nurse in nurses and shift in ['M', 'S', 'N']:
+                for d in dates:
+                    if 1 <= d <= days_in_month:
+                        preferred_constraints.append(shifts_var[(nurse, d, shift)])
+
+    # strict_requests: ตอนหาสาเหตุจัดไม่ได้ ให้ถือว่าคำขอ Fix ต้องได้ตามขอ (Hard แยกทีละคำขอ)
+    if guards is not None and guards.strict_requests:
+        for req in fix_requests:
+            if req.get('month') == month and req.get('year') == year and req.get('nurse') in nurses \
+                    and req.get('shift') in ['M', 'S', 'N']:
+                for d in req.get('dates', []):
+                    if 1 <= d <= days_in_month:
+                        hard(('fix', req['nurse'], req['shift'], d), model.Add(shifts_var[(req['nurse'], d, req['shift'])] == 1))
+
+    # จัดการคำขอ (Requests)
+    for req in requests:
+        # FIX: ตรวจสอบว่าเป็นของเดือน/ปี ปัจจุบันหรือไม่?
+        # (ต้องใช้ .get() เผื่อข้อมูลเก่าไม่มี key month/year)
+        req_month = req.get('month', month) 
+        req_year = req.get('year', year)
+        
+        if req_month == month and req_year == year: # ต้องตรงกันเป๊ะๆ ถึงจะเอามาคิด
+           if req['nurse'] in nurses:
+                if req['type'] == 'Off':
+                    # SOFT: พยายามให้หยุดตามขอ แต่ถ้าคนไม่พอ อาจจัดเวรให้แทน
+                    # น้ำหนักตามลำดับ: priority 1 = 10 repeats, priority 2 = 9, ... priority 10 = 1
+                    priority = req.get('priority', 1)
+                    weight = max(1, 11 - priority)  # priority 1 → weight 10, priority 10 → weight 1
+                    for _ in range(weight):
+                        preferred_constraints.append(shifts_var[(req['nurse'], req['date'], 'O')])
+                    if guards is not None and guards.strict_requests:
+                        hard(('off', req['nurse'], req['date']), model.Add(shifts_var[(req['nurse'], req['date'], 'O')] == 1))
+                elif req['type'] == 'Leave_Train':
+                    hard(('leave', req['nurse'], req['date']), model.Add(shifts_var[(req['nurse'], req['date'], 'L_T')] == 1))
+    
+    # FIX: ห้าม L_T ถ้าไม่มีคำขอลา - ป้องกัน solver จัดเวร "ลา/อบรม" เองโดยไม่มีคำขอ
+    # (ไม่สร้างตัวแปร L_T ในวันที่ไม่มีคำขอ ดู shift_domains)
+
+    section('fairness')
+    # ==========================================
+    # 3. ระบบเกลี่ยเวร (Fairness Logic)
+    # ==========================================
+    
+    # กลุ่มที่ต้องเกลี่ยเวรรวม (ตัดคนที่มีเวรประจำ/จำกัดเวรออก เช่น ER1, ER7)
+    rotating_nurses = [n for n in nurses if n not in ward.rotation_excluded]
+    # กลุ่มที่ต้องเกลี่ยเวร S/N (ER_KPH รวม ER7 เพื่อให้ S และ N เท่ากัน)
+    nurses_for_sn_fairness = [n for n in nurses if n not in ward.sn_excluded]
+    
+    def fairness_guard(name):
+        return guards.literal(model, ('fairness', name)) if guards is not None else None
+
+    total_work_per_nurse = {}
+    
+    for n in rotating_nurses:
+        # นับรวม M, S, N, L_T
+        total_work_per_nurse[n] = sum(sum(shifts_var[(n, d, s)] for s in work_shifts) for d in range(1, days_in_month + 1))
+
+    # กฎบังคับ: เวรรวมห้ามต่างกันเกิน 1 (เพื่อความแฟร์สูงสุด)
+    add_spread_limit(model, total_work_per_nurse.values(), 1, days_in_month, 'total_work', enforce=fairness_guard('total_work'))
+    
+    # ==========================================
+    # 3.1 วันหยุดของแต่ละคน = วันหยุดของเดือน (เสาร์-อาทิตย์ + นักขัตฤกษ์)
+    # ==========================================
+    # คำนวณจำนวนวันหยุดในเดือน
+    weekend_count = sum(1 for d in range(1, days_in_month + 1) if calendar.weekday(year, month, d) >= 5)
+    holiday_count = len([d for d in THAI_HOLIDAYS.get(year, {}).get(month, []) 
+                        if calendar.weekday(year, month, d) < 5])  # นับเฉพาะวันหยุดที่ไม่ตรงกับ ส-อา
+    target_off_days = weekend_count + holiday_count
+    
+    # กำหนดให้ทุกคนใน rotating_nurses มีวันหยุดใกล้เคียงกับ target (±1)
+    for n in rotating_nurses:
+        off_days = sum(shifts_var[(n, d, 'O')] for d in range(1, days_in_month + 1))
+        # RELAXED: Off อนุญาตให้ต่างจาก target ได้ ±1 วัน
+        hard(('fairness', 'off_days'), model.Add(off_days >= target_off_days - 1))
+        hard(('fairness', 'off_days'), model.Add(off_days <= target_off_days + 1))
+    
+    # ==========================================
+    # 3.2 เกลี่ยวันหยุดพิเศษ (ส-อา + นักขัตฤกษ์) ให้ทุกคนได้หมุนเวียนเท่ากัน
+    # ==========================================
+    # สร้าง list วันพิเศษ (ส-อา + นักขัตฤกษ์)
+    special_days = [d for d in range(1, days_in_month + 1) 
+                    if calendar.weekday(year, month, d) >= 5 or is_holiday(year, month, d)]
+    
+    # นับ special day offs ของแต่ละคน (เฉพาะ 'O' เท่านั้น ไม่นับ L_T)
+    special_offs_per_nurse = {}
+    for n in rotating_nurses:
+        special_offs_per_nurse[n] = sum(shifts_var[(n, d, 'O')] for d in special_days)
+    
+    # RELAXED: เกลี่ยให้ต่างกันไม่เกิน 1 (ยืดหยุ่นขึ้น)
+    add_spread_limit(model, special_offs_per_nurse.values(), 1, len(special_days), 'special_offs', enforce=fairness_guard('special_offs'))
+    
+    # ==========================================
+    # 4. เกลี่ยเวรบ่าย (S) และดึก (N) แยกกัน ต่างกันไม่เกิน 1
+    # ==========================================
+    s_shifts_per_nurse = {}
+    n_shifts_per_nurse = {}
+    
+    for n in nurses_for_sn_fairness:
+        # NS นับเป็นทั้ง S และ N
+        s_shifts_per_nurse[n] = sum(shifts_var[(n, d, 'S')] + shifts_var[(n, d, 'NS')] for d in range(1, days_in_month + 1))
+        n_shifts_per_nurse[n] = sum(shifts_var[(n, d, 'N')] + shifts_var[(n, d, 'NS')] for d in range(1, days_in_month + 1))
+    
+    # เวรบ่าย (S) ต่างกันไม่เกิน 1
+    add_spread_limit(model, s_shifts_per_nurse.values(), 1, days_in_month, 's_shifts', enforce=fairness_guard('s_shifts'))
+    
+    # เวรดึก (N) ต่างกันไม่เกิน 1
+    add_spread_limit(model, n_shifts_per_nurse.values(), 1, days_in_month, 'n_shifts', enforce=fairness_guard('n_shifts'))
+
+    section('soft_objectives')
+    # ==========================================
+    # 5. Soft Constraint: หลัง N ควร Off 2 วัน (ยกเว้น off_after_night_excluded)
+    # ==========================================
+    off_after_night_constraints = []
+    nurses_for_off_rule = [n for n in nurses if n not in ward.off_after_night_excluded]  # ER_KPH: ER1 (สัญญาพิเศษ), ER3
+    
+    for n in nurses_for_off_rule:
+        for d in range(1, days_in_month - 1):  # ต้องเหลือ 2 วันหลัง N
+            # ถ้าทำ N วันที่ d แล้ว Off d+1 และ Off d+2 = ดี (ให้คะแนน)
+            off_after_night_constraints.append(shifts_var[(n, d + 1, 'O')])
+    
+    # ==========================================
+    # 6. Soft Constraint: พยายามให้หยุด 2 วันติดกัน (O-O)
+    # ==========================================
+    consecutive_off_constraints = []
+    for n in rotating_nurses:
+        for d in range(1, days_in_month):
+            # ให้คะแนนเมื่อมี O-O ติดกัน
+            consecutive_off_constraints.append(shifts_var[(n, d, 'O')] + shifts_var[(n, d + 1, 'O')])
+    
+    # ==========================================
+    # 7. Soft Constraint: Separation - หลีกเลี่ยงคู่พยาบาลขึ้นเวรเดียวกัน
+    # ==========================================
+    separation_pairs = ward.separation_pairs  # คู่ที่ต้องการแยก
+    separation_penalty = []
+    
+    for (n1, n2) in separation_pairs:
+        if n1 in nurses and n2 in nurses:
+            for d in range(1, days_in_month + 1):
+                for shift in ['S', 'M', 'N']:  # เวรบ่าย, เช้า, ดึก
+                    # สร้างตัวแปรสำหรับเช็คว่าซ้อนกันหรือไม่
+                    same_shift = model.NewBoolVar(f'same_{n1}_{n2}_{d}_{shift}')
+                    # ถ้าทั้งคู่ทำเวรเดียวกัน same_shift = 1
+                    model.Add(shifts_var[(n1, d, shift)] + shifts_var[(n2, d, shift)] <= 1 + same_shift)
+                    model.Add(shifts_var[(n1, d, shift)] + shifts_var[(n2, d, shift)] >= 2 * same_shift)
+                    separation_penalty.append(same_shift)
+    
+    # รวม soft constraints ทั้งหมดเข้าด้วยกัน
+    # น้ำหนัก: preferred_constraints (M fix) > separation > N→N (OC) > O→N penalty > S→M→N (OC) > N-O-N penalty > consecutive_off > off_after_night > oc_avoid
+    # (น้ำหนักจาก ward.weights ค่าของ ER_KPH ตามวงเล็บ)
+    objective = (
+        sum(preferred_constraints) * weights['preferred'] +  # (100)
+        sum(consecutive_off_constraints) * weights['consecutive_off'] +  # (5)
+        sum(off_after_night_constraints) * weights['off_after_night'] -  # (1)
+        sum(separation_penalty) * weights['separation'] -  # (30) ลบคะแนนเมื่อคู่ที่ต้องแยก (ER2-ER7) ซ้อนเวรกัน
+        sum(n_consecutive_penalty) * weights['n_consecutive'] -  # (25) ลบคะแนนเมื่อ N→N ในช่วง OC (ควรหลีกเลี่ยง)
+        sum(oc_avoid_penalty) * weights['oc_avoid'] -  # (20) ลบคะแนนเมื่อ oc_soft_avoid (ER4, ER8) ทำ OC
+        sum(s_n_penalty) * weights['s_n_transition'] -  # (18) ลบคะแนนเมื่อ S→N หรือ N→S (ควรหลีกเลี่ยง)
+        sum(o_before_n_penalty) * weights['o_before_n'] -  # (15) ลบคะแนนเมื่อ O→N (ควรหลีกเลี่ยง)
+        sum(s_m_n_penalty) * weights['s_m_n'] -  # (12) ลบคะแนนเมื่อ S→M→N ในช่วง OC
+        sum(n_skip_day_penalty) * weights['n_skip_day'] -  # (10) ลบคะแนนเมื่อ N-O-N (ดึกสลับวัน)
+        sum(sequence_penalty)  # แบบ automaton: ค่าปรับรวมน้ำหนักของกฎลำดับเวรข้างบนแล้ว
+    )
+    model.Maximize(objective)
+    if profile is not None:
+        profile.finish(model)
+
+    return model, shifts_var, objective
+
+
+def schedule_to_assignments(schedule, nurses, days_in_month):
+    """แปลงตารางเวร (DataFrame ที่ได้จาก solve_schedule หรือ dict nurse -> list ของรหัสเวร)
+    เป็น dict {(nurse, day): shift} ข้ามช่องที่อ่านไม่ออก"""
+    assignments = {}
+    if schedule is None:
+        return assignments
+
+    if isinstance(schedule, dict):
+        for n, day_shifts in schedule.items():
+            if n not in nurses:
+                continue
+            for d, shift in enumerate(day_shifts[:days_in_month], start=1):
+                if shift in SHIFTS:
+                    assignments[(n, d)] = shift
+        return assignments
+
+    # เรียงตามความยาวจากมากไปน้อย เพื่อป้องกัน ER1 ไป match กับ ER10
+    sorted_nurses = sorted(nurses, key=len, reverse=True)
+    for _, row in schedule.iterrows():
+        nurse_col = str(row.iloc[0])
+        nurse_id = next((n for n in sorted_nurses if nurse_col.split(' ')[0] == n), None)
+        if nurse_id is None:
+            continue
+        for d in range(1, days_in_month + 1):
+            col = str(d)
+            if col not in row.index:
+                continue
+            val = row[col]
+            shift = DISPLAY_TO_SHIFT.get('' if pd.isna(val) else str(val).strip())
+            if shift is not None:
+                assignments[(nurse_id, d)] = shift
+    return assignments
+
+
+def add_schedule_hint(model, shifts_var, hint_schedule, nurses, days_in_month):
+    """ใส่ตารางเดิมเป็น solution hint ให้ CP-SAT เริ่มค้นจากคำตอบที่รู้ว่าดีอยู่แล้ว
+    คืนค่าจำนวนช่อง (nurse, day) ที่ใส่ hint"""
+    assignments = schedule_to_assignments(hint_schedule, nurses, days_in_month)
+    for (n, d), hinted in assignments.items():
+        for s in SHIFTS:
+            if (n, d, s) in shifts_var:
+                model.AddHint(shifts_var[(n, d, s)], 1 if s == hinted else 0)
+    return len(assignments)
+
+
+def shift_var_index(shifts_var, nurses, days_in_month):
+    """index ของ BoolVar ทุกช่องใน proto เรียงเป็น array (พยาบาล, วัน, เวร) ตามลำดับ SHIFTS (-1 = ช่องที่ถูกตัด)"""
+    return np.array([[[shifts_var[(n, d, s)].Index() if (n, d, s) in shifts_var else -1 for s in SHIFTS]
+                      for d in range(1, days_in_month + 1)] for n in nurses], dtype=np.int64)
+
+
+def extract_codes(source, var_index):
+    """อ่านคำตอบทั้งก้อนครั้งเดียว (แทน solver.Value ทีละช่อง) คืนค่า int8 array พยาบาล × วัน ของรหัสเวร
+
+    source = CpSolver หรือ solution callback (ใช้ได้ทั้งตอนจบและระหว่างค้นหา)
+    รหัสเวร = ตำแหน่งใน SHIFTS (ดู SHIFT_CODES)
+    """
+    # ตัวแปรเวรถูกสร้างก่อนตัวแปรอื่น → อ่านแค่ช่วงต้นของ solution ก็พอ
+    count = int(var_index.max()) + 1
+    values = np.fromiter(itertools.islice(source.response_proto.solution, count), dtype=np.int64, count=count)
+    # ต่อ 0 ท้าย array → index -1 (ช่องที่ไม่มีตัวแปร) อ่านได้เป็น 0
+    values = np.append(values, 0)
+    return values[var_index].argmax(axis=2).astype(np.int8)
+
+
+def render_schedule_df(codes, nurses, year, month, ward_config=None):
+    """แปลง matrix รหัสเวรเป็นตารางสำหรับแสดงผล (แถว = พยาบาล, คอลัมน์ '1'..'N')"""
+    ward = resolve_ward_config(ward_config)
+    codes = np.asarray(codes)
+    days_in_month = codes.shape[1]
+    cells = SHIFT_DISPLAY[codes]
+    weekday = np.array([calendar.weekday(year, month, d) for d in range(1, days_in_month + 1)])
+    for n in ward.fixed_patterns:
+        if n in nurses:
+            # วันหยุดที่ตรงกับวันประจำแบบ NCD (เช่น ER1 จ-พฤ) แสดงเป็น NCD
+            i = nurses.index(n)
+            cells[i, (codes[i] == SHIFT_CODES['O']) & np.isin(weekday, ward.ncd_weekdays(n))] = 'NCD'
+    df = pd.DataFrame(cells, columns=[str(d) for d in range(1, days_in_month + 1)])
+    # แสดง ID + ชื่อจริง
+    df.insert(0, 'Nurse', [f"{n} ({ward.nurse_names.get(n, '')})" for n in nurses])
+    return df
+
+
+def _extract_schedule(solver, shifts_var, year, month, days_in_month, nurses, ward_config=None):
+    codes = extract_codes(solver, shift_var_index(shifts_var, nurses, days_in_month))
+    return render_schedule_df(codes, list(nurses), year, month, ward_config)
+
+
+class _ProgressCallback(cp_model.CpSolverSolutionCallback):
+    """แจ้งความคืบหน้าทุกครั้งที่เจอคำตอบที่ดีขึ้น หรือขอบเขตบน (bound) ขยับ
+
+    ถ้ามี solution_extractor จะแนบ 'codes' (matrix รหัสเวรของคำตอบนั้น) มากับทุกคำตอบใหม่ด้วย
+    """
+
+    def __init__(self, progress_callback, solution_extractor=None):
+        super().__init__()
+        self._progress_callback = progress_callback
+        self._solution_extractor = solution_extractor
+        self._lock = threading.Lock()
+        self._start = time.time()
+        self.progress = {'objective': None, 'best_bound': None, 'wall_time': 0.0, 'solutions': 0}
+
+    def _emit(self, extra=None, **changes):
+        with self._lock:
+            now = time.time()
+            self.progress.update(changes, wall_time=now - self._start)
+            snapshot = dict(self.progress, timestamp=now)
+        if extra:
+            snapshot.update(extra)
+        self._progress_callback(snapshot)
+
+    def on_solution_callback(self):
+        extra = None
+        if self._solution_extractor is not None:
+            extra = {'codes': self._solution_extractor(self)}
+        self._emit(extra, objective=self.ObjectiveValue(), best_bound=self.BestObjectiveBound(),
+                   solutions=self.progress['solutions'] + 1)
+
+    def on_best_bound(self, bound):
+        self._emit(best_bound=bound)
+
+
+def _stop_when_set(solver, stop_event, finished):
+    """รอ stop_event (threading/multiprocessing Event) แล้วสั่งหยุดค้นหา solver จะคืนคำตอบดีที่สุดที่มี"""
+    while not finished.is_set():
+        if stop_event.wait(0.1):
+            solver.StopSearch()
+            return
+
+
+def run_solver(model, solver_params=None, progress_callback=None, stop_event=None, solution_extractor=None):
+    """Solve โมเดล คืนค่า (solver, status)
+
+    progress_callback(dict): เรียกเมื่อมีคำตอบใหม่/bound ใหม่ พร้อม objective, best_bound,
+        wall_time, solutions, timestamp (+ 'codes' ถ้าให้ solution_extractor และเป็นคำตอบใหม่)
+    stop_event: Event ที่ set() แล้วจะหยุดค้นหาทันที (ได้คำตอบดีที่สุดที่หาเจอแล้ว)
+    solution_extractor(callback): แปลงคำตอบปัจจุบันเป็น matrix รหัสเวร (เช่น extract_codes)
+    """
+    solver = cp_model.CpSolver()
+    configure_solver(solver, solver_params)
+
+    callback = None
+    if progress_callback is not None:
+        callback = _ProgressCallback(progress_callback, solution_extractor)
+        solver.best_bound_callback = callback.on_best_bound
+
+    finished = threading.Event()
+    if stop_event is not None:
+        threading.Thread(target=_stop_when_set, args=(solver, stop_event, finished), daemon=True).start()
+    try:
+        status = solver.Solve(model, callback)
+    finally:
+        finished.set()
+    return solver, status
+
+
+def solve_stats(solver, status, solver_params=None):
+    """สถิติของการ solve ที่จบแล้ว (สำหรับบันทึกประวัติ ดู telemetry.record_solve)"""
+    solved = status in [cp_model.OPTIMAL, cp_model.FEASIBLE]
+    params = dict(DEFAULT_SOLVER_PARAMS)
+    if solver_params:
+        params.update(solver_params)
+    params['num_workers'] = solver.parameters.num_workers
+    return {
+        'status': solver.StatusName(status),
+        'wall_time': solver.WallTime(),
+        'user_time': solver.UserTime(),
+        'deterministic_time': solver.response_proto.deterministic_time,
+        'conflicts': solver.NumConflicts(),
+        'branches': solver.NumBranches(),
+        'objective': solver.ObjectiveValue() if solved else None,
+        'best_bound': solver.BestObjectiveBound() if solved else None,
+        'params': params,
+    }
+
+
+def solve_schedule_codes(year, month, days_in_month, nurses, requests, fix_requests=None, staffing_overrides=None, enable_oc=True, prev_month_data=None, solver_params=None, hint_schedule=None, progress_callback=None, stop_event=None, stream_schedules=False, precheck=True, stats=None, ward_config=None, sequence_encoding=None):
+    """จัดตารางเวรทั้งเดือน คืนค่า int8 array พยาบาล × วัน ของรหัสเวร (SHIFT_CODES) หรือ None ถ้าจัดไม่ได้
+
+    ส่งต่อ/เก็บได้ขนาดเล็ก แปลงเป็นตารางแสดงผลด้วย render_schedule_df เมื่อจะแสดงเท่านั้น
+
+    solver_params: dict สำหรับปรับ CP-SAT (ดู DEFAULT_SOLVER_PARAMS)
+    hint_schedule: ตารางเดิม (DataFrame หรือ dict nurse -> list รหัสเวร) ใช้เป็นจุดเริ่มต้น
+        ของการค้นหา (warm start) เมื่อแก้คำขอเพียงเล็กน้อยจะได้คำตอบเร็วขึ้นมาก
+    progress_callback, stop_event: ดู run_solver
+    stream_schedules: True = แนบ 'codes' ของทุกคำตอบที่ดีขึ้นไปกับ progress_callback
+    precheck: ตรวจกำลังคนต่อวัน (check_capacity) ก่อน ถ้าคนไม่พอแน่ๆ คืน None ทันทีโดยไม่สร้างโมเดล
+    stats: dict (ถ้าส่งมา) จะถูกเติมสถิติของการ solve (ดู solve_stats) ใช้บันทึกประวัติการ solve
+    ward_config: WardConfig หรือชื่อวอร์ด (None = วอร์ดหลัก) ดู build_schedule_model
+    sequence_encoding: 'linear' / 'automaton' วิธีเขียนกฎลำดับเวร (None = DEFAULT_SEQUENCE_ENCODING)
+    """
+    if precheck and capacity_errors(check_capacity(year, month, days_in_month, nurses, requests, fix_requests,
+                                                   staffing_overrides, enable_oc=enable_oc,
+                                                   ward_config=ward_config)):
+        if stats is not None:
+            stats.update(status='PRECHECK_FAILED', wall_time=0.0)
+        return None
+
+    model, shifts_var, _ = build_schedule_model(
+        year, month, days_in_month, nurses, requests, fix_requests, staffing_overrides,
+        enable_oc=enable_oc, prev_month_data=prev_month_data, ward_config=ward_config,
+        sequence_encoding=sequence_encoding
+    )
+    if hint_schedule is not None:
+        add_schedule_hint(model, shifts_var, hint_schedule, nurses, days_in_month)
+
+    var_index = shift_var_index(shifts_var, nurses, days_in_month)
+    solution_extractor = None
+    if stream_schedules:
+        def solution_extractor(values):
+            return extract_codes(values, var_index)
+    solver, status = run_solver(model, solver_params, progress_callback, stop_event, solution_extractor)
+    if stats is not None:
+        stats.update(solve_stats(solver, status, solver_params))
+        # บันทึก encoding ไว้กับ params ด้วย → แยกได้ว่า solve ที่ช้าใช้กฎลำดับเวรแบบไหน
+        stats['params']['sequence_encoding'] = sequence_encoding or DEFAULT_SEQUENCE_ENCODING
+
+    if status in [cp_model.OPTIMAL, cp_model.FEASIBLE]:
+        return extract_codes(solver, var_index)
+    else:
+        return None
+
+
+def solve_schedule(year, month, days_in_month, nurses, requests, fix_requests=None, staffing_overrides=None, enable_oc=True, prev_month_data=None, solver_params=None, hint_schedule=None, progress_callback=None, stop_event=None, stream_schedules=False, precheck=True, stats=None, ward_config=None, sequence_encoding=None):
+    """จัดตารางเวรทั้งเดือน คืนค่า DataFrame (แถว = พยาบาล, คอลัมน์ = วันที่) หรือ None ถ้าจัดไม่ได้
+
+    เหมือน solve_schedule_codes แต่แปลงเป็นตารางแสดงผลให้แล้ว
+    stream_schedules: True = แนบ 'schedule' (DataFrame) ของทุกคำตอบที่ดีขึ้นไปกับ progress_callback
+    """
+    nurses = list(nurses)
+    if stream_schedules and progress_callback is not None:
+        user_callback = progress_callback
+
+        def progress_callback(progress):
+            if 'codes' in progress:
+                progress['schedule'] = render_schedule_df(progress.pop('codes'), nurses, year, month, ward_config)
+            user_callback(progress)
+
+    codes = solve_schedule_codes(
+        year, month, days_in_month, nurses, requests, fix_requests, staffing_overrides,
+        enable_oc=enable_oc, prev_month_data=prev_month_data, solver_params=solver_params,
+        hint_schedule=hint_schedule, progress_callback=progress_callback, stop_event=stop_event,
+        stream_schedules=stream_schedules, precheck=precheck, stats=stats, ward_config=ward_config,
+        sequence_encoding=sequence_encoding
+    )
+    if codes is None:
+        return None
+    return render_schedule_df(codes, nurses, year, month, ward_config)
+
+
+def iter_solutions(year, month, days_in_month, nurses, requests, fix_requests=None, staffing_overrides=None, enable_oc=True, prev_month_data=None, solver_params=None, hint_schedule=None, ward_config=None, sequence_encoding=None):
+    """Generator: yield ทุกคำตอบที่ดีขึ้นระหว่างค้นหา (ตารางแรกมาเร็ว แล้วค่อยๆ ดีขึ้น)
+
+    แต่ละรายการเป็น dict: schedule (DataFrame), codes (matrix รหัสเวร), objective, best_bound,
+    wall_time, timestamp, solutions
+    เลิกวน (break) กลางทางได้ solver จะหยุดค้นหาให้เอง::
+
+        for update in iter_solutions(2025, 10, 31, nurses, requests):
+            show(update['schedule'])
+    """
+    updates = queue.Queue()
+    stop_event = threading.Event()
+    failure = []
+
+    def _solve():
+        try:
+            solve_schedule_codes(
+                year, month, days_in_month, nurses, requests, fix_requests, staffing_overrides,
+                enable_oc=enable_oc, prev_month_data=prev_month_data, solver_params=solver_params,
+                hint_schedule=hint_schedule, progress_callback=updates.put, stop_event=stop_event,
+                stream_schedules=True, ward_config=ward_config, sequence_encoding=sequence_encoding
+            )
+        except Exception as e:
+            failure.append(e)
+        finally:
+            updates.put(None)
+
+    thread = threading.Thread(target=_solve, daemon=True)
+    thread.start()
+    try:
+        while True:
+            update = updates.get()
+            if update is None:
+                break
+            if 'codes' in update:
+                # แปลงเป็นตารางฝั่งผู้ใช้ (thread ของ solver ไม่ต้องเสียเวลาสร้างข้อความ)
+                update['schedule'] = render_schedule_df(update['codes'], list(nurses), year, month, ward_config)
+                yield update
+    finally:
+        stop_event.set()
+        thread.join()
+    if failure:
+        raise failure[0]
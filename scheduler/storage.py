@@ -0,0 +1,154 @@
+"""อ่าน/บันทึกคำขอวันลา, คำขอเวร Fix และกำลังคนพิเศษ (CSV)"""
+
+import os
+
+import pandas as pd
+
+from .csv_io import CsvReport, iter_csv
+
+CSV_FILE = "leave_requests.csv"
+FIX_REQUESTS_FILE = "fix_requests.csv"
+STAFFING_OVERRIDES_FILE = "staffing_overrides.csv"
+
+def _report_problems(report, owned):
+    """พิมพ์สรุปแถวที่มีปัญหา (ถ้าผู้เรียกไม่ได้ส่ง report มารับเอง)"""
+    if owned and report.bad_rows:
+        print(report.summary())
+
+
+def _records(df):
+    """df.to_dict('records') แบบเร็ว (tolist ทีละคอลัมน์ แทนการวนทีละค่าของคอลัมน์ข้อความ)"""
+    columns = list(df.columns)
+    return [dict(zip(columns, values)) for values in zip(*(df[c].tolist() for c in columns))]
+
+
+def _numeric_columns(chunk, columns, report, required=()):
+    """แปลงคอลัมน์เป็นตัวเลข แถวที่ค่าไม่ใช่ตัวเลข (หรือไม่มีค่าในคอลัมน์ required) → บันทึกใน report แล้วตัดทิ้ง
+
+    คอลัมน์ required ที่เหลือแปลงเป็น int
+    """
+    bad = pd.Series(False, index=chunk.index)
+    for col in columns:
+        if col not in chunk.columns:
+            continue
+        values = pd.to_numeric(chunk[col], errors='coerce')
+        invalid = values.isna() & (chunk[col].notna() | (col in required))
+        for index in chunk.index[invalid & ~bad]:
+            raw = chunk.at[index, col]
+            problem = "ไม่มีค่า" if pd.isna(raw) else f"= {raw!r} ไม่ใช่ตัวเลข"
+            report.add(report.file_line(index), f"{col} {problem}")
+        bad |= invalid
+        chunk = chunk.assign(**{col: values})
+    chunk = chunk[~bad]
+    return chunk.astype({col: int for col in required if col in chunk.columns})
+
+
+def load_requests_from_csv(path=CSV_FILE, report=None):
+    """คำขอวันลา/ขอหยุด อ่านทีละ chunk (report = CsvReport รับแถวที่มีปัญหา, None = พิมพ์สรุป)"""
+    if not os.path.exists(path):
+        return []
+    owned = report is None
+    report = CsvReport(path) if owned else report
+    records = []
+    try:
+        for df in iter_csv(path, report):
+            # Keep only valid columns (including new 'priority' column) - ตัด Unnamed ทิ้งไปด้วย
+            valid_cols = ['nurse', 'date', 'month', 'year', 'type', 'reason', 'priority']
+            df = df[[c for c in df.columns if c in valid_cols]]
+
+            # Convert numeric columns to int (handle potential floats)
+            df = _numeric_columns(df, ['date', 'month', 'year', 'priority'], report,
+                                  required=['date', 'month', 'year'])
+            for col in ['date', 'month', 'year', 'priority']:
+                if col in df.columns:
+                    df[col] = df[col].fillna(0).astype(int)
+
+            # Ensure priority column exists with default value
+            if 'priority' not in df.columns:
+                df['priority'] = 1
+
+            records.extend(_records(df))
+    except (OSError, ValueError) as e:  # ParserError / EmptyDataError เป็น ValueError
+        print(f"Error loading {path}: {e}")
+        return []
+    _report_problems(report, owned)
+    return records
+
+def save_requests_to_csv(requests):
+    if requests:
+        df = pd.DataFrame(requests)
+        # Remove Unnamed columns before saving
+        df = df.loc[:, ~df.columns.str.contains('^Unnamed')]
+        df.to_csv(CSV_FILE, index=False, encoding='utf-8')
+    else:
+        if os.path.exists(CSV_FILE):
+            os.remove(CSV_FILE)
+
+def _parse_dates(value):
+    """'1,2,3' → [1, 2, 3] (ว่าง = [])"""
+    if pd.isna(value) or str(value).strip() == '':
+        return []
+    return [int(float(d)) for d in str(value).split(',')]
+
+
+def load_fix_requests_from_csv(path=FIX_REQUESTS_FILE, report=None):
+    """คำขอเวร Fix (dates เป็น list) แถวที่ dates อ่านไม่ได้ → บันทึกใน report"""
+    if not os.path.exists(path):
+        return []
+    owned = report is None
+    report = CsvReport(path) if owned else report
+    records = []
+    try:
+        # dates อ่านเป็นข้อความ (วันเดียว "29" ไม่กลายเป็น 29.0)
+        for df in iter_csv(path, report, dtype={'dates': str}):
+            if 'dates' not in df.columns:
+                report.add(1, "ไม่มีคอลัมน์ dates")
+                break
+            df = _numeric_columns(df, ['month', 'year'], report, required=['month', 'year'])
+            for index, row in zip(df.index, _records(df)):
+                try:
+                    row['dates'] = _parse_dates(row['dates'])
+                except ValueError:
+                    report.add(report.file_line(index), f"dates = {row['dates']!r} อ่านไม่ได้")
+                    continue
+                records.append(row)
+    except (OSError, ValueError) as e:
+        print(f"Error loading {path}: {e}")
+        return []
+    _report_problems(report, owned)
+    return records
+
+def save_fix_requests_to_csv(fix_requests):
+    if fix_requests:
+        df = pd.DataFrame(fix_requests)
+        # Convert dates list to comma-separated string for CSV
+        df['dates'] = df['dates'].apply(lambda x: ','.join(map(str, x)) if x else '')
+        df.to_csv(FIX_REQUESTS_FILE, index=False)
+    else:
+        if os.path.exists(FIX_REQUESTS_FILE):
+            os.remove(FIX_REQUESTS_FILE)
+
+def load_staffing_overrides_from_csv(path=STAFFING_OVERRIDES_FILE, report=None):
+    if not os.path.exists(path):
+        return []
+    owned = report is None
+    report = CsvReport(path) if owned else report
+    records = []
+    try:
+        for df in iter_csv(path, report):
+            df = _numeric_columns(df, ['start', 'end', 'count', 'month', 'year'], report,
+                                  required=['start', 'end', 'count', 'month', 'year'])
+            records.extend(_records(df))
+    except (OSError, ValueError) as e:
+        print(f"Error loading {path}: {e}")
+        return []
+    _report_problems(report, owned)
+    return records
+
+def save_staffing_overrides_to_csv(staffing_overrides):
+    if staffing_overrides:
+        df = pd.DataFrame(staffing_overrides)
+        df.to_csv(STAFFING_OVERRIDES_FILE, index=False)
+    else:
+        if os.path.exists(STAFFING_OVERRIDES_FILE):
+            os.remove(STAFFING_OVERRIDES_FILE)
@@ -0,0 +1,144 @@
+"""ประวัติการ solve (SQLite ในเครื่อง) ไว้ดูแนวโน้มว่าเดือนไหน solve ช้า/ช้าลงเมื่อไหร่ จากข้อมูลจริง
+
+บันทึกทุกครั้งที่ solve จบ: สถานะ, เวลา, conflicts, branches, objective, bound,
+fingerprint ของ input (solve_cache_key), จำนวนพยาบาล, ค่า solver_params และผลลัพธ์
+"""
+
+import json
+import os
+import sqlite3
+import time
+
+import pandas as pd
+
+from .cache import solve_cache_key
+
+TELEMETRY_DB = "solve_history.sqlite3"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS solves (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    recorded_at TEXT NOT NULL,
+    source TEXT,
+    year INTEGER NOT NULL,
+    month INTEGER NOT NULL,
+    num_nurses INTEGER,
+    fingerprint TEXT,
+    status TEXT,
+    outcome TEXT,
+    wall_time REAL,
+    user_time REAL,
+    deterministic_time REAL,
+    conflicts INTEGER,
+    branches INTEGER,
+    objective REAL,
+    best_bound REAL,
+    params TEXT
+);
+CREATE INDEX IF NOT EXISTS solves_by_month ON solves (year, month);
+CREATE INDEX IF NOT EXISTS solves_by_time ON solves (recorded_at);
+"""
+_COLUMNS = ['id', 'recorded_at', 'source', 'year', 'month', 'num_nurses', 'fingerprint', 'status', 'outcome',
+            'wall_time', 'user_time', 'deterministic_time', 'conflicts', 'branches', 'objective', 'best_bound',
+            'params']
+
+
+def _connect(path):
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    conn = sqlite3.connect(path, timeout=10)
+    conn.executescript(_SCHEMA)
+    return conn
+
+
+def solve_outcome(stats, cancelled=False, error=None):
+    """สรุปผลเป็นคำเดียว: solved / optimal / cancelled / infeasible / precheck / timeout / error"""
+    if error:
+        return 'error'
+    status = stats.get('status')
+    if cancelled and status in ['OPTIMAL', 'FEASIBLE', 'UNKNOWN']:
+        return 'cancelled'
+    return {
+        'OPTIMAL': 'optimal',
+        'FEASIBLE': 'solved',
+        'INFEASIBLE': 'infeasible',
+        'PRECHECK_FAILED': 'precheck',
+        'UNKNOWN': 'timeout',
+    }.get(status, 'error')
+
+
+def record_solve(stats, year, month, nurses, fingerprint=None, outcome=None, source='engine', path=TELEMETRY_DB):
+    """บันทึกการ solve 1 ครั้ง (stats = dict จาก solve_schedule_codes(..., stats=...)) คืนค่า id"""
+    params = stats.get('params')
+    row = (
+        time.strftime('%Y-%m-%d %H:%M:%S'), source, year, month, len(nurses), fingerprint,
+        stats.get('status'), outcome or solve_outcome(stats),
+        stats.get('wall_time'), stats.get('user_time'), stats.get('deterministic_time'),
+        stats.get('conflicts'), stats.get('branches'), stats.get('objective'), stats.get('best_bound'),
+        None if params is None else json.dumps(params, sort_keys=True, default=str),
+    )
+    conn = _connect(path)
+    try:
+        with conn:
+            cursor = conn.execute(
+                f"INSERT INTO solves ({', '.join(_COLUMNS[1:])}) VALUES ({', '.join('?' * len(row))})", row
+            )
+        return cursor.lastrowid
+    finally:
+        conn.close()
+
+
+def solve_fingerprint(year, month, days_in_month, nurses, requests, fix_requests=None, staffing_overrides=None,
+                      enable_oc=True, prev_month_data=None, ward_config=None):
+    """fingerprint ของ input (เท่ากับ key ของ SolveCache) → ดูได้ว่าโจทย์เดิมถูก solve ซ้ำกี่ครั้ง"""
+    return solve_cache_key(year, month, days_in_month, nurses, requests, fix_requests, staffing_overrides,
+                           enable_oc=enable_oc, prev_month_data=prev_month_data, ward_config=ward_config)
+
+
+def load_solve_history(path=TELEMETRY_DB, year=None, month=None, since=None, source=None, limit=None):
+    """ประวัติการ solve เป็น DataFrame (ใหม่สุดก่อน) กรองตามปี/เดือน/วันที่ (since = 'YYYY-MM-DD')/source"""
+    if not os.path.exists(path):
+        return pd.DataFrame(columns=_COLUMNS)
+    where, args = [], []
+    for column, op, value in [('year', '=', year), ('month', '=', month), ('recorded_at', '>=', since),
+                              ('source', '=', source)]:
+        if value is not None:
+            where.append(f"{column} {op} ?")
+            args.append(value)
+    sql = f"SELECT {', '.join(_COLUMNS)} FROM solves"
+    if where:
+        sql += " WHERE " + " AND ".join(where)
+    sql += " ORDER BY id DESC"
+    if limit:
+        sql += " LIMIT ?"
+        args.append(int(limit))
+    conn = _connect(path)
+    try:
+        history = pd.read_sql_query(sql, conn, params=args)
+    finally:
+        conn.close()
+    history['recorded_at'] = pd.to_datetime(history['recorded_at'])
+    return history
+
+
+def solve_trends(history):
+    """สรุปต่อ ปี × เดือนของตาราง: จำนวนครั้ง, เวลา (median/max), conflicts, % ที่ได้ตาราง, gap ของคะแนน"""
+    columns = ['year', 'month', 'solves', 'median_wall_time', 'max_wall_time', 'median_conflicts',
+               'solved_rate', 'median_gap']
+    if history.empty:
+        return pd.DataFrame(columns=columns)
+    history = history.copy()
+    history['solved'] = history['outcome'].isin(['optimal', 'solved', 'cancelled']) & history['objective'].notna()
+    bound = history['best_bound'].abs().where(history['best_bound'].abs() > 0)
+    history['gap'] = (history['best_bound'] - history['objective']).abs() / bound
+    grouped = history.groupby(['year', 'month'], sort=True)
+    trends = pd.DataFrame({
+        'solves': grouped.size(),
+        'median_wall_time': grouped['wall_time'].median(),
+        'max_wall_time': grouped['wall_time'].max(),
+        'median_conflicts': grouped['conflicts'].median(),
+        'solved_rate': grouped['solved'].mean() * 100,
+        'median_gap': grouped['gap'].median() * 100,
+    }).reset_index()
+    return trends[columns]
@@ -0,0 +1,52 @@
+"""ปฏิทินวันหยุดนักขัตฤกษ์และฟังก์ชันช่วยเรื่องวันที่"""
+
+# --- Thai Public Holidays 2025-2026 ---
+THAI_HOLIDAYS = {
+    2025: {
+        1: [1],           # วันขึ้นปีใหม่
+        2: [12],          # วันมาฆบูชา
+        4: [6, 7, 13, 14, 15, 16],  # วันจักรี + สงกรานต์
+        5: [1, 4, 5, 12], # วันแรงงาน + ฉัตรมงคล + วิสาขบูชา
+        6: [2, 3],        # วันเฉลิมฯ พระราชินี
+        7: [10, 11, 28],  # วันอาสาฬหบูชา + เข้าพรรษา + เฉลิมฯ ร.10
+        8: [11, 12],      # วันแม่แห่งชาติ
+        10: [13, 23],     # วันสวรรคต ร.9 + ปิยมหาราช
+        12: [5, 10, 31],  # วันพ่อ + รัฐธรรมนูญ + สิ้นปี
+    },
+    2026: {
+        1: [1, 2],        # วันขึ้นปีใหม่
+        3: [3],           # วันมาฆบูชา
+        4: [6, 13, 14, 15],  # วันจักรี + สงกรานต์
+        5: [1, 4],        # วันแรงงาน + ฉัตรมงคล
+        6: [1, 3],        # วันวิสาขบูชา (ชดเชย) + เฉลิมฯ พระราชินี
+        7: [28, 29, 30],  # เฉลิมฯ ร.10 + อาสาฬหบูชา + เข้าพรรษา
+        8: [12],          # วันแม่แห่งชาติ
+        10: [13, 23],     # วันสวรรคต ร.9 + ปิยมหาราช
+        12: [5, 7, 10, 31],  # วันพ่อ + ชดเชย + รัฐธรรมนูญ + สิ้นปี
+    }
+}
+
+def is_holiday(year, month, day):
+    """ตรวจสอบว่าเป็นวันหยุดนักขัตฤกษ์หรือไม่"""
+    if year in THAI_HOLIDAYS and month in THAI_HOLIDAYS[year]:
+        return day in THAI_HOLIDAYS[year][month]
+    return False
+
+def get_holiday_name(year, month, day):
+    """รับชื่อวันหยุด (สำหรับ tooltip)"""
+    holiday_names = {
+        (2025, 1, 1): "วันขึ้นปีใหม่", (2025, 2, 12): "วันมาฆบูชา",
+        (2025, 4, 6): "วันจักรี", (2025, 4, 13): "วันสงกรานต์",
+        (2025, 5, 1): "วันแรงงาน", (2025, 5, 12): "วันวิสาขบูชา",
+        (2025, 6, 3): "วันเฉลิมฯ พระราชินี", (2025, 7, 28): "วันเฉลิมฯ ร.10",
+        (2025, 8, 12): "วันแม่แห่งชาติ", (2025, 10, 13): "วันสวรรคต ร.9",
+        (2025, 10, 23): "วันปิยมหาราช", (2025, 12, 5): "วันพ่อแห่งชาติ",
+        (2025, 12, 10): "วันรัฐธรรมนูญ", (2025, 12, 31): "วันสิ้นปี",
+        (2026, 1, 1): "วันขึ้นปีใหม่", (2026, 3, 3): "วันมาฆบูชา",
+        # ... สามารถเพิ่มชื่อวันหยุดได้
+    }
+    return holiday_names.get((year, month, day), "วันหยุดราชการ")
+
+# --- Helper Function ---
+def get_week_occurrence(day):
+    return (day - 1) // 7 + 1
@@ -0,0 +1,181 @@
+"""ค่ากฎของแต่ละวอร์ด (JSON มีเลขเวอร์ชัน) แทนการเขียนชื่อพยาบาลลงในโค้ดของโมเดล
+
+ไฟล์อยู่ที่ scheduler/wards/<ward>.json (ดู ER_KPH.json เป็นตัวอย่าง)::
+
+    roster                    รายชื่อ {id: ชื่อที่แสดง} เรียงตามลำดับในตาราง
+    staffing                  คนขั้นต่ำต่อวัน M (วันธรรมดา), M_special (ส-อา/นักขัตฤกษ์), S, N
+    fixed_patterns            เวรประจำตามวันในสัปดาห์ (จ..อา) + วันนักขัตฤกษ์ (Hard)
+                              'NCD' = หยุดในโมเดล แต่แสดงเป็น NCD ในตาราง
+    preferred_shifts          อยากได้เวรนี้ในวันในสัปดาห์ที่ระบุ (Soft)
+    caps                      จำนวนเวรรวมของกลุ่มเวรต่อเดือนไม่เกิน max (Hard)
+    oc                        last_day = OC ถึงวันที่, hard_ban = ห้ามทำ OC, soft_avoid = ขอเลี่ยง
+    ns_excluded               ห้ามทำ NS
+    separation_pairs          คู่ที่ไม่ควรขึ้นเวรเดียวกัน (Soft)
+    off_after_night_excluded  ไม่ใช้ Soft "หลัง N ควรหยุด"
+    fairness                  rotation_excluded / sn_excluded = ไม่เกลี่ยในโมเดล,
+                              report_*_excluded = ไม่นับในคะแนนความยุติธรรม
+    weights                   น้ำหนักของแต่ละเป้าหมายใน objective
+
+โหลดแล้ว cache ไว้ต่อไฟล์ (ตาม mtime) แก้ไฟล์แล้วจะโหลดใหม่เอง
+fingerprint ของค่ากฎรวมอยู่ใน solve_cache_key → แก้กฎแล้วไม่ใช้ผลลัพธ์ cache เดิม
+"""
+
+import hashlib
+import json
+import os
+
+CONFIG_VERSION = 1
+WARD_CONFIG_DIR = os.path.join(os.path.dirname(__file__), 'wards')
+DEFAULT_WARD_CONFIG = "ER_KPH"
+
+_PATTERN_SHIFTS = {'S', 'M', 'N', 'O', 'L_T', 'NS', 'OC', 'NCD'}
+_CAP_SHIFTS = {'S', 'M', 'N', 'L_T', 'NS', 'OC'}
+DEFAULT_WEIGHTS = {
+    'preferred': 100,
+    'separation': 30,
+    'n_consecutive': 25,
+    'oc_avoid': 20,
+    's_n_transition': 18,
+    'o_before_n': 15,
+    's_m_n': 12,
+    'n_skip_day': 10,
+    'consecutive_off': 5,
+    'off_after_night': 1,
+}
+DEFAULT_STAFFING = {'M': 3, 'M_special': 4, 'S': 2, 'N': 1}
+
+_cache = {}
+
+
+class WardConfig:
+    """ค่ากฎของวอร์ดที่ตรวจแล้ว (ใช้ใน build_schedule_model, check_capacity, render_schedule_df, ...)"""
+
+    def __init__(self, data):
+        version = data.get('version', 1)
+        if version > CONFIG_VERSION:
+            raise ValueError(f"ward config version {version} ใหม่กว่าที่รองรับ ({CONFIG_VERSION})")
+        self.version = version
+        self.ward = data['ward']
+        self.title = data.get('title', self.ward)
+        self.nurse_names = dict(data['roster'])
+        self.nurses = list(self.nurse_names)
+
+        self.staffing = {**DEFAULT_STAFFING, **data.get('staffing', {})}
+        self.fixed_patterns = {}
+        for nurse, pattern in data.get('fixed_patterns', {}).items():
+            weekdays = list(pattern['weekdays'])
+            if len(weekdays) != 7:
+                raise ValueError(f"fixed_patterns.{nurse}: ต้องระบุครบ 7 วัน (จ..อา)")
+            self._check_shifts(weekdays + [pattern.get('holiday', 'O')], _PATTERN_SHIFTS, f"fixed_patterns.{nurse}")
+            self.fixed_patterns[self._nurse(nurse, 'fixed_patterns')] = {
+                'weekdays': weekdays, 'holiday': pattern.get('holiday', 'O'),
+            }
+        self.preferred_shifts = []
+        for pref in data.get('preferred_shifts', []):
+            self._check_shifts([pref['shift']], _CAP_SHIFTS, 'preferred_shifts')
+            self.preferred_shifts.append({'nurse': self._nurse(pref['nurse'], 'preferred_shifts'),
+                                          'shift': pref['shift'], 'weekdays': list(pref['weekdays'])})
+        self.caps = []
+        for cap in data.get('caps', []):
+            self._check_shifts(cap['shifts'], _CAP_SHIFTS, 'caps')
+            self.caps.append({'nurse': self._nurse(cap['nurse'], 'caps'), 'shifts': list(cap['shifts']),
+                              'max': int(cap['max'])})
+
+        oc = data.get('oc', {})
+        self.oc_last_day = int(oc.get('last_day', 10))
+        self.oc_hard_ban = self._nurses(oc.get('hard_ban', []), 'oc.hard_ban')
+        self.oc_soft_avoid = self._nurses(oc.get('soft_avoid', []), 'oc.soft_avoid')
+        self.ns_excluded = self._nurses(data.get('ns_excluded', []), 'ns_excluded')
+        self.separation_pairs = [tuple(self._nurses(pair, 'separation_pairs')) for pair in
+                                 data.get('separation_pairs', [])]
+        self.off_after_night_excluded = self._nurses(data.get('off_after_night_excluded', []),
+                                                     'off_after_night_excluded')
+        fairness = data.get('fairness', {})
+        self.rotation_excluded = self._nurses(fairness.get('rotation_excluded', []), 'fairness.rotation_excluded')
+        self.sn_excluded = self._nurses(fairness.get('sn_excluded', []), 'fairness.sn_excluded')
+        self.report_off_excluded = self._nurses(fairness.get('report_off_excluded', []),
+                                                'fairness.report_off_excluded')
+        self.report_sn_excluded = self._nurses(fairness.get('report_sn_excluded', []), 'fairness.report_sn_excluded')
+
+        unknown = set(data.get('weights', {})) - set(DEFAULT_WEIGHTS)
+        if unknown:
+            raise ValueError(f"weights: ไม่รู้จัก {sorted(unknown)}")
+        self.weights = {**DEFAULT_WEIGHTS, **data.get('weights', {})}
+
+        self.data = data
+        self.fingerprint = hashlib.sha256(json.dumps(data, sort_keys=True).encode('utf-8')).hexdigest()[:16]
+
+    def _nurse(self, nurse, field):
+        if nurse not in self.nurse_names:
+            raise ValueError(f"{field}: ไม่มี {nurse} ใน roster")
+        return nurse
+
+    def _nurses(self, nurses, field):
+        return [self._nurse(n, field) for n in nurses]
+
+    @staticmethod
+    def _check_shifts(shifts, allowed, field):
+        bad = [s for s in shifts if s not in allowed]
+        if bad:
+            raise ValueError(f"{field}: ไม่รู้จักเวร {bad}")
+
+    def pattern_shift(self, nurse, weekday, holiday):
+        """เวรประจำของ nurse ในวันนั้น (None = ไม่มีเวรประจำ) 'NCD' คืนค่าเป็น 'O'"""
+        pattern = self.fixed_patterns.get(nurse)
+        if pattern is None:
+            return None
+        shift = pattern['holiday'] if holiday else pattern['weekdays'][weekday]
+        return 'O' if shift == 'NCD' else shift
+
+    def ncd_weekdays(self, nurse):
+        """วันในสัปดาห์ที่วันหยุดของ nurse แสดงเป็น NCD"""
+        pattern = self.fixed_patterns.get(nurse)
+        if pattern is None:
+            return []
+        return [wd for wd, shift in enumerate(pattern['weekdays']) if shift == 'NCD']
+
+    def __getstate__(self):
+        return {'data': self.data}
+
+    def __setstate__(self, state):
+        self.__init__(state['data'])
+
+    def __repr__(self):
+        return f"WardConfig({self.ward!r}, v{self.version}, {len(self.nurses)} nurses)"
+
+
+def ward_config_path(ward, root=WARD_CONFIG_DIR):
+    return os.path.join(root, f"{ward}.json")
+
+
+def list_wards(root=WARD_CONFIG_DIR):
+    """ชื่อวอร์ดที่มีไฟล์ค่ากฎ"""
+    if not os.path.isdir(root):
+        return []
+    return sorted(name[:-5] for name in os.listdir(root) if name.endswith('.json'))
+
+
+def load_ward_config(ward=DEFAULT_WARD_CONFIG, root=WARD_CONFIG_DIR):
+    """โหลดค่ากฎของวอร์ด (cache ตาม path + mtime ของไฟล์)"""
+    path = ward_config_path(ward, root)
+    mtime = os.path.getmtime(path)
+    cached = _cache.get(path)
+    if cached is not None and cached[0] == mtime:
+        return cached[1]
+    with open(path, encoding='utf-8') as f:
+        config = WardConfig(json.load(f))
+    _cache[path] = (mtime, config)
+    return config
+
+
+def default_ward_config():
+    return load_ward_config(DEFAULT_WARD_CONFIG)
+
+
+def resolve_ward_config(ward_config):
+    """None → ค่ากฎของวอร์ดหลัก, ชื่อวอร์ด (str) → โหลดจาก WARD_CONFIG_DIR"""
+    if ward_config is None:
+        return default_ward_config()
+    if isinstance(ward_config, str):
+        return load_ward_config(ward_config)
+    return ward_config
@@ -0,0 +1,138 @@
+"""จัดตารางใน process แยก เพื่อไม่ให้หน้าจอค้างระหว่างรอ solver (ดูความคืบหน้า/ยกเลิกได้)"""
+
+import inspect
+import multiprocessing
+import queue
+import time
+
+from .solver import render_schedule_df, solve_schedule_codes
+
+# spawn: process ใหม่ไม่ติด thread/lock ของ Streamlit server มาด้วย
+_MP_CONTEXT = multiprocessing.get_context('spawn')
+
+
+def _run_job(messages, stop_event, args, kwargs):
+    """ทำงานใน process ลูก: ส่ง ('progress', dict) ระหว่างค้นหา (แนบ matrix รหัสเวรเมื่อเจอคำตอบใหม่)
+    แล้ว ('stats', dict) และ ('done', matrix|None) ตอนจบ (ส่งข้าม process เป็น int8 ไม่ใช่ DataFrame ข้อความ)"""
+    try:
+        stats = {}
+        codes = solve_schedule_codes(
+            *args,
+            progress_callback=lambda progress: messages.put(('progress', progress)),
+            stop_event=stop_event,
+            stream_schedules=True,
+            stats=stats,
+            **kwargs
+        )
+        messages.put(('stats', stats))
+        messages.put(('done', codes))
+    except Exception as e:
+        messages.put(('error', f"{type(e).__name__}: {e}"))
+
+
+class SolveJob:
+    """งานจัดตาราง 1 งานที่รันใน process แยก
+
+    รับ argument เหมือน solve_schedule_codes ทุกอย่าง::
+
+        job = SolveJob(year, month, days_in_month, nurses, requests, enable_oc=False)
+        job.start()
+        while not job.poll():
+            print(job.progress)
+            time.sleep(0.5)
+        df = job.result
+
+    cancel() สั่งหยุดค้นหา แล้ว job จะจบพร้อมคำตอบดีที่สุดที่เจอแล้ว (ถ้ามี)
+    ระหว่างรัน best_schedule คือตารางดีที่สุดที่เจอล่าสุด (แสดงให้ผู้ใช้ดูก่อนได้)
+    result/best_schedule เป็น DataFrame สำหรับแสดงผล (สร้างจาก result_codes/best_codes เมื่อเรียกใช้)
+    stats = สถิติของ solver เมื่อจบ (ดู solve_stats) ใช้บันทึกประวัติด้วย telemetry.record_solve
+    """
+
+    def __init__(self, *args, **kwargs):
+        self._args = args
+        self._kwargs = kwargs
+        bound = inspect.signature(solve_schedule_codes).bind(*args, **kwargs).arguments
+        self._render_args = (list(bound['nurses']), bound['year'], bound['month'], bound.get('ward_config'))
+        self._messages = _MP_CONTEXT.Queue()
+        self._stop_event = _MP_CONTEXT.Event()
+        self._process = None
+        self.started_at = None
+        self.finished_at = None
+        self.progress = {'objective': None, 'best_bound': None, 'wall_time': 0.0, 'solutions': 0}
+        self.best_codes = None
+        self.result_codes = None
+        self.stats = {}
+        self.error = None
+        self.done = False
+
+    @property
+    def result(self):
+        if self.result_codes is None:
+            return None
+        return render_schedule_df(self.result_codes, *self._render_args)
+
+    @property
+    def best_schedule(self):
+        if self.best_codes is None:
+            return None
+        return render_schedule_df(self.best_codes, *self._render_args)
+
+    @property
+    def cancelled(self):
+        return self._stop_event.is_set()
+
+    @property
+    def elapsed(self):
+        if self.started_at is None:
+            return 0.0
+        return (self.finished_at or time.time()) - self.started_at
+
+    def start(self):
+        self.started_at = time.time()
+        self._process = _MP_CONTEXT.Process(
+            target=_run_job, args=(self._messages, self._stop_event, self._args, self._kwargs), daemon=True
+        )
+        self._process.start()
+        return self
+
+    def cancel(self):
+        self._stop_event.set()
+
+    def _handle(self, kind, payload):
+        if kind == 'progress':
+            if 'codes' in payload:
+                self.best_codes = payload.pop('codes')
+            self.progress = payload
+            return
+        if kind == 'stats':
+            self.stats = payload
+            return
+        self.done = True
+        self.finished_at = time.time()
+        if kind == 'done':
+            self.result_codes = payload
+        else:
+            self.error = payload
+
+    def poll(self):
+        """อ่านข้อความที่ค้างจาก process ลูก คืนค่า True เมื่องานจบแล้ว"""
+        if self.done or self._process is None:
+            return self.done
+        # ถ้า process จบแล้ว รอข้อความสุดท้ายสักครู่ (อาจยังค้างอยู่ใน pipe)
+        timeout = None if self._process.is_alive() else 1.0
+        while not self.done:
+            try:
+                if timeout is None:
+                    kind, payload = self._messages.get_nowait()
+                else:
+                    kind, payload = self._messages.get(timeout=timeout)
+            except queue.Empty:
+                break
+            self._handle(kind, payload)
+
+        if not self.done and timeout is not None:
+            # process ตายโดยไม่ได้ส่งผลลัพธ์ (เช่น ถูก kill / หน่วยความจำไม่พอ)
+            self._handle('error', f"solver process exited with code {self._process.exitcode}")
+        if self.done:
+            self._process.join(timeout=1.0)
+        return self.done
@@ -1,4 +1,4 @@
-from app import solve_schedule
+from scheduler import solve_schedule
 import pandas as pd
 
 def test_7day_limit():
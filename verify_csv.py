@@ -1,47 +1,36 @@
 
+import io
+
 import pandas as pd
-from app import convert_to_thai_shifts, solve_schedule
+from scheduler import parse_previous_month_schedule
 
 def verify_csv_customization():
     print("--- Verifying CSV Customization and Fix N/s Logic ---")
     
-    # 1. Mock DataFrame
+    # 1. Mock DataFrame (ตารางเดือนก่อนที่ export เป็นตัวย่อภาษาไทย)
     data = [
-        {'Nurse': 'ER1 (Name)', '1': 'M', '2': 'S', '3': 'N', '4': 'NS', '5': 'L_T', '6': 'O'},
-        {'Nurse': 'ER9 (Name)', '1': 'M', '2': 'S', '3': 'N', '4': 'NS', '5': 'L_T', '6': 'O'},
-        {'Nurse': 'ER10 (Name)', '1': 'M', '2': 'S', '3': 'N', '4': 'NS', '5': 'L_T', '6': 'O'},
+        {'Nurse': 'ER1 (Name)', '1': 'ช', '2': 'บ', '3': 'ค', '4': 'ดบ', '5': 'VA', '6': 'O', '7': 'M'},
+        {'Nurse': 'ER9 (Name)', '1': 'M', '2': 'S', '3': 'N', '4': 'NS', '5': 'L_T', '6': 'O', '7': 'M'},
+        {'Nurse': 'ER10 (Name)', '1': 'S', '2': 'S', '3': 'O', '4': 'O', '5': 'N', '6': 'N', '7': 'O'},
     ]
-    df = pd.DataFrame(data)
+    buffer = io.BytesIO(pd.DataFrame(data).to_csv(index=False).encode('cp874'))
     
-    # 2. Test Thai Conversion & Sorting
-    thai_df = convert_to_thai_shifts(df, 31)
+    # 2. Test Thai Conversion & Nurse matching
+    prev_data = parse_previous_month_schedule(buffer, [f'ER{i}' for i in range(1, 11)])
     
-    # Check Sorting (ER10 should come before ER9)
-    nurses = thai_df['Nurse'].tolist()
-    print(f"Nurse Order: {nurses}")
-    if nurses.index('ER10 (Name)') < nurses.index('ER9 (Name)'):
-        print("PASS: ER10 is sorted before ER9.")
+    # Check Matching (ER10 ต้องไม่ถูกจับเป็น ER1)
+    print(f"Nurses: {sorted(prev_data)}")
+    if prev_data['ER10'][0] == 'S' and prev_data['ER1'][0] == 'M':
+        print("PASS: ER10 is not matched as ER1.")
     else:
-        print("FAIL: Sort order incorrect.")
+        print("FAIL: Nurse matching incorrect.")
         
     # Check Shift Mapping
-    row1 = thai_df.iloc[0]
-    mapping_checks = {
-        '1': 'ช',
-        '2': 'บ',
-        '3': 'ด',
-        '4': 'ดบ',
-        '5': 'VA/ประชุม'
-    }
-    
-    all_mapped = True
-    for col, expected in mapping_checks.items():
-        if row1[col] != expected:
-            print(f"FAIL: Column {col} expected {expected}, got {row1[col]}")
-            all_mapped = False
-            
-    if all_mapped:
+    expected = ['M', 'S', 'N', 'NS', 'L_T', 'O', 'M']
+    if prev_data['ER1'] == expected:
         print("PASS: Thai shift mapping correct.")
+    else:
+        print(f"FAIL: expected {expected}, got {prev_data['ER1']}")
 
     # 3. Test Fix S and N Logic (via solve_schedule simulation if possible, or just checking logic)
     # Since we can't easily run the solver due to 'ortools' issue in this env, we rely on the code review.
@@ -1,5 +1,5 @@
 
-from app import load_requests_from_csv, NURSE_NAMES, convert_to_thai_shifts
+from scheduler import load_requests_from_csv, NURSE_NAMES
 import pandas as pd
 import os
 
@@ -0,0 +1,34 @@
+from ortools.sat.python import cp_model
+from scheduler import build_schedule_model, load_ward_config, run_solver
+
+def verify_oc_rules_with_day1_leave():
+    print("--- Verifying OC rules when day 1 is leave ---")
+    
+    # ER2 ลาวันที่ 1 → ไม่มีตัวแปร OC วันที่ 1 แต่กฎ OC วันอื่นต้องยังอยู่
+    nurses = list(load_ward_config('ER_KPH').nurse_names)
+    requests = [{'nurse': 'ER2', 'date': 1, 'type': 'Leave_Train', 'month': 11, 'year': 2025}]
+    cases = {
+        'OC d2 + M d3': [('ER2', 2, 'OC'), ('ER2', 3, 'M')],
+        'OC d2 + OC d4': [('ER2', 2, 'OC'), ('ER2', 4, 'OC')],
+    }
+    
+    all_passed = True
+    for encoding in ['linear', 'automaton']:
+        for name, cells in cases.items():
+            model, shifts_var, _ = build_schedule_model(2025, 11, 30, nurses, requests, sequence_encoding=encoding)
+            model.ClearObjective()
+            for cell in cells:
+                model.Add(shifts_var[cell] == 1)
+            solver, status = run_solver(model, {'time_limit': 20, 'num_workers': 2})
+            if status == cp_model.INFEASIBLE:
+                print(f"PASS: {encoding}: {name} is rejected.")
+            else:
+                print(f"FAIL: {encoding}: {name} accepted ({solver.StatusName(status)})")
+                all_passed = False
+    
+    if all_passed:
+        print("PASS: OC rules still apply after a day-1 leave.")
+    print("\n--- Verification Complete ---")
+
+if __name__ == "__main__":
+    verify_oc_rules_with_day1_leave()